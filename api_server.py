@@ -1,17 +1,47 @@
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Body, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from typing import Optional
 from pydantic import BaseModel
-from google import genai
 from google.genai import types
 import os
+import orjson
+import numpy as np
 import pandas as pd
 import asyncio
 import threading
 import time
+import functools
+import operator
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import hashlib
+import json
+import re
+import zlib
+import traceback
+import multiprocessing
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from cachetools import TTLCache, TLRUCache
 from dotenv import load_dotenv
 from core.weex_api import WeexClient
-from core.db_manager import get_db_connection
+from core.db_manager import (
+    pooled_connection, queue_market_log, stop_market_log_flusher, save_analysis_and_log,
+    record_filled_trade, count_profitable_trades, create_async_pool
+)
+from core.analysis import analyze_market_structure
+from core import llm_brain
+from core.llm_brain import get_trading_decision_async, get_fallback_decision, gemini_quota_exhausted
+from core.sentinel_pipeline import run_cpu_pipeline
+from core.market_stream import KlineStream
+from core.ml_analyst import MLAnalyst
+from core.sentiment import analyze_market_sentiment
+from core.strategy_evaluator import evaluate_strategies, compile_logic
 
 # NEW: Production-ready components
 from core.position_manager import initialize_position_manager, get_position_manager
@@ -31,7 +61,10 @@ load_dotenv()
 
 # 2. Validate Environment Variables
 def validate_env():
-    """Validates required environment variables on startup."""
+    """Validates required environment variables on startup (skip with CHARTOR_SKIP_ENV_CHECK=1)."""
+    if os.getenv("CHARTOR_SKIP_ENV_CHECK") == "1":
+        return True
+    
     required_vars = {
         "DATABASE_URL": "PostgreSQL database connection string",
         "GEMINI_API_KEY": "Google Gemini API key for AI decisions",
@@ -43,41 +76,49 @@ def validate_env():
         "WEEX_PASSPHRASE": "WEEX exchange passphrase (required for live trading)",
     }
     
-    missing_required = []
-    missing_optional = []
-    
-    for var, description in required_vars.items():
-        if not os.getenv(var):
-            missing_required.append(f"{var} - {description}")
-    
-    for var, description in optional_vars.items():
-        if not os.getenv(var):
-            missing_optional.append(f"{var} - {description}")
+    missing_required = [f"{var} - {description}" for var, description in required_vars.items() if not os.getenv(var)]
+    missing_optional = [f"{var} - {description}" for var, description in optional_vars.items() if not os.getenv(var)]
     
+    lines = []
     if missing_required:
-        print("CRITICAL: Missing required environment variables:")
-        for var in missing_required:
-            print(f"   - {var}")
-        print("\nWARNING: Application may not function correctly without these variables.")
-        print("   Please create a .env file with the required variables.\n")
+        lines.append("CRITICAL: Missing required environment variables:")
+        lines.extend(f"   - {var}" for var in missing_required)
+        lines.append("WARNING: Application may not function correctly without these variables.")
+        lines.append("   Please create a .env file with the required variables.")
     
     if missing_optional:
-        print("WARNING: Missing optional environment variables:")
-        for var in missing_optional:
-            print(f"   - {var}")
-        print("\nWARNING: Live trading will not work without WEEX credentials.\n")
+        lines.append("WARNING: Missing optional environment variables:")
+        lines.extend(f"   - {var}" for var in missing_optional)
+        lines.append("WARNING: Live trading will not work without WEEX credentials.")
     
-    if not missing_required and not missing_optional:
-        print("All environment variables validated successfully.\n")
+    if lines:
+        logger.warning("\n".join(lines))
+    else:
+        logger.info("All environment variables validated successfully.")
     
     return len(missing_required) == 0
 
 # Validate on import
 env_valid = validate_env()
 
+def _json_default(obj):
+    """orjson fallback for NUMERIC columns, which come back from Postgres as Decimal."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+class ChartorJSONResponse(ORJSONResponse):
+    """
+    ORJSONResponse that also encodes Decimal. Handlers that return it directly skip
+    FastAPI's jsonable_encoder pass; datetimes are written natively as ISO 8601.
+    """
+    def render(self, content):
+        return orjson.dumps(content, default=_json_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
 # 2. Initialize App & Clients
-app = FastAPI(title="Chartor Trading Engine API")
+app = FastAPI(title="Chartor Trading Engine API", default_response_class=ChartorJSONResponse)
 client = WeexClient()
+weex_session = client.session  # Shared with the sentinel's own WeexClient
 
 # NEW: Initialize production components at module level
 try:
@@ -96,527 +137,812 @@ trading_mode_lock = threading.Lock()  # Prevents Sentinel + Institutional confli
 
 # Background task control
 sentinel_running = False
-sentinel_thread = None
+sentinel_task = None
+sentinel_stop_event = asyncio.Event()
+main_event_loop = None  # Captured in startup_event so sync endpoints can schedule the sentinel
+
+# Worker pool for the sentinel's independent per-cycle fetches and CPU work
+_sentinel_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="sentinel")
+SENTINEL_FETCH_TIMEOUT = 20  # seconds
+
+# Indicators + ML run in a separate process so sklearn fits don't hold the API's GIL
+# (created when the sentinel starts, shut down when it stops)
+_cpu_pool = None
+
+# WEEX compliance uploads and decision records run here so they never hold up the next market scan
+_log_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ai-log")
+
+# Gemini decisions for equivalent market states (see _decision_cache_key)
+_decision_cache = TTLCache(maxsize=512, ttl=60)
+# Replay mode never calls Gemini: cache hits are reused, misses use the fallback engine
+DECISION_REPLAY = os.getenv("CHARTOR_DECISION_REPLAY", "0") == "1"
+
+FORCE_CLOSE_CONCURRENCY = 8  # WEEX close requests in flight at once during /api/force-close
+
+# Chat and strategy translation reuse llm_brain's Gemini client (None without GEMINI_API_KEY)
+GEMINI_CHAT_MODEL = os.getenv("GEMINI_CHAT_MODEL", "gemini-flash-latest")
+
+# Short-lived caches for the endpoints the UI polls (see _cached_response)
+WATCHLIST_CACHE_TTL = 5  # seconds
+# Official Futures Symbols on Weex shown in the sidebar
+WATCHLIST_SYMBOLS = [
+    "cmt_btcusdt", "cmt_ethusdt", "cmt_solusdt",
+    "cmt_dogeusdt", "cmt_xrpusdt", "cmt_bnbusdt",
+    "cmt_adausdt", "cmt_ltcusdt"
+]
+WATCHLIST_REFRESH_DELAY = 2  # seconds before re-fetching a partial watchlist in the background
+LAST_PRICE_CACHE_TTL = 2  # seconds
+SETTINGS_CACHE_TTL = 5  # seconds; writes through this process invalidate it immediately
+_INTERVAL_SECONDS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+def _candle_cache_ttl(interval):
+    """A tenth of the candle interval, capped at 60s (e.g. 6s for 1m, 60s for 15m)."""
+    try:
+        seconds = int(interval[:-1]) * _INTERVAL_SECONDS[interval[-1].lower()]
+    except (ValueError, KeyError, IndexError):
+        seconds = 900
+    return min(60, max(1, seconds / 10))
+
+_watchlist_cache = TTLCache(maxsize=1, ttl=WATCHLIST_CACHE_TTL)
+_last_price_cache = TTLCache(maxsize=256, ttl=LAST_PRICE_CACHE_TTL)
+_settings_cache = TTLCache(maxsize=1, ttl=SETTINGS_CACHE_TTL)
+_candles_cache = TLRUCache(maxsize=512, ttu=lambda key, value, now: now + _candle_cache_ttl(key[1]))
+_response_cache_lock = threading.Lock()
+_response_fill_locks = {}
+# At most one out-of-band watchlist refresh at a time (see _refresh_watchlist)
+_watchlist_refresh_lock = threading.Lock()
+_refresh_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="refresh")
+
+def _cached_response(cache, key, loader, cacheable=bool):
+    """
+    Returns cache[key], calling loader() on a miss.
+    Concurrent misses for the same key share one loader call; results failing cacheable() (by default,
+    empty ones) aren't cached.
+    """
+    with _response_cache_lock:
+        if key in cache:
+            return cache[key]
+        fill_lock = _response_fill_locks.setdefault((id(cache), key), threading.Lock())
+    
+    with fill_lock:
+        with _response_cache_lock:
+            if key in cache:
+                return cache[key]
+        try:
+            value = loader()
+            if cacheable(value):
+                with _response_cache_lock:
+                    cache[key] = value
+            return value
+        finally:
+            with _response_cache_lock:
+                _response_fill_locks.pop((id(cache), key), None)
+
+def _get_last_price(symbol):
+    """Close of the latest candle for a symbol (None if unavailable), cached for LAST_PRICE_CACHE_TTL seconds."""
+    return _cached_response(_last_price_cache, symbol, lambda: _load_last_price(symbol))
+
+def _load_last_price(symbol):
+    try:
+        candles = client.fetch_candles(symbol=symbol, limit=1)
+        if candles and len(candles) > 0:
+            return float(candles[0][4])  # Close price
+    except Exception as e:
+        print(f"Last Price Error ({symbol}): {e}")
+    return None
+
+# Keep-alive session for third-party market data (Binance tickers); GETs retry on transient failures
+_http = requests.Session()
+_http.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=64,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504))
+))
+
+# Asset keywords recognised in chat messages
+_KEYWORD_TO_SYMBOL = {
+    "btc": "cmt_btcusdt", "bitcoin": "cmt_btcusdt",
+    "eth": "cmt_ethusdt", "ethereum": "cmt_ethusdt",
+    "sol": "cmt_solusdt", "solana": "cmt_solusdt",
+    "doge": "cmt_dogeusdt", "dogecoin": "cmt_dogeusdt",
+    "xrp": "cmt_xrpusdt", "ripple": "cmt_xrpusdt",
+    "bnb": "cmt_bnbusdt", "binance": "cmt_bnbusdt",
+    "ada": "cmt_adausdt", "cardano": "cmt_adausdt",
+    "ltc": "cmt_ltcusdt", "litecoin": "cmt_ltcusdt"
+}
+# Longest keywords first so "dogecoin" isn't read as "doge"; "btcusdt" style tickers also match
+_SYMBOL_PATTERN = re.compile(
+    r"\b(" + "|".join(sorted(_KEYWORD_TO_SYMBOL, key=len, reverse=True)) + r")(?:usdt)?\b"
+)
+
+# Trained models for on-demand analysis, keyed by (symbol, last candle timestamp)
+ML_CACHE_SIZE = 16
+_ml_cache = OrderedDict()
+_ml_cache_lock = threading.Lock()
+
+def _get_trained_analyst(symbol, candles):
+    """
+    Returns (analyst, trained) for this CandleSet, reusing the model fitted on the same bar.
+    Misses train under the lock so concurrent requests for one bar fit once.
+    """
+    key = (symbol, float(candles.timestamp[-1]))
+    with _ml_cache_lock:
+        cached = _ml_cache.get(key)
+        if cached is not None:
+            _ml_cache.move_to_end(key)
+            return cached
+        
+        analyst = MLAnalyst()
+        cached = (analyst, analyst.train_model(candles))
+        _ml_cache[key] = cached
+        while len(_ml_cache) > ML_CACHE_SIZE:
+            _ml_cache.popitem(last=False)
+        return cached
 
 # Track which mode is active
 active_trading_mode = None  # "SENTINEL" or "INSTITUTIONAL" or None
 
-def sentinel_loop():
+def _fetch_settings_row(query):
+    """Runs a single-row trade_settings lookup on a pooled connection (None if unavailable)."""
+    with pooled_connection() as conn:
+        if not conn:
+            return None
+        
+        with conn.cursor() as cur:
+            cur.execute(query)
+            return cur.fetchone()
+
+async def _pg_fetch(query, *args):
+    """Rows from the async pool as dicts (None if the pool is unavailable)."""
+    pg = getattr(app.state, "pg", None)
+    if pg is None:
+        return None
+    return [dict(row) for row in await pg.fetch(query, *args)]
+
+async def _pg_fetchrow(query, *args):
+    """First row from the async pool as a dict (None if the pool is unavailable or nothing matched)."""
+    pg = getattr(app.state, "pg", None)
+    if pg is None:
+        return None
+    row = await pg.fetchrow(query, *args)
+    return dict(row) if row else None
+
+async def _pg_execute(query, *args):
+    """Runs a statement on the async pool (returns the status string, or None if the pool is unavailable)."""
+    pg = getattr(app.state, "pg", None)
+    if pg is None:
+        return None
+    return await pg.execute(query, *args)
+
+UPDATE_SETTINGS_SQL = """
+    UPDATE trade_settings SET
+        auto_trading = COALESCE($1::boolean, auto_trading),
+        risk_tolerance = COALESCE($2::integer, risk_tolerance),
+        current_symbol = COALESCE($3::text, current_symbol),
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+SETTINGS_ROW_SQL = "SELECT * FROM trade_settings ORDER BY id DESC LIMIT 1"
+
+def _cached_settings_row():
+    """The trade_settings row, cached for SETTINGS_CACHE_TTL seconds (None if unavailable)."""
+    return _cached_response(_settings_cache, "settings", lambda: _fetch_settings_row(SETTINGS_ROW_SQL))
+
+async def _cached_settings_row_async():
+    """_cached_settings_row for async handlers, filling a miss from the asyncpg pool."""
+    with _response_cache_lock:
+        settings = _settings_cache.get("settings")
+    if settings is None:
+        settings = await _pg_fetchrow(SETTINGS_ROW_SQL)
+        if settings:
+            with _response_cache_lock:
+                _settings_cache["settings"] = settings
+    return settings
+
+def _invalidate_settings_cache():
+    """Drops the cached trade_settings row after a write."""
+    with _response_cache_lock:
+        _settings_cache.clear()
+
+def _load_sentinel_settings():
+    """Reads the auto-trading settings row the sentinel runs against."""
+    return _cached_settings_row()
+
+def _log_sentinel_event(market_state, structure, decision, confidence, reason):
+    """Queues a sentinel gate or execution event for market_log (written in batches)."""
+    try:
+        queue_market_log((
+            str(market_state.get('trend', 'Neutral')),
+            structure,
+            float(market_state.get('price', 0)),
+            float(market_state.get('rsi', 50)),
+            decision,
+            int(confidence),
+            reason
+        ))
+    except Exception as log_err:
+        logger.error(f"Log error: {log_err}")
+
+def _decision_cache_key(symbol, market_state, sentiment, ml_prediction):
+    """
+    Hashes every input that shapes the Gemini prompt into a cache key. Prices are
+    rounded to 4 significant figures so the bucket is relative for any price scale.
+    """
+    price = float(market_state.get('price', 0))
+    ema_20 = float(market_state.get('ema_20', price))
+    volatility = float(market_state.get('volatility', 0))
+    rsi = float(market_state.get('rsi', 50))
+    trend = market_state.get('trend', 'Neutral')
+    volume_spike = bool(market_state.get('volume_spike', False))
+    sentiment_label = sentiment.get('label') if sentiment else None
+    sentiment_score = round(float(sentiment.get('score', 0)), 1) if sentiment else None
+    ml_direction = ml_prediction.get('direction') if ml_prediction else None
+    ml_confidence = int(float(ml_prediction.get('confidence', 0)) / 5) if ml_prediction else None
+    raw_key = (
+        f"{symbol}|{price:.4g}|{ema_20:.4g}|{volatility:.2g}|{int(rsi / 5)}|{trend}|{volume_spike}"
+        f"|{sentiment_label}|{sentiment_score}|{ml_direction}|{ml_confidence}"
+    )
+    return hashlib.sha256(raw_key.encode()).hexdigest()
+
+def _on_ai_log_uploaded(future):
+    """Reports the outcome of a background upload_ai_log call."""
+    try:
+        res = future.result()
+        if res is None:
+            logger.error("   AI Log upload failed: no response from WEEX")
+    except Exception as upload_err:
+        logger.error(f"   AI Log upload failed: {upload_err}")
+
+async def _run_in_sentinel_pool(func, *args, **kwargs):
+    """Runs a blocking call on the sentinel worker pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_sentinel_executor, functools.partial(func, *args, **kwargs))
+
+async def _run_cpu_pipeline(candles):
+    """Runs the sentinel's indicator/ML pipeline in the worker process."""
+    global _cpu_pool
+    if _cpu_pool is None:
+        # Spawn a clean interpreter: a forked child would inherit locks held by the
+        # server's threads (DB pools, asyncpg, balance stream) and could deadlock on them
+        _cpu_pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_cpu_pool, run_cpu_pipeline, candles)
+    except BrokenProcessPool:
+        _cpu_pool = None  # Worker died; start a fresh one next cycle
+        raise
+
+def _shutdown_cpu_pool():
+    global _cpu_pool
+    if _cpu_pool is not None:
+        _cpu_pool.shutdown(wait=False, cancel_futures=True)
+        _cpu_pool = None
+
+async def _sentinel_sleep(seconds, wake_event=None):
+    """Waits between sentinel scans, waking early when the sentinel is stopped or wake_event is set."""
+    waiters = [asyncio.ensure_future(sentinel_stop_event.wait())]
+    if wake_event is not None:
+        waiters.append(asyncio.ensure_future(wake_event.wait()))
+    try:
+        await asyncio.wait(waiters, timeout=seconds, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+
+async def sentinel_loop():
     """Background sentinel service that monitors markets and executes trades when auto-trading is enabled."""
     global sentinel_running
-    from core.weex_api import WeexClient
-    from core.analysis import analyze_market_structure
-    from core.llm_brain import get_trading_decision
-    from core.db_manager import save_ai_analysis, log_market_state, get_db_connection
-    from core.ml_analyst import MLAnalyst
-    from core.sentiment import analyze_market_sentiment
+    local_sentiment_feed = sentiment_feed  # Set during startup; only read here
     
-    client = WeexClient()
-    ml_analyst = MLAnalyst()  # Initialize ML model once
+    client = WeexClient(session=weex_session)  # Reuse the API client's warm connections
+    client.start_balance_stream()  # Balance reads below come from memory
+    # Candles for the active symbol are pushed over the kline websocket; REST is the fallback
+    market_stream = KlineStream(client.fetch_binance_candles)  # Never seeds from simulated candles
+    market_stream_task = asyncio.create_task(market_stream.run())
     
-    while sentinel_running:
-        try:
-            # Get current settings
-            conn = get_db_connection()
-            if not conn:
-                time.sleep(30)
-                continue
+    # Last bar the pipeline ran on and what it decided; a WAIT on an unchanged bar is not re-run
+    last_bar_key = None
+    last_decision = None
+    # Sentiment lookup still running after a timed-out cycle: (symbol, task). The next cycle
+    # awaits it again instead of starting another, so a hung lookup holds one worker thread at most
+    pending_sentiment = None
+    
+    try:
+        while sentinel_running:
+            try:
+                # Get current settings
+                settings = await asyncio.to_thread(_load_sentinel_settings)
             
-            cur = conn.cursor()
-            cur.execute("SELECT auto_trading, risk_tolerance, current_symbol FROM trade_settings LIMIT 1")
-            settings = cur.fetchone()
-            cur.close()
-            conn.close()
+                if not settings:
+                    await _sentinel_sleep(30)
+                    continue
             
-            if not settings:
-                time.sleep(30)
-                continue
+                auto_trading = settings.get("auto_trading", False)
+                risk_tolerance = settings.get("risk_tolerance", 20)
+                symbol = settings.get("current_symbol", "cmt_btcusdt")
             
-            auto_trading = settings.get("auto_trading", False)
-            risk_tolerance = settings.get("risk_tolerance", 20)
-            symbol = settings.get("current_symbol", "cmt_btcusdt")
+                # Only run if auto-trading is enabled
+                if not auto_trading:
+                    await _sentinel_sleep(30)
+                    continue
             
-            # Only run if auto-trading is enabled
-            if not auto_trading:
-                time.sleep(30)
-                continue
+                # Check if Gemini is available (don't spam if quota exceeded)
+                quota_deadline = llm_brain.quota_exceeded_until
+                if quota_deadline and time.monotonic() < quota_deadline:
+                    # Quota exceeded, wait out the cooldown (checking at least every 5 minutes)
+                    remaining = quota_deadline - time.monotonic()
+                    logger.warning("Sentinel paused: Gemini quota exceeded. Resuming in %.0f seconds", remaining)
+                    await _sentinel_sleep(min(300, remaining))
+                    continue
             
-            # Check if Gemini is available (don't spam if quota exceeded)
-            from core.llm_brain import quota_exceeded_until
-            from datetime import datetime
-            if quota_exceeded_until and datetime.now() < quota_exceeded_until:
-                # Quota exceeded, wait longer between checks
-                logger.warning(f"Sentinel paused: Gemini quota exceeded. Resuming in {int((quota_exceeded_until - datetime.now()).total_seconds()/60)} minutes")
-                time.sleep(300)  # Check every 5 minutes instead of 30 seconds
-                continue
+                logger.info("\n%s", "=" * 60)
+                logger.info("Sentinel: %s | Auto-Trade: ON | Risk: %s%%", symbol, risk_tolerance)
+                logger.info("%s", "=" * 60)
+            
+                # Fetch market data (get more for ML training) and sentiment concurrently
+                symbol_clean = symbol.replace("cmt_", "").replace("usdt", "").upper()
+                if pending_sentiment is not None and pending_sentiment[0] == symbol_clean:
+                    sentiment_task = pending_sentiment[1]
+                elif local_sentiment_feed:
+                    # Use real-time sentiment feed (CryptoPanic or FinBERT)
+                    sentiment_task = asyncio.ensure_future(
+                        _run_in_sentinel_pool(local_sentiment_feed.get_market_sentiment, symbol_clean)
+                    )
+                else:
+                    # Fallback to legacy sentiment
+                    sentiment_task = asyncio.ensure_future(_run_in_sentinel_pool(analyze_market_sentiment, symbol_clean))
+                pending_sentiment = None
             
-            logger.info(f"\n{'='*60}")
-            logger.info(f"Sentinel: {symbol} | Auto-Trade: ON | Risk: {risk_tolerance}%")
-            logger.info(f"{'='*60}")
+                await market_stream.watch(symbol)
+                market_stream.bar_closed.clear()
+                candles = market_stream.candle_set(symbol)
+                if candles is None:
+                    candle_call = _run_in_sentinel_pool(client.fetch_candle_set, symbol=symbol, limit=500)
+                else:
+                    candle_call = asyncio.sleep(0, result=candles)
             
-            # Fetch market data (get more for ML training)
-            candles = client.fetch_candles(symbol=symbol, limit=500)
+                candles, sentiment_result = await asyncio.gather(
+                    asyncio.wait_for(candle_call, SENTINEL_FETCH_TIMEOUT),
+                    # Shielded so a timeout leaves the lookup running for the next cycle to pick up
+                    asyncio.wait_for(asyncio.shield(sentiment_task), SENTINEL_FETCH_TIMEOUT),
+                    return_exceptions=True
+                )
+                if isinstance(sentiment_result, Exception):
+                    # Sentiment only tunes the decision; carry on with a neutral reading
+                    if isinstance(sentiment_result, asyncio.TimeoutError):
+                        pending_sentiment = (symbol_clean, sentiment_task)
+                        logger.warning("   Sentiment timed out after %ss - using NEUTRAL", SENTINEL_FETCH_TIMEOUT)
+                    else:
+                        logger.warning("   Sentiment unavailable (%s) - using NEUTRAL", sentiment_result)
+                    if local_sentiment_feed:
+                        sentiment_result = {"label": "NEUTRAL", "score": 0.0, "source": "UNAVAILABLE", "latest_headline": ""}
+                    else:
+                        sentiment_result = ("NEUTRAL", 0.0)
+                if isinstance(candles, Exception):
+                    raise candles
             
-            if candles and len(candles) > 100:
-                # STEP 1: Train Local ML Model (instant retraining on latest data)
-                ml_trained = ml_analyst.train_model(candles)
+                if candles and len(candles) > 100:
+                    bar_key = (symbol, float(candles.timestamp[-1]))
+                    if bar_key == last_bar_key and last_decision == "WAIT":
+                        logger.info("   No new %s bar since last WAIT - skipping cycle", symbol)
+                        await _sentinel_sleep(15, market_stream.bar_closed)
+                        continue
                 
-                # STEP 2: Technical Analysis
-                market_state = analyze_market_structure(candles)
-                if not market_state:
-                    time.sleep(30)
-                    continue
+                    # STEP 1-3: Indicators, Local ML training/prediction and Technical Analysis (worker process)
+                    cpu_result = await _run_cpu_pipeline(candles)
+                    market_state = cpu_result["market_state"]
+                    if not market_state:
+                        await _sentinel_sleep(30)
+                        continue
                 
-                logger.info(f"   Technical: Price ${market_state.get('price', 0):.2f} | RSI {market_state.get('rsi', 50):.1f} | Trend {market_state.get('trend', 'Neutral')}")
+                    logger.info("   Technical: Price $%.2f | RSI %.1f | Trend %s", market_state.get('price', 0), market_state.get('rsi', 50), market_state.get('trend', 'Neutral'))
                 
-                # STEP 3: Get Local ML Prediction
-                ml_direction, ml_confidence = ml_analyst.predict_next_move(market_state)
-                ml_prediction = {"direction": ml_direction, "confidence": ml_confidence} if ml_trained else None
-                if ml_prediction:
-                    logger.info(f"   Local ML: Predicts {ml_direction} ({ml_confidence}% confidence)")
-                
-                # STEP 4: Get Market Sentiment (REAL-TIME from CryptoPanic or FinBERT)
-                symbol_clean = symbol.replace("cmt_", "").replace("usdt", "").upper()
+                    ml_trained = cpu_result["ml_trained"]
+                    ml_direction = cpu_result["ml_direction"]
+                    ml_confidence = cpu_result["ml_confidence"]
                 
-                # Use real-time sentiment feed
-                global sentiment_feed
-                if sentiment_feed:
-                    sentiment_result = sentiment_feed.get_market_sentiment(symbol_clean)
-                    sent_label = sentiment_result["label"]
-                    sent_score = sentiment_result["score"]
-                    sentiment = {
-                        "label": sent_label,
-                        "score": sent_score,
-                        "source": sentiment_result["source"],
-                        "headline": sentiment_result.get("latest_headline", "")
-                    }
-                    logger.info(f"   Sentiment ({sentiment_result['source']}): {sent_label} (score: {sent_score:.2f})")
-                    logger.info(f"   Headline: {sentiment_result.get('latest_headline', 'N/A')[:60]}...")
-                else:
-                    # Fallback to legacy sentiment
-                    from core.sentiment import analyze_market_sentiment
-                    sent_label, sent_score = analyze_market_sentiment(symbol_clean)
-                    sentiment = {"label": sent_label, "score": sent_score}
-                    logger.info(f"   FinBERT Sentiment: {sent_label} (score: {sent_score})")
+                    # STEP 5: Active Strategies only need market_state
+                    triggered_strategies = await _run_in_sentinel_pool(evaluate_strategies, market_state)
+                    ml_prediction = {"direction": ml_direction, "confidence": ml_confidence} if ml_trained else None
+                    if ml_prediction:
+                        logger.info("   Local ML: Predicts %s (%s%% confidence)", ml_direction, ml_confidence)
                 
-                # STEP 5: Evaluate Active Strategies
-                from core.strategy_evaluator import evaluate_strategies
-                triggered_strategies = evaluate_strategies(market_state)
+                    # STEP 4: Market Sentiment (fetched alongside the candles)
+                    if local_sentiment_feed:
+                        sent_label = sentiment_result["label"]
+                        sent_score = sentiment_result["score"]
+                        sentiment = {
+                            "label": sent_label,
+                            "score": sent_score,
+                            "source": sentiment_result["source"],
+                            "headline": sentiment_result.get("latest_headline", "")
+                        }
+                        logger.info("   Sentiment (%s): %s (score: %.2f)", sentiment_result['source'], sent_label, sent_score)
+                        logger.info("   Headline: %s...", sentiment_result.get('latest_headline', 'N/A')[:60])
+                    else:
+                        sent_label, sent_score = sentiment_result
+                        sentiment = {"label": sent_label, "score": sent_score}
+                        logger.info("   FinBERT Sentiment: %s (score: %s)", sent_label, sent_score)
                 
-                strategy_decision = None
-                strategy_name = None
-                if triggered_strategies:
-                    # Use the first triggered strategy (can be enhanced to handle multiple)
-                    strategy_decision = triggered_strategies[0].get('action')
-                    strategy_name = triggered_strategies[0].get('name')
-                    logger.info(f"   Strategy Triggered: {strategy_name} -> {strategy_decision}")
+                    # STEP 5: Pick up triggered strategies
+                    strategy_decision = None
+                    strategy_name = None
+                    if triggered_strategies:
+                        # Use the first triggered strategy (can be enhanced to handle multiple)
+                        strategy_decision = triggered_strategies[0].get('action')
+                        strategy_name = triggered_strategies[0].get('name')
+                        logger.info("   Strategy Triggered: %s -> %s", strategy_name, strategy_decision)
                 
-                # STEP 6: Hybrid Decision - Send summary to Gemini (if no strategy triggered)
-                if not strategy_decision or strategy_decision == "WAIT":
-                    logger.info("   Consulting Gemini for final approval...")
-                    ai_result = get_trading_decision(
-                        market_state, 
-                        symbol=symbol,
-                        use_cache=False,  # Disable cache for sentinel loop to get fresh results
-                        ml_prediction=ml_prediction,
-                        sentiment=sentiment
-                    )
+                    # STEP 6: Hybrid Decision - Send summary to Gemini (if no strategy triggered)
+                    if not strategy_decision or strategy_decision == "WAIT":
+                        decision_key = _decision_cache_key(symbol, market_state, sentiment, ml_prediction)
+                        ai_result = _decision_cache.get(decision_key)
+                        if ai_result is not None:
+                            logger.info("   Reusing Gemini decision for an equivalent market state")
+                        elif DECISION_REPLAY:
+                            logger.info("   Replay mode: no cached decision, using fallback engine")
+                            ai_result = get_fallback_decision(market_state)
+                        else:
+                            logger.info("   Consulting Gemini for final approval...")
+                            ai_result = await get_trading_decision_async(
+                                market_state,
+                                symbol=symbol,
+                                use_cache=False,  # Sentinel keys its own cache on the full market state
+                                ml_prediction=ml_prediction,
+                                sentiment=sentiment,
+                                service_tier="priority"  # Live order path: lowest latency, not load-shed
+                            )
+                            # Only genuine Gemini answers are worth reusing; fallbacks are cheap to recompute
+                            if ai_result.get("status") == "SUCCESS":
+                                _decision_cache[decision_key] = ai_result
                     
-                    # ============================================================
-                    # CRITICAL: Check Gemini status - abort on persistent errors
-                    # ============================================================
-                    ai_status = ai_result.get("status", "UNKNOWN")
-                    ai_source = ai_result.get("source", "UNKNOWN")
+                        # ============================================================
+                        # CRITICAL: Check Gemini status - abort on persistent errors
+                        # ============================================================
+                        ai_status = ai_result.get("status", "UNKNOWN")
+                        ai_source = ai_result.get("source", "UNKNOWN")
                     
-                    if ai_status == "ERROR":
-                        logger.error(f"Gemini API error - skipping cycle")
-                        logger.error(f"   Gemini API error - using fallback decision")
-                    elif ai_status == "FALLBACK":
-                        logger.warning(f"Using fallback decision engine (Gemini unavailable)")
-                        logger.warning(f"   Using Fallback Engine (Gemini unavailable)")
+                        if ai_status == "ERROR":
+                            logger.error("Gemini API error - skipping cycle")
+                            logger.error("   Gemini API error - using fallback decision")
+                        elif ai_status == "FALLBACK":
+                            logger.warning("Using fallback decision engine (Gemini unavailable)")
+                            logger.warning("   Using Fallback Engine (Gemini unavailable)")
                     
-                    decision = ai_result.get("decision", "WAIT")
-                    confidence = ai_result.get("confidence", 0)
-                    reason = ai_result.get("reasoning", "No reason provided")
+                        decision = ai_result.get("decision", "WAIT")
+                        confidence = ai_result.get("confidence", 0)
+                        reason = ai_result.get("reasoning", "No reason provided")
                     
-                    logger.info(f"   {ai_source} Final Decision: {decision} ({confidence}% confidence)")
+                        logger.info("   %s Final Decision: %s (%s%% confidence)", ai_source, decision, confidence)
                     
-                    # Save analysis
-                    save_ai_analysis(symbol, decision, confidence, reason, market_state)
-                    log_market_state(decision, confidence, reason, market_state)
-                else:
-                    # Use strategy decision
-                    decision = strategy_decision
-                    confidence = 85  # Strategy-based trades get high confidence
-                    reason = f"Strategy '{strategy_name}' triggered: {triggered_strategies[0].get('logic')}"
+                        # Save analysis (nothing below reads it back, so don't wait for the write)
+                        _log_pool.submit(save_analysis_and_log, symbol, decision, confidence, reason, market_state)
+                    else:
+                        # Use strategy decision
+                        decision = strategy_decision
+                        confidence = 85  # Strategy-based trades get high confidence
+                        reason = f"Strategy '{strategy_name}' triggered: {triggered_strategies[0].get('logic')}"
                     
-                    # Save analysis with strategy info
-                    save_ai_analysis(symbol, decision, confidence, reason, market_state)
-                    log_market_state(decision, confidence, reason, market_state)
+                        # Save analysis with strategy info
+                        _log_pool.submit(save_analysis_and_log, symbol, decision, confidence, reason, market_state)
                 
-                # Execute if conditions are met
-                if decision in ["BUY", "SELL"]:
-                    confidence_threshold = 90 - risk_tolerance
+                    last_bar_key = bar_key
+                    last_decision = decision
+                
+                    # Execute if conditions are met
+                    if decision in ["BUY", "SELL"]:
+                        confidence_threshold = 90 - risk_tolerance
                     
-                    if confidence >= confidence_threshold:
-                        # Risk check
-                        is_safe = True
-                        if decision == "BUY" and market_state.get('rsi', 50) > 70:
-                            logger.warning("   RISK BLOCK: RSI too high for Buy")
-                            is_safe = False
-                        if decision == "SELL" and market_state.get('rsi', 50) < 30:
-                            logger.warning("   RISK BLOCK: RSI too low for Sell")
-                            is_safe = False
+                        if confidence >= confidence_threshold:
+                            # Risk check
+                            is_safe = True
+                            if decision == "BUY" and market_state.get('rsi', 50) > 70:
+                                logger.warning("   RISK BLOCK: RSI too high for Buy")
+                                is_safe = False
+                            if decision == "SELL" and market_state.get('rsi', 50) < 30:
+                                logger.warning("   RISK BLOCK: RSI too low for Sell")
+                                is_safe = False
                         
-                        if is_safe:
-                            should_execute = True
-                            ml_agrees = False
+                            if is_safe:
+                                should_execute = True
+                                ml_agrees = False
                             
-                            if strategy_name:
-                                logger.info(f"   STRATEGY TRADE: Executing based on user-defined strategy '{strategy_name}'")
-                            else:
-                                if ml_prediction:
-                                    ml_dir = ml_prediction.get('direction', 'UNKNOWN')
-                                    ml_agrees = (decision == "BUY" and ml_dir == "UP") or (decision == "SELL" and ml_dir == "DOWN")
+                                if strategy_name:
+                                    logger.info("   STRATEGY TRADE: Executing based on user-defined strategy '%s'", strategy_name)
+                                else:
+                                    if ml_prediction:
+                                        ml_dir = ml_prediction.get('direction', 'UNKNOWN')
+                                        ml_agrees = (decision == "BUY" and ml_dir == "UP") or (decision == "SELL" and ml_dir == "DOWN")
                                 
-                                if ml_prediction and not ml_agrees:
-                                    logger.warning(f"   CONFLICT: Gemini says {decision}, but ML predicts {ml_prediction.get('direction')}. Being conservative - waiting.")
-                                    log_message = f"Confluence check failed: Gemini {decision} vs ML {ml_prediction.get('direction')}. Waiting for alignment."
-                                    should_execute = False
+                                    if ml_prediction and not ml_agrees:
+                                        logger.warning("   CONFLICT: Gemini says %s, but ML predicts %s. Being conservative - waiting.", decision, ml_prediction.get('direction'))
+                                        log_message = f"Confluence check failed: Gemini {decision} vs ML {ml_prediction.get('direction')}. Waiting for alignment."
+                                        should_execute = False
                                     
-                                    try:
-                                        conn = get_db_connection()
-                                        if conn:
-                                            cur = conn.cursor()
-                                            cur.execute("""
-                                                INSERT INTO market_log (trend, structure, price, rsi, decision, confidence, reason)
-                                                VALUES (%s, %s, %s, %s, %s, %s, %s)
-                                            """, (
-                                                str(market_state.get('trend', 'Neutral')),
-                                                'Confluence-Check',
-                                                float(market_state.get('price', 0)),
-                                                float(market_state.get('rsi', 50)),
-                                                f"WAIT-CONFLICT",
-                                                int(confidence),
-                                                log_message
-                                            ))
-                                            conn.commit()
-                                            cur.close()
-                                            conn.close()
-                                    except Exception as log_err:
-                                        logger.error(f"Log error: {log_err}")
-                                else:
-                                    if ml_agrees:
-                                        logger.info(f"   CONFLUENCE DETECTED! ML and Gemini agree on {decision}")
+                                        _log_sentinel_event(
+                                            market_state, 'Confluence-Check',
+                                            "WAIT-CONFLICT", confidence, log_message
+                                        )
+                                    else:
+                                        if ml_agrees:
+                                            logger.info("   CONFLUENCE DETECTED! ML and Gemini agree on %s", decision)
                             
-                            if should_execute:
-                                try:
-                                    balance_data = client.get_balance()
-                                    available_usdt = 0
+                                if should_execute:
+                                    try:
+                                        available_usdt = client.get_cached_balance('USDT')
                                     
-                                    if balance_data:
-                                        if isinstance(balance_data, list):
-                                            for asset in balance_data:
-                                                if asset.get('coinName') == 'USDT':
-                                                    available_usdt = float(asset.get('available', 0))
-                                                    break
-                                        elif isinstance(balance_data, dict):
-                                            if balance_data.get('coinName') == 'USDT':
-                                                available_usdt = float(balance_data.get('available', 0))
+                                        if available_usdt is None:
+                                            # Balance cache not warm yet - ask WEEX directly
+                                            balances = await asyncio.wait_for(
+                                                _run_in_sentinel_pool(client.get_balance_map), SENTINEL_FETCH_TIMEOUT
+                                            )
+                                            usdt = balances.get('USDT', {})
+                                            available_usdt = float(usdt.get('available', 0))
                                     
-                                    position_size_usdt = min(max(available_usdt * 0.03, 5), 30)
+                                        position_size_usdt = min(max(available_usdt * 0.03, 5), 30)
                                     
-                                    current_price = float(market_state.get('price', 0))
-                                    if current_price > 0:
-                                        contract_size = position_size_usdt / current_price
-                                        contract_size = max(round(contract_size, 4), 0.001)
-                                        size = str(contract_size)
-                                    else:
-                                        size = "0.001"  
+                                        current_price = float(market_state.get('price', 0))
+                                        if current_price > 0:
+                                            contract_size = position_size_usdt / current_price
+                                            contract_size = max(round(contract_size, 4), 0.001)
+                                            size = str(contract_size)
+                                        else:
+                                            size = "0.001"  
                                     
-                                    logger.info(f"   Balance: {available_usdt:.2f} USDT | Position Size: {size} contracts (~{position_size_usdt:.2f} USDT)")
+                                        logger.info("   Balance: %.2f USDT | Position Size: %s contracts (~%.2f USDT)", available_usdt, size, position_size_usdt)
                                     
-                                    if available_usdt < 1:
-                                        logger.error(f"   INSUFFICIENT BALANCE: Only {available_usdt:.2f} USDT available. Skipping trade.")
-                                        log_message = f"INSUFFICIENT BALANCE: {available_usdt:.2f} USDT available. Need at least 1 USDT."
-                                        try:
-                                            conn = get_db_connection()
-                                            if conn:
-                                                cur = conn.cursor()
-                                                cur.execute("""
-                                                    INSERT INTO market_log (trend, structure, price, rsi, decision, confidence, reason)
-                                                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                                                """, (
-                                                    str(market_state.get('trend', 'Neutral')),
-                                                    'Balance-Check',
-                                                    float(market_state.get('price', 0)),
-                                                    float(market_state.get('rsi', 50)),
-                                                    "WAIT-INSUFFICIENT-BALANCE",
-                                                    0,
-                                                    log_message
-                                                ))
-                                                conn.commit()
-                                                cur.close()
-                                                conn.close()
-                                        except:
-                                            pass
-                                        time.sleep(30)
-                                        continue
+                                        if available_usdt < 1:
+                                            logger.error("   INSUFFICIENT BALANCE: Only %.2f USDT available. Skipping trade.", available_usdt)
+                                            log_message = f"INSUFFICIENT BALANCE: {available_usdt:.2f} USDT available. Need at least 1 USDT."
+                                            _log_sentinel_event(
+                                                market_state, 'Balance-Check',
+                                                "WAIT-INSUFFICIENT-BALANCE", 0, log_message
+                                            )
+                                            await _sentinel_sleep(30)
+                                            continue
                                     
-                                except Exception as balance_err:
-                                    logger.error(f"Balance check error: {balance_err}", exc_info=True)
-                                    logger.error(f"   Balance check error: {balance_err}. Using default size.")
-                                    size = "0.01"  
+                                    except Exception as balance_err:
+                                        logger.error("Balance check error: %s", balance_err, exc_info=True)
+                                        logger.error("   Balance check error: %s. Using default size.", balance_err)
+                                        size = "0.01"  
                                 
-                                # ============================================================
-                                # CRITICAL SAFETY INTEGRATION (Production Upgrade)
-                                # ============================================================
+                                    # ============================================================
+                                    # CRITICAL SAFETY INTEGRATION (Production Upgrade)
+                                    # ============================================================
                                 
-                                # STEP 1: Calculate ATR-based Stop Loss & Take Profit
-                                atr = market_state.get('volatility') or market_state.get('atr', current_price * 0.015)
-                                if decision == "BUY":
-                                    stop_loss = current_price - (atr * 1.5)  # 1.5R risk
-                                    take_profit = current_price + (atr * 2.0)  # 2.0R reward (1.33:1 R:R)
-                                    direction = "LONG"
-                                else:  # SELL
-                                    stop_loss = current_price + (atr * 1.5)
-                                    take_profit = current_price - (atr * 2.0)
-                                    direction = "SHORT"
+                                    # STEP 1: Calculate ATR-based Stop Loss & Take Profit
+                                    atr = market_state.get('volatility') or market_state.get('atr', current_price * 0.015)
+                                    if decision == "BUY":
+                                        stop_loss = current_price - (atr * 1.5)  # 1.5R risk
+                                        take_profit = current_price + (atr * 2.0)  # 2.0R reward (1.33:1 R:R)
+                                        direction = "LONG"
+                                    else:  # SELL
+                                        stop_loss = current_price + (atr * 1.5)
+                                        take_profit = current_price - (atr * 2.0)
+                                        direction = "SHORT"
                                 
-                                logger.info(f"   SL/TP calculated: Entry ${current_price:.2f}, SL ${stop_loss:.2f}, TP ${take_profit:.2f}, ATR ${atr:.4f}")
+                                    logger.info("   SL/TP calculated: Entry $%.2f, SL $%.2f, TP $%.2f, ATR $%.4f", current_price, stop_loss, take_profit, atr)
                                 
-                                # STEP 2: Check for duplicate positions (prevent stacking)
-                                if position_manager:
-                                    existing_pos = position_manager.get_position(symbol)
-                                    if existing_pos:
-                                        logger.warning(f"   ⚠️ Position already open for {symbol} - skipping to prevent duplicate")
-                                        logger.warning(f"   Position already open for {symbol} - skipping trade")
-                                        time.sleep(30)
-                                        continue
+                                    # STEP 2: Check for duplicate positions (prevent stacking)
+                                    if position_manager:
+                                        existing_pos = position_manager.get_position(symbol)
+                                        if existing_pos:
+                                            logger.warning("   ⚠️ Position already open for %s - skipping to prevent duplicate", symbol)
+                                            logger.warning("   Position already open for %s - skipping trade", symbol)
+                                            await _sentinel_sleep(30)
+                                            continue
                                 
-                                # STEP 3: Validate trade through Safety Layer
-                                if safety_layer:
-                                    try:
-                                        # Calculate margin required
-                                        leverage = 20  # Default leverage
-                                        position_value = float(size) * current_price
-                                        margin_required = position_value / leverage
+                                    # STEP 3: Validate trade through Safety Layer
+                                    if safety_layer:
+                                        try:
+                                            # Calculate margin required
+                                            leverage = 20  # Default leverage
+                                            position_value = float(size) * current_price
+                                            margin_required = position_value / leverage
                                         
-                                        # Get current positions for safety checks
-                                        current_positions = []
-                                        if position_manager:
-                                            current_positions = [
-                                                {
-                                                    "symbol": p.symbol,
-                                                    "margin_used": p.margin_used,
-                                                    "direction": p.direction
-                                                }
-                                                for p in position_manager.get_all_positions()
-                                            ]
+                                            # Get current positions for safety checks
+                                            current_positions = []
+                                            if position_manager:
+                                                current_positions = [
+                                                    {
+                                                        "symbol": p.symbol,
+                                                        "margin_used": p.margin_used,
+                                                        "direction": p.direction
+                                                    }
+                                                    for p in position_manager.get_all_positions()
+                                                ]
                                         
-                                        # Run all 10 safety checks
-                                        can_execute, safety_results = safety_layer.validate_trade(
-                                            symbol=symbol,
-                                            direction=direction,
-                                            size=float(size),
-                                            entry_price=current_price,
-                                            stop_loss=stop_loss,
-                                            take_profit=take_profit,
-                                            leverage=leverage,
-                                            margin_required=margin_required,
-                                            current_positions=current_positions
-                                        )
+                                            # Run all 10 safety checks
+                                            can_execute, safety_results = safety_layer.validate_trade(
+                                                symbol=symbol,
+                                                direction=direction,
+                                                size=float(size),
+                                                entry_price=current_price,
+                                                stop_loss=stop_loss,
+                                                take_profit=take_profit,
+                                                leverage=leverage,
+                                                margin_required=margin_required,
+                                                current_positions=current_positions
+                                            )
                                         
-                                        if not can_execute:
-                                            logger.warning(f"   🚫 Trade REJECTED by Safety Layer")
-                                            failed_checks = [r.check_name for r in safety_results if not r.passed and r.severity == "CRITICAL"]
-                                            logger.error(f"   Safety checks failed: {', '.join(failed_checks)}")
-                                            time.sleep(30)
+                                            if not can_execute:
+                                                logger.warning("   🚫 Trade REJECTED by Safety Layer")
+                                                failed_checks = [r.check_name for r in safety_results if not r.passed and r.severity == "CRITICAL"]
+                                                logger.error("   Safety checks failed: %s", ', '.join(failed_checks))
+                                                await _sentinel_sleep(30)
+                                                continue
+                                            else:
+                                                logger.info("   ✅ Trade APPROVED by Safety Layer")
+                                        except Exception as safety_err:
+                                            logger.error("Safety layer validation failed: %s", safety_err, exc_info=True)
+                                            logger.error("   Safety validation error - aborting trade for safety")
+                                            await _sentinel_sleep(30)
                                             continue
-                                        else:
-                                            logger.info(f"   ✅ Trade APPROVED by Safety Layer")
-                                    except Exception as safety_err:
-                                        logger.error(f"Safety layer validation failed: {safety_err}", exc_info=True)
-                                        logger.error(f"   Safety validation error - aborting trade for safety")
-                                        time.sleep(30)
-                                        continue
                                 
-                                # STEP 4: Execute order on WEEX
-                                logger.info(f"   AUTO-EXECUTING {decision} ORDER...")
-                                side = "buy" if decision == "BUY" else "sell"
-                                order_res = client.place_order(side=side, size=size, symbol=symbol)
+                                    # STEP 4: Execute order on WEEX
+                                    logger.info("   AUTO-EXECUTING %s ORDER...", decision)
+                                    side = "buy" if decision == "BUY" else "sell"
+                                    order_res = await asyncio.to_thread(client.place_order, side=side, size=size, symbol=symbol)
                                 
-                                if order_res and (order_res.get("code") == "00000" or order_res.get("order_id")):
-                                    logger.info(f"   Trade Executed Successfully!")
-                                    # Extract order_id from response (can be in data.orderId or directly as order_id)
-                                    if isinstance(order_res.get("data"), dict) and order_res.get("data", {}).get("orderId"):
-                                        order_id = str(order_res.get("data", {}).get("orderId"))
-                                    elif order_res.get("order_id"):
-                                        order_id = str(order_res.get("order_id"))
-                                    else:
-                                        order_id = "unknown"
+                                    if order_res and (order_res.get("code") == "00000" or order_res.get("order_id")):
+                                        logger.info("   Trade Executed Successfully!")
+                                        # Extract order_id from response (can be in data.orderId or directly as order_id)
+                                        if isinstance(order_res.get("data"), dict) and order_res.get("data", {}).get("orderId"):
+                                            order_id = str(order_res.get("data", {}).get("orderId"))
+                                        elif order_res.get("order_id"):
+                                            order_id = str(order_res.get("order_id"))
+                                        else:
+                                            order_id = "unknown"
                                     
-                                    # Upload AI log to WEEX for compliance
-                                    try:
-                                        # Use 'reason' variable which is defined in the scope
-                                        reasoning_text = reason if 'reason' in locals() else f"Strategy '{strategy_name}' triggered" if strategy_name else "Auto-trade decision"
+                                        # Upload AI log to WEEX for compliance
+                                        try:
+                                            # Use 'reason' variable which is defined in the scope
+                                            reasoning_text = reason if 'reason' in locals() else f"Strategy '{strategy_name}' triggered" if strategy_name else "Auto-trade decision"
                                         
-                                        ai_log_input = {
-                                            "market_data": {
-                                                "symbol": symbol,
-                                                "price": float(market_state.get('price', 0)),
-                                                "rsi": float(market_state.get('rsi', 50)),
-                                                "trend": str(market_state.get('trend', 'Neutral')),
-                                                "volume": market_state.get('volume', 0)
-                                            },
-                                            "ml_prediction": ml_prediction if ml_prediction else {},
-                                            "sentiment": sentiment if sentiment else {},
-                                            "prompt": f"Analyze {symbol} market data and provide trading decision"
-                                        }
+                                            ai_log_input = {
+                                                "market_data": {
+                                                    "symbol": symbol,
+                                                    "price": float(market_state.get('price', 0)),
+                                                    "rsi": float(market_state.get('rsi', 50)),
+                                                    "trend": str(market_state.get('trend', 'Neutral')),
+                                                    "volume": market_state.get('volume', 0)
+                                                },
+                                                "ml_prediction": ml_prediction if ml_prediction else {},
+                                                "sentiment": sentiment if sentiment else {},
+                                                "prompt": f"Analyze {symbol} market data and provide trading decision"
+                                            }
                                         
-                                        ai_log_output = {
-                                            "decision": decision,
-                                            "confidence": confidence,
-                                            "reasoning": reasoning_text[:500] if reasoning_text else "",
-                                            "ml_agrees": ml_agrees,
-                                            "strategy": strategy_name or "Hybrid Auto-Trade"
-                                        }
+                                            ai_log_output = {
+                                                "decision": decision,
+                                                "confidence": confidence,
+                                                "reasoning": reasoning_text[:500] if reasoning_text else "",
+                                                "ml_agrees": ml_agrees,
+                                                "strategy": strategy_name or "Hybrid Auto-Trade"
+                                            }
                                         
-                                        explanation = f"AI analyzed {symbol} with RSI {market_state.get('rsi', 50):.1f}, trend {market_state.get('trend', 'Neutral')}. Decision: {decision} with {confidence}% confidence. ML model {('agreed' if ml_agrees else 'disagreed')}. Reasoning: {reasoning_text[:400] if reasoning_text else 'N/A'}"
+                                            explanation = f"AI analyzed {symbol} with RSI {market_state.get('rsi', 50):.1f}, trend {market_state.get('trend', 'Neutral')}. Decision: {decision} with {confidence}% confidence. ML model {('agreed' if ml_agrees else 'disagreed')}. Reasoning: {reasoning_text[:400] if reasoning_text else 'N/A'}"
                                         
-                                        client.upload_ai_log(
-                                            order_id=order_id,
-                                            stage="Decision Making",
-                                            model="Gemini-2.0-Flash-Thinking",
-                                            input_data=ai_log_input,
-                                            output_data=ai_log_output,
-                                            explanation=explanation
-                                        )
-                                        logger.info(f"   AI Log uploaded for order {order_id}")
-                                    except Exception as ai_log_err:
-                                        logger.error(f"   AI Log upload failed: {ai_log_err}")
-                                        import traceback
-                                        traceback.print_exc()
-                                    current_price = float(market_state.get('price', 0))
-                                    confluence_note = " [CONFLUENCE]" if ml_agrees else ""
-                                    log_message = f"AUTO-EXECUTED {decision} on {symbol}{confluence_note} | Confidence: {confidence}% | ML: {ml_prediction.get('direction') if ml_prediction else 'N/A'} | Sentiment: {sentiment.get('label')} | Order ID: {order_id}"
-                                    
-                                    from core.db_manager import save_trade, update_or_create_position, get_trade_history
-                                    
-                                    notes_parts = []
-                                    if strategy_name:
-                                        notes_parts.append(f"Strategy: {strategy_name}")
-                                    else:
-                                        notes_parts.append(f"Hybrid Auto-trade: {decision} at {confidence}%")
-                                    notes_parts.append(f"ML: {ml_prediction.get('direction') if ml_prediction else 'N/A'}")
-                                    notes_parts.append(f"Sentiment: {sentiment.get('label')}")
+                                            _log_pool.submit(
+                                                client.upload_ai_log,
+                                                order_id=order_id,
+                                                stage="Decision Making",
+                                                model="Gemini-2.0-Flash-Thinking",
+                                                input_data=ai_log_input,
+                                                output_data=ai_log_output,
+                                                explanation=explanation
+                                            ).add_done_callback(_on_ai_log_uploaded)
+                                            logger.info("   AI Log upload queued for order %s", order_id)
+                                        except Exception as ai_log_err:
+                                            logger.error("   AI Log upload failed: %s", ai_log_err)
+                                            traceback.print_exc()
+                                        current_price = float(market_state.get('price', 0))
+                                        confluence_note = " [CONFLUENCE]" if ml_agrees else ""
+                                        log_message = f"AUTO-EXECUTED {decision} on {symbol}{confluence_note} | Confidence: {confidence}% | ML: {ml_prediction.get('direction') if ml_prediction else 'N/A'} | Sentiment: {sentiment.get('label')} | Order ID: {order_id}"
                                     
-                                    # Calculate position value in USDT for tracking
-                                    position_value_usdt = float(size) * current_price
+                                        notes_parts = []
+                                        if strategy_name:
+                                            notes_parts.append(f"Strategy: {strategy_name}")
+                                        else:
+                                            notes_parts.append(f"Hybrid Auto-trade: {decision} at {confidence}%")
+                                        notes_parts.append(f"ML: {ml_prediction.get('direction') if ml_prediction else 'N/A'}")
+                                        notes_parts.append(f"Sentiment: {sentiment.get('label')}")
                                     
-                                    save_trade({
-                                        "symbol": symbol,
-                                        "side": side,
-                                        "size": float(size),
-                                        "price": current_price,
-                                        "order_id": order_id,
-                                        "order_type": "market",
-                                        "status": "filled",
-                                        "notes": " | ".join(notes_parts) + f" | Position Value: ${position_value_usdt:.2f}"
-                                    })
+                                        # Calculate position value in USDT for tracking
+                                        position_value_usdt = float(size) * current_price
                                     
-                                    # Check profitable trades count
-                                    try:
-                                        all_trades = get_trade_history(limit=1000)
-                                        profitable_trades = [t for t in all_trades if t.get('pnl') and float(t.get('pnl', 0)) > 0]
-                                        profitable_count = len(profitable_trades)
-                                        logger.info(f"   Profitable Trades: {profitable_count}/15 required")
-                                    except Exception as profitable_err:
-                                        logger.error(f"Failed to count profitable trades: {profitable_err}", exc_info=True)
+                                        trade_record = {
+                                            "symbol": symbol,
+                                            "side": side,
+                                            "size": float(size),
+                                            "price": current_price,
+                                            "order_id": order_id,
+                                            "order_type": "market",
+                                            "status": "filled",
+                                            "notes": " | ".join(notes_parts) + f" | Position Value: ${position_value_usdt:.2f}"
+                                        }
+                                        position_record = {
+                                            "symbol": symbol,
+                                            "side": side,
+                                            "size": float(size),
+                                            "entry_price": current_price,
+                                            "current_price": current_price,
+                                            "unrealized_pnl": 0,
+                                            "leverage": leverage,
+                                            "order_id": order_id
+                                        }
                                     
-                                    update_or_create_position({
-                                        "symbol": symbol,
-                                        "side": side,
-                                        "size": float(size),
-                                        "entry_price": current_price,
-                                        "current_price": current_price,
-                                        "unrealized_pnl": 0,
-                                        "leverage": leverage,
-                                        "order_id": order_id
-                                    })
+                                        # ============================================================
+                                        # CRITICAL: Register position with Position Manager
+                                        # Trade row, position row and the manager's own sync share one transaction
+                                        # ============================================================
+                                        if position_manager:
+                                            try:
+                                                success = await asyncio.to_thread(
+                                                    record_filled_trade, trade_record, position_record,
+                                                    lambda conn: position_manager.open_position(
+                                                        symbol=symbol,
+                                                        side=side,
+                                                        direction=direction,
+                                                        size=float(size),
+                                                        entry_price=current_price,
+                                                        stop_loss=stop_loss,
+                                                        take_profit=take_profit,
+                                                        leverage=leverage,
+                                                        margin_used=margin_required,
+                                                        atr=atr,
+                                                        order_id=order_id,
+                                                        source="SENTINEL",
+                                                        metadata={
+                                                            "ml_prediction": ml_prediction,
+                                                            "sentiment": sentiment,
+                                                            "confidence": confidence,
+                                                            "strategy": strategy_name
+                                                        },
+                                                        conn=conn
+                                                    )
+                                                )
+                                                if success:
+                                                    logger.info("   ✅ Position registered with Position Manager - automatic SL/TP monitoring active")
+                                                else:
+                                                    logger.error("   ❌ Failed to register position with Position Manager")
+                                            except Exception as pm_err:
+                                                logger.error("Position Manager registration failed: %s", pm_err, exc_info=True)
+                                        else:
+                                            await asyncio.to_thread(record_filled_trade, trade_record, position_record)
+                                            logger.warning("   ⚠️ Position Manager not available - no automatic SL/TP monitoring")
                                     
-                                    # ============================================================
-                                    # CRITICAL: Register position with Position Manager
-                                    # ============================================================
-                                    if position_manager:
+                                        # Check profitable trades count
                                         try:
-                                            success = position_manager.open_position(
-                                                symbol=symbol,
-                                                side=side,
-                                                direction=direction,
-                                                size=float(size),
-                                                entry_price=current_price,
-                                                stop_loss=stop_loss,
-                                                take_profit=take_profit,
-                                                leverage=leverage,
-                                                margin_used=margin_required,
-                                                atr=atr,
-                                                order_id=order_id,
-                                                source="SENTINEL",
-                                                metadata={
-                                                    "ml_prediction": ml_prediction,
-                                                    "sentiment": sentiment,
-                                                    "confidence": confidence,
-                                                    "strategy": strategy_name
-                                                }
-                                            )
-                                            if success:
-                                                logger.info(f"   ✅ Position registered with Position Manager - automatic SL/TP monitoring active")
-                                            else:
-                                                logger.error(f"   ❌ Failed to register position with Position Manager")
-                                        except Exception as pm_err:
-                                            logger.error(f"Position Manager registration failed: {pm_err}", exc_info=True)
+                                            profitable_count = await asyncio.to_thread(count_profitable_trades)
+                                            logger.info("   Profitable Trades: %s/15 required", profitable_count)
+                                        except Exception as profitable_err:
+                                            logger.error("Failed to count profitable trades: %s", profitable_err, exc_info=True)
                                     else:
-                                        logger.warning(f"   ⚠️ Position Manager not available - no automatic SL/TP monitoring")
-                                else:
-                                    logger.error(f"   Trade Failed: {order_res.get('msg', 'Unknown error')}")
-                                    log_message = f"AUTO-TRADE FAILED: {decision} on {symbol} | Error: {order_res.get('msg', 'Unknown')}"
+                                        logger.error("   Trade Failed: %s", order_res.get('msg', 'Unknown error'))
+                                        log_message = f"AUTO-TRADE FAILED: {decision} on {symbol} | Error: {order_res.get('msg', 'Unknown')}"
                                 
-                                # Log the trade attempt
-                                try:
-                                    conn = get_db_connection()
-                                    if conn:
-                                        cur = conn.cursor()
-                                        cur.execute("""
-                                            INSERT INTO market_log (trend, structure, price, rsi, decision, confidence, reason)
-                                            VALUES (%s, %s, %s, %s, %s, %s, %s)
-                                        """, (
-                                            str(market_state.get('trend', 'Neutral')),
-                                            'Auto-Trade',
-                                            float(market_state.get('price', 0)),
-                                            float(market_state.get('rsi', 50)),
-                                            f"AUTO-{decision}",
-                                            int(confidence),
-                                            log_message
-                                        ))
-                                        conn.commit()
-                                        cur.close()
-                                        conn.close()
-                                except Exception as log_err:
-                                    logger.error(f"Log error: {log_err}")
-                    else:
-                        if confidence < confidence_threshold:
-                            logger.info(f"   Confidence {confidence}% below threshold {confidence_threshold}%")
+                                    # Log the trade attempt
+                                    _log_sentinel_event(
+                                        market_state, 'Auto-Trade',
+                                        f"AUTO-{decision}", confidence, log_message
+                                    )
                         else:
-                            logger.info("   Market Indecisive - No Action")
-        except Exception as e:
-            logger.error(f"Sentinel Loop Error: {e}", exc_info=True)
+                            if confidence < confidence_threshold:
+                                logger.info("   Confidence %s%% below threshold %s%%", confidence, confidence_threshold)
+                            else:
+                                logger.info("   Market Indecisive - No Action")
+            except Exception as e:
+                logger.error("Sentinel Loop Error: %s", e, exc_info=True)
         
-        time.sleep(30)  # Wait 30 seconds before next scan
+            await _sentinel_sleep(30, market_stream.bar_closed)  # Next scan in 30 seconds, or as soon as a bar closes
+    finally:
+        market_stream_task.cancel()
+        client.stop_balance_stream()
+        _shutdown_cpu_pool()
 
 def start_sentinel():
     """Start the background sentinel service."""
-    global sentinel_running, sentinel_thread, active_trading_mode, position_manager
+    global sentinel_running, sentinel_task, active_trading_mode, position_manager
     
     with trading_mode_lock:
         # Check for conflicts
@@ -625,6 +951,10 @@ def start_sentinel():
             raise Exception("Trading conflict: Institutional system is already running. Stop it first.")
         
         if not sentinel_running:
+            if main_event_loop is None:
+                logger.error("❌ Cannot start Sentinel: event loop not available yet")
+                return
+            
             sentinel_running = True
             active_trading_mode = "SENTINEL"
             
@@ -638,8 +968,10 @@ def start_sentinel():
                 except Exception as pm_err:
                     logger.error(f"Failed to start Position Manager monitoring: {pm_err}", exc_info=True)
             
-            sentinel_thread = threading.Thread(target=sentinel_loop, daemon=True)
-            sentinel_thread.start()
+            main_event_loop.call_soon_threadsafe(sentinel_stop_event.clear)
+            # A previous task that is still winding down simply picks the flag back up
+            if sentinel_task is None or sentinel_task.done():
+                sentinel_task = asyncio.run_coroutine_threadsafe(sentinel_loop(), main_event_loop)
             logger.info("✅ Sentinel service started")
 
 def stop_sentinel():
@@ -648,6 +980,8 @@ def stop_sentinel():
     
     with trading_mode_lock:
         sentinel_running = False
+        if main_event_loop is not None:
+            main_event_loop.call_soon_threadsafe(sentinel_stop_event.set)
         if active_trading_mode == "SENTINEL":
             active_trading_mode = None
         logger.info("🛑 Sentinel service stopped")
@@ -681,7 +1015,6 @@ def get_ai_status():
     Returns the status of the AI service (Gemini availability, quota status, etc.)
     """
     from core.llm_brain import quota_exceeded_until, api_call_count, MAX_DAILY_CALLS
-    from datetime import datetime
     
     status = {
         "available": True,
@@ -692,11 +1025,13 @@ def get_ai_status():
     }
     
     if quota_exceeded_until:
-        if datetime.now() < quota_exceeded_until:
+        remaining = quota_exceeded_until - time.monotonic()
+        if remaining > 0:
             status["available"] = False
             status["using_fallback"] = True
             status["quota_exceeded"] = True
-            status["cooldown_until"] = quota_exceeded_until.isoformat()
+            # The deadline is on the monotonic clock; report it as wall-clock time
+            status["cooldown_until"] = (datetime.now() + timedelta(seconds=remaining)).isoformat()
         else:
             # Cooldown expired
             status["available"] = True
@@ -712,58 +1047,68 @@ def get_ai_status():
 def get_watchlist():
     """
     Fetches LIVE real-time prices + 24h data for the sidebar assets from Binance.
+    Cached for WATCHLIST_CACHE_TTL seconds.
     """
-    import requests
-    
-    # Official Futures Symbols on Weex
-    symbols = [
-        "cmt_btcusdt", "cmt_ethusdt", "cmt_solusdt", 
-        "cmt_dogeusdt", "cmt_xrpusdt", "cmt_bnbusdt", 
-        "cmt_adausdt", "cmt_ltcusdt"
-    ]
-    
+    return _cached_response(_watchlist_cache, "watchlist", _load_watchlist, cacheable=_watchlist_complete)
+
+def _watchlist_complete(watchlist):
+    return len(watchlist) == len(WATCHLIST_SYMBOLS)
+
+def _load_watchlist():
+    watchlist = _fetch_watchlist()
+    if not _watchlist_complete(watchlist) and _watchlist_refresh_lock.acquire(blocking=False):
+        _refresh_pool.submit(_refresh_watchlist)
+    return watchlist
+
+def _refresh_watchlist():
+    """Re-fetches the tickers after a partial watchlist and caches the result once every price is back."""
+    try:
+        time.sleep(WATCHLIST_REFRESH_DELAY)
+        watchlist = _fetch_watchlist()
+        if _watchlist_complete(watchlist):
+            with _response_cache_lock:
+                _watchlist_cache["watchlist"] = watchlist
+    except Exception as e:
+        print(f"Watchlist Refresh Error: {e}")
+    finally:
+        _watchlist_refresh_lock.release()
+
+def _fetch_watchlist():
+    """Priced watchlist rows; symbols without a ticker are left out ([] when the batch call fails)."""
     watchlist = []
     
     try:
-        # Fetch 24h ticker data from Binance (includes price, change, high, low, volume)
-        for sym in symbols:
-            binance_symbol = sym.upper().replace("CMT_", "").replace("USDT", "USDT")
+        # Fetch 24h ticker data for every symbol in one Binance call (price, change, high, low, volume)
+        tickers = {}
+        try:
+            binance_symbols = [sym.upper().replace("CMT_", "") for sym in WATCHLIST_SYMBOLS]
+            response = _http.get(
+                "https://api.binance.com/api/v3/ticker/24hr",
+                params={"symbols": json.dumps(binance_symbols, separators=(",", ":"))},
+                timeout=3
+            )
+            data = response.json()
+            if isinstance(data, list):
+                tickers = {ticker.get("symbol"): ticker for ticker in data}
+        except (requests.RequestException, ValueError) as ticker_err:
+            print(f"Watchlist ticker batch failed: {ticker_err}")
+        
+        for sym in WATCHLIST_SYMBOLS:
+            ticker = tickers.get(sym.upper().replace("CMT_", ""), {})
             
             try:
-                # Binance 24h Ticker endpoint
-                response = requests.get(
-                    f"https://api.binance.com/api/v3/ticker/24hr?symbol={binance_symbol}",
-                    timeout=3
-                )
-                ticker = response.json()
-                
-                if "lastPrice" in ticker:
-                    watchlist.append({
-                        "symbol": sym.upper().replace("CMT_", "").replace("USDT", "/USDT"),
-                        "raw_symbol": sym,
-                        "price": float(ticker["lastPrice"]),
-                        "change": round(float(ticker["priceChangePercent"]), 2),
-                        "volume24h": float(ticker["quoteVolume"]),
-                        "high24h": float(ticker["highPrice"]),
-                        "low24h": float(ticker["lowPrice"])
-                    })
-            except:
-                # Fallback: use candle data if ticker fails
-                raw = client.fetch_candles(sym, limit=1)
-                if raw and len(raw) > 0:
-                    current_price = float(raw[-1][4])
-                    open_price = float(raw[-1][1])
-                    change_pct = ((current_price - open_price) / open_price) * 100
-                    
-                    watchlist.append({
-                        "symbol": sym.upper().replace("CMT_", "").replace("USDT", "/USDT"),
-                        "raw_symbol": sym,
-                        "price": current_price,
-                        "change": round(change_pct, 2),
-                        "volume24h": 0,
-                        "high24h": 0,
-                        "low24h": 0
-                    })
+                watchlist.append({
+                    "symbol": sym.upper().replace("CMT_", "").replace("USDT", "/USDT"),
+                    "raw_symbol": sym,
+                    "price": float(ticker["lastPrice"]),
+                    "change": round(float(ticker["priceChangePercent"]), 2),
+                    "volume24h": float(ticker["quoteVolume"]),
+                    "high24h": float(ticker["highPrice"]),
+                    "low24h": float(ticker["lowPrice"])
+                })
+            except (KeyError, TypeError, ValueError):
+                # No ticker for this symbol: leave it out until the background refresh lands
+                continue
         
         return watchlist
     except Exception as e:
@@ -774,25 +1119,15 @@ def get_watchlist():
 def get_candles(symbol: str = "cmt_btcusdt", interval: str = "15m"):
     """
     Fetches OHLC data for the TradingView Chart.
+    Cached per (symbol, interval) for a tenth of the interval (max 60s).
     """
+    return _cached_response(_candles_cache, (symbol, interval), lambda: _load_candles(symbol, interval))
+
+def _load_candles(symbol, interval):
     try:
-        # Fetch 500 candles (15m timeframe default)
-        raw_data = client.fetch_candles(symbol=symbol, limit=500, interval=interval)
-        
-        formatted_data = []
-        if raw_data:
-            # Sort Oldest -> Newest
-            raw_data.sort(key=lambda x: x[0])
-            
-            for c in raw_data:
-                formatted_data.append({
-                    "time": int(c[0] / 1000), # Unix Timestamp
-                    "open": float(c[1]),
-                    "high": float(c[2]),
-                    "low": float(c[3]),
-                    "close": float(c[4])
-                })
-        return formatted_data
+        # Fetch 500 candles (15m timeframe default), sorted Oldest -> Newest
+        candles = client.fetch_candle_set(symbol=symbol, limit=500, interval=interval)
+        return candles.to_tradingview() if candles else []
     except Exception as e:
         print(f"Candle Error: {e}")
         return []
@@ -803,52 +1138,33 @@ def chat_with_chartor(request: ChatRequest):
     Enhanced chat with Chartor AI - includes real-time market data context.
     """
     try:
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
+        genai_client = llm_brain.client
+        if genai_client is None:
             return {"response": "Error: GEMINI_API_KEY not found in .env"}
+        
+        # Don't build market context (candles, ML fit, sentiment) for a call that can't be made
+        if gemini_quota_exhausted():
+            return {"response": "Chartor AI has reached its Gemini quota for now. Live charts, signals and the fallback analysis engine are still running - please try the chat again later."}
 
-        model_name = os.getenv("GEMINI_CHAT_MODEL", "gemini-flash-latest")
-        client = genai.Client(api_key=api_key)
+        model_name = GEMINI_CHAT_MODEL
         
         # Extract symbol from user message if mentioned, otherwise use default
         user_message = request.message.lower()
-        symbol_to_analyze = "cmt_btcusdt"  # Default
-        
-        # Try to detect symbol in message
-        symbol_map = {
-            "btc": "cmt_btcusdt", "bitcoin": "cmt_btcusdt",
-            "eth": "cmt_ethusdt", "ethereum": "cmt_ethusdt",
-            "sol": "cmt_solusdt", "solana": "cmt_solusdt",
-            "doge": "cmt_dogeusdt", "dogecoin": "cmt_dogeusdt",
-            "xrp": "cmt_xrpusdt", "ripple": "cmt_xrpusdt",
-            "bnb": "cmt_bnbusdt", "binance": "cmt_bnbusdt",
-            "ada": "cmt_adausdt", "cardano": "cmt_adausdt",
-            "ltc": "cmt_ltcusdt", "litecoin": "cmt_ltcusdt"
-        }
-        
-        for key, val in symbol_map.items():
-            if key in user_message:
-                symbol_to_analyze = val
-                break
+        # Try to detect symbol in message, otherwise default to BTC
+        match = _SYMBOL_PATTERN.search(user_message)
+        symbol_to_analyze = _KEYWORD_TO_SYMBOL[match.group(1)] if match else "cmt_btcusdt"
         
         # Fetch real-time market data
-        from core.weex_api import WeexClient
-        from core.analysis import analyze_market_structure
-        from core.ml_analyst import MLAnalyst
-        from core.sentiment import analyze_market_sentiment
-        
         market_context = ""
         try:
-            weex_client = WeexClient()
-            candles = weex_client.fetch_candles(symbol=symbol_to_analyze, limit=500)
+            candles = client.fetch_candle_set(symbol=symbol_to_analyze, limit=500)
             
             if candles and len(candles) >= 100:
                 # Technical Analysis
                 market_state = analyze_market_structure(candles)
                 
-                # ML Prediction
-                ml_analyst = MLAnalyst()
-                ml_trained = ml_analyst.train_model(candles)
+                # ML Prediction (model reused while the bar is unchanged)
+                ml_analyst, ml_trained = _get_trained_analyst(symbol_to_analyze, candles)
                 ml_direction, ml_confidence = ml_analyst.predict_next_move(market_state) if ml_trained else ("UNKNOWN", 0)
                 
                 # Sentiment
@@ -911,10 +1227,9 @@ USER QUESTION: {request.message}
 
 Provide a detailed, accurate response using the market data above. If specific numbers are provided, use them in your answer."""
         
-        response = client.models.generate_content(model=model_name, contents=full_prompt)
+        response = genai_client.models.generate_content(model=model_name, contents=full_prompt)
         return {"response": response.text}
     except Exception as e:
-        import traceback
         traceback.print_exc()
         return {"response": f"AI Error: {str(e)}"}
 
@@ -928,26 +1243,22 @@ def trigger_analysis(
     Accepts symbol from request body (JSON) or query parameter.
     """
     try:
-        from core.weex_api import WeexClient
-        from core.analysis import analyze_market_structure
         from core.llm_brain import get_trading_decision
-        from core.db_manager import save_ai_analysis, log_market_state
+        from core.db_manager import save_analysis_and_log
+        
+        # One settings read covers the symbol fallback and the auto-trade check below
+        try:
+            settings = _cached_settings_row()
+        except Exception as settings_err:
+            print(f"Settings lookup error: {settings_err}")
+            settings = None
         
         # Get symbol from request body or query param
         if request and hasattr(request, 'symbol') and request.symbol:
             symbol = request.symbol
         elif not symbol:
             # Try to get from current settings
-            conn = get_db_connection()
-            if conn:
-                cur = conn.cursor()
-                cur.execute("SELECT current_symbol FROM trade_settings LIMIT 1")
-                settings = cur.fetchone()
-                cur.close()
-                conn.close()
-                symbol = settings["current_symbol"] if settings else "cmt_btcusdt"
-            else:
-                symbol = "cmt_btcusdt"
+            symbol = settings["current_symbol"] if settings else "cmt_btcusdt"
         
         if not symbol:
             return {"status": "error", "msg": "Symbol is required"}
@@ -955,59 +1266,50 @@ def trigger_analysis(
         print(f"Triggering hybrid ML analysis for {symbol}...")
         
         # Fetch market data (get more for ML training)
-        client = WeexClient()
-        candles = client.fetch_candles(symbol=symbol, limit=500)
+        candles = client.fetch_candle_set(symbol=symbol, limit=500)
         
         if not candles or len(candles) < 100:
             return {"status": "error", "msg": "Not enough market data for ML analysis"}
         
-        # STEP 1: Train Local ML Model
-        from core.ml_analyst import MLAnalyst
-        from core.sentiment import analyze_market_sentiment
-        
-        ml_analyst = MLAnalyst()
-        ml_trained = ml_analyst.train_model(candles)
-        
-        # STEP 2: Technical Analysis
+        # STEP 1: Technical Analysis
         market_state = analyze_market_structure(candles)
         if not market_state:
             return {"status": "error", "msg": "Analysis failed"}
         
-        # STEP 3: Get Local ML Prediction
-        ml_direction, ml_confidence = ml_analyst.predict_next_move(market_state)
-        ml_prediction = {"direction": ml_direction, "confidence": ml_confidence} if ml_trained else None
-        
-        # STEP 4: Get Market Sentiment
-        symbol_clean = symbol.replace("cmt_", "").replace("usdt", "").upper()
-        sent_label, sent_score = analyze_market_sentiment(symbol_clean)
-        sentiment = {"label": sent_label, "score": sent_score}
-        
-        # STEP 5: Hybrid Decision - Get AI decision with all inputs
-        ai_result = get_trading_decision(
-            market_state, 
-            symbol=symbol,
-            ml_prediction=ml_prediction,
-            sentiment=sentiment
-        )
+        if gemini_quota_exhausted():
+            # Gemini would be skipped anyway; don't spend an ML fit and a sentiment lookup on it
+            print("Gemini quota exhausted. Using fallback engine.")
+            ai_result = get_fallback_decision(market_state)
+        else:
+            # STEP 2: Train Local ML Model (reused while the bar is unchanged) and predict
+            ml_analyst, ml_trained = _get_trained_analyst(symbol, candles)
+            ml_direction, ml_confidence = ml_analyst.predict_next_move(market_state)
+            ml_prediction = {"direction": ml_direction, "confidence": ml_confidence} if ml_trained else None
+            
+            # STEP 3: Get Market Sentiment
+            symbol_clean = symbol.replace("cmt_", "").replace("usdt", "").upper()
+            sent_label, sent_score = analyze_market_sentiment(symbol_clean)
+            sentiment = {"label": sent_label, "score": sent_score}
+            
+            # STEP 4: Hybrid Decision - Get AI decision with all inputs
+            ai_result = get_trading_decision(
+                market_state, 
+                symbol=symbol,
+                ml_prediction=ml_prediction,
+                sentiment=sentiment,
+                service_tier="priority"
+            )
         decision = ai_result.get("decision", "WAIT")
         confidence = ai_result.get("confidence", 0)
         reasoning = ai_result.get("reasoning", "No analysis available")
         
         # Save to database
-        save_ai_analysis(symbol, decision, confidence, reasoning, market_state)
-        log_market_state(decision, confidence, reasoning, market_state)
+        save_analysis_and_log(symbol, decision, confidence, reasoning, market_state)
         
         # Check if auto-trading is enabled and execute if conditions are met
         auto_execute = False
         try:
-            conn = get_db_connection()
-            if conn:
-                cur = conn.cursor()
-                cur.execute("SELECT auto_trading, risk_tolerance FROM trade_settings LIMIT 1")
-                settings = cur.fetchone()
-                cur.close()
-                conn.close()
-                
+            if settings:
                 if settings and settings.get("auto_trading"):
                     risk_tolerance = settings.get("risk_tolerance", 20)
                     confidence_threshold = 90 - risk_tolerance
@@ -1031,24 +1333,15 @@ def trigger_analysis(
                             
                             # Log the auto-trade
                             try:
-                                conn = get_db_connection()
-                                if conn:
-                                    cur = conn.cursor()
-                                    cur.execute("""
-                                        INSERT INTO market_log (trend, structure, price, rsi, decision, confidence, reason)
-                                        VALUES (%s, %s, %s, %s, %s, %s, %s)
-                                    """, (
-                                        str(market_state.get('trend', 'Neutral')),
-                                        'Auto-Trade',
-                                        float(market_state.get('price', 0)),
-                                        float(market_state.get('rsi', 50)),
-                                        f"AUTO-{decision}",
-                                        int(confidence),
-                                        log_message
-                                    ))
-                                    conn.commit()
-                                    cur.close()
-                                    conn.close()
+                                queue_market_log((
+                                    str(market_state.get('trend', 'Neutral')),
+                                    'Auto-Trade',
+                                    float(market_state.get('price', 0)),
+                                    float(market_state.get('rsi', 50)),
+                                    f"AUTO-{decision}",
+                                    int(confidence),
+                                    log_message
+                                ))
                             except Exception as log_err:
                                 print(f"Log error: {log_err}")
         except Exception as auto_err:
@@ -1068,7 +1361,6 @@ def trigger_analysis(
         }
     except Exception as e:
         print(f"Trigger Analysis Error: {e}")
-        import traceback
         traceback.print_exc()
         return {"status": "error", "msg": str(e)}
 
@@ -1078,7 +1370,7 @@ def execute_trade(action: str = None, symbol: str = None):
     Executes a REAL trade on Weex when the user authorizes it.
     Now supports dynamic symbol selection with comprehensive logging.
     """
-    from core.db_manager import save_trade, update_or_create_position, log_market_state
+    from core.db_manager import save_trade, update_or_create_position, queue_market_state
     
     try:
         # Get action and symbol from query params or body
@@ -1087,16 +1379,8 @@ def execute_trade(action: str = None, symbol: str = None):
         
         # Get current symbol from settings if not provided
         if not symbol:
-            conn = get_db_connection()
-            if conn:
-                cur = conn.cursor()
-                cur.execute("SELECT current_symbol FROM trade_settings LIMIT 1")
-                settings = cur.fetchone()
-                cur.close()
-                conn.close()
-                symbol = settings["current_symbol"] if settings else "cmt_btcusdt"
-            else:
-                symbol = "cmt_btcusdt"
+            settings = _cached_settings_row()
+            symbol = settings["current_symbol"] if settings else "cmt_btcusdt"
         
         print(f"RECEIVED TRADE SIGNAL: {action.upper()} on {symbol}")
         
@@ -1166,20 +1450,22 @@ def execute_trade(action: str = None, symbol: str = None):
                 
                 explanation = f"Manual trade execution: {action.upper()} {size} units of {symbol} at ${current_price:.2f}. Order placed via user interface with AI system oversight."
                 
-                client.upload_ai_log(
+                # Uploaded in the background; the order is already placed
+                _log_pool.submit(
+                    client.upload_ai_log,
                     order_id=order_id,
                     stage="Strategy Execution",
                     model="Gemini-2.0-Flash-Thinking",
                     input_data=ai_log_input,
                     output_data=ai_log_output,
                     explanation=explanation
-                )
-                print(f"AI Log uploaded for manual trade order {order_id}")
+                ).add_done_callback(_on_ai_log_uploaded)
+                print(f"AI Log upload queued for manual trade order {order_id}")
             except Exception as ai_log_err:
                 print(f"AI Log upload failed: {ai_log_err}")
             
-            # Log success
-            log_market_state(
+            # Log success (buffered, written by the market_log flusher)
+            queue_market_state(
                 f"TRADE-{action.upper()}",
                 100,
                 f"Trade executed successfully: {action.upper()} {size} {symbol} @ ${current_price:.2f} | Order ID: {order_id}",
@@ -1196,7 +1482,7 @@ def execute_trade(action: str = None, symbol: str = None):
         else:
             # Trade failed
             error_msg = result.get('msg', 'Unknown error') if result else 'No response from WEEX'
-            log_market_state(
+            queue_market_state(
                 f"TRADE-FAILED",
                 0,
                 f"Trade failed: {action.upper()} {symbol} | Error: {error_msg}",
@@ -1205,13 +1491,12 @@ def execute_trade(action: str = None, symbol: str = None):
             return {"status": "error", "msg": error_msg}
             
     except Exception as e:
-        import traceback
         error_details = traceback.format_exc()
         print(f"Trade Execution Error: {error_details}")
         
         # Log error
         try:
-            log_market_state(
+            queue_market_state(
                 "TRADE-ERROR",
                 0,
                 f"Trade execution exception: {str(e)}",
@@ -1223,20 +1508,12 @@ def execute_trade(action: str = None, symbol: str = None):
         return {"status": "error", "msg": str(e)}
 
 @app.get("/api/trade-settings")
-def get_trade_settings():
+async def get_trade_settings():
     """
     Fetches current trade settings (auto-trading mode, risk tolerance, current symbol).
     """
     try:
-        conn = get_db_connection()
-        if not conn:
-            return {"auto_trading": False, "risk_tolerance": 20, "current_symbol": "cmt_btcusdt"}
-        
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM trade_settings ORDER BY id DESC LIMIT 1")
-        settings = cur.fetchone()
-        cur.close()
-        conn.close()
+        settings = await _cached_settings_row_async()
         
         if settings:
             return {
@@ -1250,37 +1527,20 @@ def get_trade_settings():
         return {"auto_trading": False, "risk_tolerance": 20, "current_symbol": "cmt_btcusdt"}
 
 @app.post("/api/trade-settings")
-def update_trade_settings(auto_trading: bool = None, risk_tolerance: int = None, current_symbol: str = None):
+async def update_trade_settings(auto_trading: bool = None, risk_tolerance: int = None, current_symbol: str = None):
     """
     Updates trade settings (auto-trading mode, risk tolerance, current symbol).
     Automatically starts/stops sentinel service based on auto-trading setting.
     """
     try:
-        conn = get_db_connection()
-        if not conn:
+        pg = getattr(app.state, "pg", None)
+        if pg is None:
             return {"status": "error", "msg": "Database connection failed"}
         
-        cur = conn.cursor()
-        
-        # Build dynamic update query based on provided parameters
-        updates = []
-        params = []
-        
-        if auto_trading is not None:
-            updates.append("auto_trading = %s")
-            params.append(auto_trading)
-        if risk_tolerance is not None:
-            updates.append("risk_tolerance = %s")
-            params.append(risk_tolerance)
-        if current_symbol is not None:
-            updates.append("current_symbol = %s")
-            params.append(current_symbol)
-        
-        if updates:
-            updates.append("updated_at = CURRENT_TIMESTAMP")
-            query = f"UPDATE trade_settings SET {', '.join(updates)}"
-            cur.execute(query, tuple(params))
-            conn.commit()
+        if auto_trading is not None or risk_tolerance is not None or current_symbol is not None:
+            # One fixed statement for every field combination; NULL keeps the stored value
+            await pg.execute(UPDATE_SETTINGS_SQL, auto_trading, risk_tolerance, current_symbol)
+            _invalidate_settings_cache()
             
             # Start/stop sentinel based on auto_trading
             if auto_trading is not None:
@@ -1289,126 +1549,110 @@ def update_trade_settings(auto_trading: bool = None, risk_tolerance: int = None,
                 else:
                     stop_sentinel()
         
-        cur.close()
-        conn.close()
         return {"status": "success", "msg": "Settings updated"}
     except Exception as e:
         print(f"Update Settings Error: {e}")
         return {"status": "error", "msg": str(e)}
 
 @app.get("/api/ai-analysis")
-def get_ai_analysis(symbol: str = None):
+async def get_ai_analysis(symbol: str = None):
     """
     Fetches the latest AI analysis for a specific symbol (or current symbol).
     """
     try:
-        if not symbol:
-            conn = get_db_connection()
-            if not conn:
-                return None
-            cur = conn.cursor()
-            cur.execute("SELECT current_symbol FROM trade_settings LIMIT 1")
-            settings = cur.fetchone()
-            symbol = settings["current_symbol"] if settings else "cmt_btcusdt"
-            cur.close()
-            conn.close()
-        
-        conn = get_db_connection()
-        if not conn:
-            return None
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT * FROM ai_analysis WHERE symbol = %s ORDER BY timestamp DESC LIMIT 1", 
-            (symbol,)
-        )
-        analysis = cur.fetchone()
-        cur.close()
-        conn.close()
+        # Without a symbol, the current one comes from trade_settings in the same round trip
+        analysis = await _pg_fetchrow("""
+            SELECT a.* FROM ai_analysis a
+            WHERE a.symbol = COALESCE($1::text, (SELECT current_symbol FROM trade_settings LIMIT 1), 'cmt_btcusdt')
+            ORDER BY a.timestamp DESC LIMIT 1
+        """, symbol or None)
         
         if analysis:
-            return {
+            return ChartorJSONResponse({
                 "symbol": analysis["symbol"],
                 "decision": analysis["decision"],
                 "confidence": analysis["confidence"],
                 "reasoning": analysis["reasoning"],
-                "price": float(analysis["price"]),
-                "rsi": float(analysis["rsi"]),
+                "price": analysis["price"],
+                "rsi": analysis["rsi"],
                 "trend": analysis["trend"],
-                "timestamp": str(analysis["timestamp"])
-            }
+                "timestamp": analysis["timestamp"]
+            })
         return None
     except Exception as e:
         print(f"Get AI Analysis Error: {e}")
         return None
 
+# Terminal feed: log type and display message are worked out in SQL
+MARKET_LOG_FEED_SQL = """
+    SELECT
+        id,
+        timestamp,
+        CASE
+            WHEN decision LIKE '%AUTO-%' OR decision LIKE '%TRADE-%' THEN 'trade'
+            WHEN decision IN ('BUY', 'SELL') THEN 'sentinel'
+            WHEN reason LIKE '%RISK%' OR reason LIKE '%ERROR%' THEN 'risk'
+            ELSE 'system'
+        END AS log_type,
+        COALESCE(
+            NULLIF(reason, ''),
+            'Trend: ' || COALESCE(trend, 'N/A')
+                || ' | RSI: ' || to_char(COALESCE(rsi, 0), 'FM9990.0')
+                || ' | Decision: ' || COALESCE(decision, 'WAIT')
+                || ' | Confidence: ' || COALESCE(confidence, 0)::text || '%'
+        ) AS message
+    FROM market_log
+    ORDER BY timestamp DESC
+    LIMIT $1
+"""
+
 @app.get("/api/logs")
-def get_logs(limit: int = 20):
+async def get_logs(limit: int = 20):
     """
     Fetches the latest AI decision logs for the bottom terminal.
     """
     try:
-        conn = get_db_connection()
-        if not conn:
+        logs = await _pg_fetch(MARKET_LOG_FEED_SQL, limit)
+        if logs is None:
             return []
         
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM market_log ORDER BY timestamp DESC LIMIT %s", (limit,))
-        logs = cur.fetchall()
-        cur.close()
-        conn.close()
-        
-        formatted_logs = []
-        for row in logs:
-            # Determine log type based on decision
-            log_type = "sentinel"
-            if "AUTO-" in str(row.get('decision', '')) or "TRADE-" in str(row.get('decision', '')):
-                log_type = "trade"
-            elif row.get('decision') in ["BUY", "SELL"]:
-                log_type = "sentinel"
-            elif "RISK" in str(row.get('reason', '')) or "ERROR" in str(row.get('reason', '')):
-                log_type = "risk"
-            else:
-                log_type = "system"
-            
-            # Format message
-            message = str(row.get('reason', ''))
-            if not message or message == "None":
-                message = f"Trend: {row.get('trend', 'N/A')} | RSI: {row.get('rsi', 0):.1f} | Decision: {row.get('decision', 'WAIT')} | Confidence: {row.get('confidence', 0)}%"
-            
-            formatted_logs.append({
+        formatted_logs = [
+            {
                 "id": str(row["id"]),
-                "timestamp": str(row["timestamp"]),
-                "type": log_type,
-                "message": message
-            })
+                "timestamp": row["timestamp"],
+                "type": row["log_type"],
+                "message": row["message"]
+            }
+            for row in logs
+        ]
         
-        return formatted_logs
+        return ChartorJSONResponse(formatted_logs)
     except Exception as e:
         print(f"Get Logs Error: {e}")
-        import traceback
         traceback.print_exc()
         return []
 
 @app.post("/api/force-close")
-def force_close_all():
+async def force_close_all():
     """
     Emergency function to close all open positions.
     """
-    from core.db_manager import close_position, get_open_positions, save_trade, log_market_state
+    from core.db_manager import close_position, get_open_positions, save_trade, queue_market_state
     
     try:
         print("FORCE CLOSE ALL POSITIONS REQUESTED")
         
         # Get all open positions from database
-        positions = get_open_positions()
+        positions = await asyncio.to_thread(get_open_positions)
         
         if not positions:
             return {"status": "success", "msg": "No open positions to close", "closed": 0}
         
-        closed_count = 0
-        errors = []
+        # Close positions concurrently, a few WEEX requests at a time
+        weex_slots = asyncio.Semaphore(FORCE_CLOSE_CONCURRENCY)
         
-        for pos in positions:
+        async def close_one(pos):
+            """Closes one position; returns None on success or an error string."""
             try:
                 symbol = pos.get('symbol')
                 side = pos.get('side')
@@ -1418,14 +1662,15 @@ def force_close_all():
                 close_side = "sell" if side == "buy" else "buy"
                 
                 # Close position on WEEX
-                result = client.close_position(symbol, close_side, str(size))
+                async with weex_slots:
+                    result = await asyncio.to_thread(client.close_position, symbol, close_side, str(size))
                 
                 if result and result.get("code") == "00000":
                     # Remove from open positions
-                    close_position(symbol, side)
+                    await asyncio.to_thread(close_position, symbol, side)
                     
                     # Log the close trade
-                    save_trade({
+                    await asyncio.to_thread(save_trade, {
                         "symbol": symbol,
                         "side": close_side,
                         "size": float(size),
@@ -1437,18 +1682,22 @@ def force_close_all():
                         "notes": "Force close - emergency liquidation"
                     })
                     
-                    closed_count += 1
                     print(f"Closed position: {side} {size} {symbol}")
-                else:
-                    error_msg = result.get('msg', 'Unknown error') if result else 'No response'
-                    errors.append(f"{symbol} {side}: {error_msg}")
-                    print(f"Failed to close {symbol} {side}: {error_msg}")
+                    return None
+                
+                error_msg = result.get('msg', 'Unknown error') if result else 'No response'
+                print(f"Failed to close {symbol} {side}: {error_msg}")
+                return f"{symbol} {side}: {error_msg}"
             except Exception as e:
-                errors.append(f"{pos.get('symbol', 'unknown')}: {str(e)}")
                 print(f"Error closing position: {e}")
+                return f"{pos.get('symbol', 'unknown')}: {str(e)}"
+        
+        results = await asyncio.gather(*(close_one(pos) for pos in positions))
+        errors = [error for error in results if error]
+        closed_count = len(results) - len(errors)
         
         # Log the force close action
-        log_market_state(
+        queue_market_state(
             "FORCE-CLOSE",
             100,
             f"Force close executed: {closed_count} positions closed",
@@ -1464,25 +1713,24 @@ def force_close_all():
         }
         
     except Exception as e:
-        import traceback
         error_details = traceback.format_exc()
         print(f"Force Close Error: {error_details}")
         return {"status": "error", "msg": str(e)}
 
 @app.get("/api/trade-history")
-def get_trade_history_endpoint(limit: int = 100, symbol: str = None):
+async def get_trade_history_endpoint(limit: int = 100, symbol: str = None):
     """
     Fetches trade history from WEEX API using /capi/v2/order/history
     This returns completed/filled orders, not pending ones.
     """
     try:
         # Calculate time range (last 90 days max as per WEEX API)
-        import time
         end_time = int(time.time() * 1000)  # Current time in milliseconds
         start_time = end_time - (89 * 24 * 60 * 60 * 1000)  # 89 days ago
         
         # Call WEEX API to get history orders (completed trades)
-        weex_history = client.get_history_orders(
+        weex_history = await asyncio.to_thread(
+            client.get_history_orders,
             symbol=symbol, 
             page_size=min(limit, 100),
             create_date=start_time,
@@ -1507,91 +1755,79 @@ def get_trade_history_endpoint(limit: int = 100, symbol: str = None):
         elif isinstance(weex_history, list):
             orders_data = weex_history
         
-        formatted_trades = []
-        for order in orders_data:
-            try:
-                order_id = str(order.get("orderId", "") or order.get("order_id", ""))
-                symbol_order = order.get("symbol", "")
-                order_type = str(order.get("type", ""))
-                
-                # Convert order type to side
-                # type: 1=open_long(buy), 2=open_short(sell), 3=close_long(sell), 4=close_short(buy)
-                side = "buy"
-                if order_type in ["2", "3"] or "short" in order_type.lower() or "sell" in order_type.lower():
-                    side = "sell"
-                elif order_type in ["1", "4"] or "long" in order_type.lower() or "buy" in order_type.lower():
-                    side = "buy"
-                
-                size = float(order.get("size", 0) or 0)
-                
-                # Use priceAvg for filled orders
-                price_avg = order.get("priceAvg") or order.get("price_avg")
-                price = order.get("price")
-                execution_price = float(price_avg) if price_avg and float(price_avg) > 0 else (float(price) if price else None)
-                
-                status = order.get("status", "filled")
-                fee = float(order.get("fee", 0) or 0)
-                
-                # Get PnL from various possible fields
-                pnl = order.get("totalProfits") or order.get("pnl") or order.get("profit")
-                pnl_value = float(pnl) if pnl and str(pnl) not in ["", "null", "None"] else None
-                
-                # Get timestamps
-                create_time = order.get("cTime") or order.get("createTime") or order.get("created_at")
-                execution_time = ""
-                if create_time:
-                    from datetime import datetime
-                    try:
-                        # Convert milliseconds timestamp to ISO string
-                        timestamp_ms = int(create_time)
-                        execution_time = datetime.fromtimestamp(timestamp_ms / 1000).isoformat()
-                    except:
-                        execution_time = str(create_time)
-                
-                # Generate a numeric ID
-                numeric_id = 0
-                try:
-                    if order_id and order_id.isdigit():
-                        numeric_id = int(order_id)
-                    else:
-                        numeric_id = abs(hash(order_id)) % (10 ** 9)
-                except:
-                    numeric_id = abs(hash(str(order))) % (10 ** 9)
-                
-                formatted_trades.append({
-                    "id": numeric_id,
-                    "symbol": symbol_order,
-                    "side": side,
-                    "size": size,
-                    "price": execution_price,
-                    "order_id": order_id,
-                    "status": status,
-                    "pnl": pnl_value,
-                    "fees": fee if fee > 0 else None,
-                    "execution_time": execution_time,
-                    "notes": f"Order type: {order_type}"
-                })
-            except Exception as e:
-                print(f"Error formatting order: {e}")
-                import traceback
-                traceback.print_exc()
-                continue
-        
-        return {"status": "success", "trades": formatted_trades, "count": len(formatted_trades)}
+        formatted_trades = _format_history_orders(orders_data)
+        return ChartorJSONResponse({"status": "success", "trades": formatted_trades, "count": len(formatted_trades)})
     except Exception as e:
         print(f"Get Trade History Error: {e}")
-        import traceback
         traceback.print_exc()
         return {"status": "error", "msg": str(e), "trades": []}
 
+def _first_present(df, *names):
+    """Per row, the first of the given columns holding a non-empty value (None if none do)."""
+    result = pd.Series(None, index=df.index, dtype=object)
+    for name in reversed(names):
+        if name in df.columns:
+            values = df[name]
+            result = values.where(values.notna() & values.astype(bool), result)
+    return result
+
+WEEX_ORDER_SIDES = {"1": "buy", "2": "sell", "3": "sell", "4": "buy"}
+
+def _format_history_orders(orders_data):
+    """
+    Formats WEEX history orders for the trade-history table, column by column.
+    
+    type: 1=open_long(buy), 2=open_short(sell), 3=close_long(sell), 4=close_short(buy)
+    """
+    orders = [order for order in orders_data if isinstance(order, dict)]
+    if not orders:
+        return []
+    df = pd.DataFrame.from_records(orders)
+    
+    order_id = _first_present(df, "orderId", "order_id").fillna("").astype(str)
+    order_type = _first_present(df, "type").fillna("").astype(str)
+    # Numeric types map directly; only text types need the substring check
+    side = order_type.map(WEEX_ORDER_SIDES)
+    unmapped = side.isna()
+    if unmapped.any():
+        type_lower = order_type[unmapped].str.lower()
+        side[unmapped] = np.where(type_lower.str.contains("short") | type_lower.str.contains("sell"), "sell", "buy")
+    
+    # Use priceAvg for filled orders, falling back to the order price
+    price_avg = pd.to_numeric(_first_present(df, "priceAvg", "price_avg"), errors="coerce")
+    price = pd.to_numeric(_first_present(df, "price"), errors="coerce")
+    fee = pd.to_numeric(_first_present(df, "fee"), errors="coerce").fillna(0.0)
+    
+    # Millisecond timestamps -> local ISO strings; anything unparseable is passed through as text
+    create_time = _first_present(df, "cTime", "createTime", "created_at")
+    # fromtimestamp applies the local offset in effect at each order's own time (DST-safe)
+    created_ms = pd.to_numeric(create_time, errors="coerce")
+    execution_time = created_ms.map(lambda ms: datetime.fromtimestamp(ms / 1000).isoformat(), na_action="ignore")
+    execution_time = execution_time.where(created_ms.notna(), create_time.fillna("").astype(str))
+    
+    frame = pd.DataFrame({
+        "id": [int(oid) if oid.isdigit() else zlib.crc32(oid.encode()) & 0x3FFFFFFF for oid in order_id],
+        "symbol": _first_present(df, "symbol").fillna(""),
+        "side": side,
+        "size": pd.to_numeric(_first_present(df, "size"), errors="coerce").fillna(0.0),
+        "price": price_avg.where(price_avg > 0, price),
+        "order_id": order_id,
+        "status": df["status"].fillna("filled") if "status" in df.columns else "filled",
+        "pnl": pd.to_numeric(_first_present(df, "totalProfits", "pnl", "profit"), errors="coerce"),
+        "fees": fee.where(fee > 0),
+        "execution_time": execution_time,
+        "notes": "Order type: " + order_type
+    })
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
+
 @app.get("/api/positions")
-def get_positions():
+async def get_positions():
     """
     Fetches all open positions from WEEX API using /capi/v2/account/position/allPosition
     """
     try:
         # Call WEEX API to get all positions
-        weex_positions = client.get_all_positions()
+        weex_positions = await asyncio.to_thread(client.get_all_positions)
         
         if not weex_positions:
             return {"status": "success", "positions": [], "count": 0}
@@ -1606,6 +1842,11 @@ def get_positions():
             elif isinstance(weex_positions.get("data"), list):
                 positions_data = weex_positions.get("data", [])
         
+        # One price lookup per distinct symbol, fetched concurrently
+        unique_symbols = list({pos.get("symbol", "") for pos in positions_data if isinstance(pos, dict)})
+        prices = await asyncio.gather(*(asyncio.to_thread(_get_last_price, sym) for sym in unique_symbols))
+        last_prices = dict(zip(unique_symbols, prices))
+        
         formatted_positions = []
         for pos in positions_data:
             try:
@@ -1621,14 +1862,8 @@ def get_positions():
                 # Calculate entry price from open_value and size
                 entry_price = (open_value / size) if size > 0 else 0
                 
-                # Get current price from candles for display
-                current_price = None
-                try:
-                    candles = client.fetch_candles(symbol=symbol, limit=1)
-                    if candles and len(candles) > 0:
-                        current_price = float(candles[0][4])  # Close price
-                except:
-                    pass
+                # Current price from the latest candle, for display
+                current_price = last_prices.get(symbol)
                 
                 # If we can't calculate entry_price from open_value, use a fallback
                 if entry_price == 0 and current_price:
@@ -1636,7 +1871,6 @@ def get_positions():
                 
                 created_time = pos.get("created_time")
                 if created_time:
-                    from datetime import datetime
                     try:
                         opened_at = datetime.fromtimestamp(int(created_time) / 1000).isoformat()
                     except:
@@ -1658,23 +1892,21 @@ def get_positions():
                 })
             except Exception as e:
                 print(f"Error formatting position: {e}")
-                import traceback
                 traceback.print_exc()
                 continue
         
         return {"status": "success", "positions": formatted_positions, "count": len(formatted_positions)}
     except Exception as e:
         print(f"Get Positions Error: {e}")
-        import traceback
         traceback.print_exc()
         return {"status": "error", "msg": str(e), "positions": []}
 
 @app.post("/api/close-position")
-def close_single_position(request: dict = Body(...)):
+async def close_single_position(request: dict = Body(...)):
     """
     Closes a single position.
     """
-    from core.db_manager import get_open_positions, close_position, save_trade
+    from core.db_manager import get_open_position, close_position, save_trade
     
     try:
         symbol = request.get('symbol')
@@ -1684,8 +1916,7 @@ def close_single_position(request: dict = Body(...)):
             return {"status": "error", "msg": "Symbol and side are required"}
         
         # Get the position
-        positions = get_open_positions()
-        position = next((p for p in positions if p.get('symbol') == symbol and p.get('side') == side), None)
+        position = await asyncio.to_thread(get_open_position, symbol, side)
         
         if not position:
             return {"status": "error", "msg": "Position not found"}
@@ -1694,12 +1925,12 @@ def close_single_position(request: dict = Body(...)):
         close_side = "sell" if side == "buy" else "buy"
         
         # Close position on WEEX
-        result = client.close_position(symbol, close_side, size)
+        result = await asyncio.to_thread(client.close_position, symbol, close_side, size)
         
         if result and result.get("code") == "00000":
             # Get current price
             try:
-                candles = client.fetch_candles(symbol=symbol, limit=1)
+                candles = await asyncio.to_thread(client.fetch_candles, symbol=symbol, limit=1)
                 current_price = float(candles[0][4]) if candles and len(candles) > 0 else position.get('entry_price', 0)
             except:
                 current_price = position.get('entry_price', 0)
@@ -1714,7 +1945,7 @@ def close_single_position(request: dict = Body(...)):
             
             # Save close trade
             order_id = result.get('data', {}).get('orderId', 'close-' + str(int(time.time()))) if isinstance(result.get('data'), dict) else 'close-' + str(int(time.time()))
-            save_trade({
+            await asyncio.to_thread(save_trade, {
                 "symbol": symbol,
                 "side": close_side,
                 "size": size_float,
@@ -1727,7 +1958,7 @@ def close_single_position(request: dict = Body(...)):
             })
             
             # Remove from open positions
-            close_position(symbol, side)
+            await asyncio.to_thread(close_position, symbol, side)
             
             return {
                 "status": "success",
@@ -1740,78 +1971,82 @@ def close_single_position(request: dict = Body(...)):
             
     except Exception as e:
         print(f"Close Position Error: {e}")
-        import traceback
         traceback.print_exc()
         return {"status": "error", "msg": str(e)}
 
+# Aggregates over the most recent trades in one round trip. Drawdown is the percent below the
+# running peak of cumulative P&L (0 while the peak is <= 0), walking newest -> oldest.
+RISK_METRICS_SQL = """
+    WITH recent AS (
+        SELECT pnl::float8 AS pnl, ROW_NUMBER() OVER (ORDER BY execution_time DESC, id DESC) AS n
+        FROM trade_history
+        ORDER BY execution_time DESC, id DESC
+        LIMIT $1
+    ),
+    running AS (
+        SELECT n, pnl, SUM(pnl) OVER (ORDER BY n ROWS UNBOUNDED PRECEDING) AS cum
+        FROM recent
+        WHERE pnl IS NOT NULL
+    ),
+    peaks AS (
+        SELECT pnl, cum, MAX(GREATEST(cum, 0)) OVER (ORDER BY n ROWS UNBOUNDED PRECEDING) AS peak
+        FROM running
+    )
+    SELECT
+        (SELECT COUNT(*) FROM recent) AS total_trades,
+        COUNT(*) AS pnl_trades,
+        COUNT(*) FILTER (WHERE pnl > 0) AS win_count,
+        COALESCE(SUM(pnl), 0) AS total_pnl,
+        COALESCE(SUM(pnl) FILTER (WHERE pnl > 0), 0) AS total_wins,
+        COALESCE(-SUM(pnl) FILTER (WHERE pnl < 0), 0) AS total_losses,
+        AVG(pnl) AS avg_pnl,
+        STDDEV_POP(pnl) AS std_pnl,
+        MAX(pnl) AS best_trade,
+        MIN(pnl) AS worst_trade,
+        COALESCE(MIN(CASE WHEN peak > 0 THEN (cum - peak) / peak * 100 ELSE 0 END), 0) AS max_drawdown
+    FROM peaks
+"""
+
 @app.get("/api/risk-metrics")
-def get_risk_metrics():
+async def get_risk_metrics():
     """
     Calculates risk metrics: Sharpe ratio, drawdown, win rate, profit factor, etc.
     """
-    from core.db_manager import get_trade_history
-    import numpy as np
-    
     try:
-        trades = get_trade_history(limit=1000)
+        stats = await _pg_fetchrow(RISK_METRICS_SQL, 1000)
         
-        if len(trades) < 5:
+        if not stats or stats["total_trades"] < 5:
             return {
                 "status": "error",
                 "msg": "Need at least 5 trades to calculate metrics",
                 "metrics": None
             }
         
-        # Filter trades with P&L
-        trades_with_pnl = [t for t in trades if t.get('pnl') is not None]
-        
-        if len(trades_with_pnl) < 5:
+        if stats["pnl_trades"] < 5:
             return {
                 "status": "error",
                 "msg": "Need at least 5 trades with P&L data",
                 "metrics": None
             }
         
-        pnls = [float(t.get('pnl', 0)) for t in trades_with_pnl]
-        wins = [p for p in pnls if p > 0]
-        losses = [p for p in pnls if p < 0]
-        
         # Basic stats
-        total_trades = len(trades)
-        total_pnl = sum(pnls)
-        win_rate = (len(wins) / len(trades_with_pnl)) * 100 if trades_with_pnl else 0
-        avg_trade = total_pnl / len(trades_with_pnl) if trades_with_pnl else 0
-        best_trade = max(pnls) if pnls else 0
-        worst_trade = min(pnls) if pnls else 0
+        total_trades = stats["total_trades"]
+        total_pnl = float(stats["total_pnl"])
+        win_rate = (stats["win_count"] / stats["pnl_trades"]) * 100
+        avg_trade = float(stats["avg_pnl"])
+        best_trade = float(stats["best_trade"])
+        worst_trade = float(stats["worst_trade"])
         
         # Profit Factor
-        total_wins = sum(wins) if wins else 0
-        total_losses = abs(sum(losses)) if losses else 0
+        total_wins = float(stats["total_wins"])
+        total_losses = float(stats["total_losses"])
         profit_factor = total_wins / total_losses if total_losses > 0 else (total_wins if total_wins > 0 else 0)
         
         # Sharpe Ratio (simplified - using returns)
-        if len(pnls) > 1:
-            returns = np.array(pnls)
-            mean_return = np.mean(returns)
-            std_return = np.std(returns)
-            sharpe_ratio = (mean_return / std_return) * np.sqrt(252) if std_return > 0 else 0  # Annualized
-        else:
-            sharpe_ratio = 0
-        
-        # Max Drawdown
-        cumulative = []
-        running_sum = 0
-        peak = 0
-        max_drawdown = 0
-        
-        for pnl in pnls:
-            running_sum += pnl
-            cumulative.append(running_sum)
-            if running_sum > peak:
-                peak = running_sum
-            drawdown = ((running_sum - peak) / peak * 100) if peak > 0 else 0
-            if drawdown < max_drawdown:
-                max_drawdown = drawdown
+        std_return = float(stats["std_pnl"])
+        sharpe_ratio = float(avg_trade / std_return * np.sqrt(252)) if std_return > 0 else 0  # Annualized
+        
+        max_drawdown = min(float(stats["max_drawdown"]), 0.0)
         
         metrics = {
             "totalTrades": total_trades,
@@ -1829,17 +2064,18 @@ def get_risk_metrics():
         
     except Exception as e:
         print(f"Get Risk Metrics Error: {e}")
-        import traceback
         traceback.print_exc()
         return {"status": "error", "msg": str(e), "metrics": None}
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize database and production-ready trading systems on startup."""
-    global position_manager, safety_layer, sentiment_feed
+    global position_manager, safety_layer, sentiment_feed, main_event_loop
     
     from core.db_manager import init_db
     
+    main_event_loop = asyncio.get_running_loop()
+    
     try:
         logger.info("="*60)
         logger.info("CHARTOR TRADING ENGINE - STARTUP")
@@ -1848,6 +2084,7 @@ async def startup_event():
         # Initialize database tables
         logger.info("Initializing database...")
         init_db()
+        app.state.pg = await create_async_pool()
         
         # Initialize production components (if not already initialized)
         if position_manager is None:
@@ -1869,19 +2106,12 @@ async def startup_event():
             logger.info("Sentiment Feed already initialized")
         
         # Check if auto-trading is enabled
-        conn = get_db_connection()
-        if conn:
-            cur = conn.cursor()
-            cur.execute("SELECT auto_trading FROM trade_settings LIMIT 1")
-            settings = cur.fetchone()
-            cur.close()
-            conn.close()
-            
-            if settings and settings.get("auto_trading"):
-                logger.info("Auto-trading enabled, starting Sentinel service...")
-                start_sentinel()
-            else:
-                logger.info("Auto-trading disabled")
+        settings = _cached_settings_row()
+        if settings and settings.get("auto_trading"):
+            logger.info("Auto-trading enabled, starting Sentinel service...")
+            start_sentinel()
+        else:
+            logger.info("Auto-trading disabled")
         
         logger.info("="*60)
         logger.info("STARTUP COMPLETE ✅")
@@ -1911,30 +2141,32 @@ async def shutdown_event():
     if position_manager:
         position_manager.shutdown()
     
+    # Write out any market_log rows still buffered
+    stop_market_log_flusher()
+    
+    pg = getattr(app.state, "pg", None)
+    if pg is not None:
+        await pg.close()
+    
+    client.close()
+    _http.close()
+    
     logger.info("="*60)
     logger.info("SHUTDOWN COMPLETE ✅")
     logger.info("="*60)
 
 # --- Strategy Marketplace Endpoints ---
 @app.get("/api/strategies")
-def get_strategies():
+async def get_strategies():
     """Fetch all strategies with their current status."""
-    from core.db_manager import get_db_connection
-    
     try:
-        conn = get_db_connection()
-        if not conn:
-            return {"status": "error", "msg": "Database connection failed", "strategies": []}
-        
-        cur = conn.cursor()
-        cur.execute("""
+        strategies = await _pg_fetch("""
             SELECT id, name, description, logic, action, is_active, created_at, updated_at
             FROM strategies
             ORDER BY created_at DESC
         """)
-        strategies = cur.fetchall()
-        cur.close()
-        conn.close()
+        if strategies is None:
+            return {"status": "error", "msg": "Database connection failed", "strategies": []}
         
         formatted_strategies = []
         for strat in strategies:
@@ -1945,57 +2177,49 @@ def get_strategies():
                 "logic": strat.get("logic"),
                 "action": strat.get("action"),
                 "is_active": bool(strat.get("is_active", False)),
-                "created_at": str(strat.get("created_at")),
-                "updated_at": str(strat.get("updated_at"))
+                "created_at": strat.get("created_at"),
+                "updated_at": strat.get("updated_at")
             })
         
-        return {"status": "success", "strategies": formatted_strategies, "count": len(formatted_strategies)}
+        return ChartorJSONResponse({"status": "success", "strategies": formatted_strategies, "count": len(formatted_strategies)})
     except Exception as e:
         print(f"Get Strategies Error: {e}")
-        import traceback
         traceback.print_exc()
         return {"status": "error", "msg": str(e), "strategies": []}
 
 class ToggleStrategyRequest(BaseModel):
     is_active: bool
 
+TOGGLE_STRATEGY_SQL = """
+    WITH s AS (
+        UPDATE strategies
+        SET is_active = $1, updated_at = CURRENT_TIMESTAMP
+        WHERE id = $2
+        RETURNING id, name, is_active
+    ), t AS (
+        UPDATE trade_settings
+        SET auto_trading = TRUE, updated_at = CURRENT_TIMESTAMP
+        WHERE $1 AND EXISTS (SELECT 1 FROM s) AND id = (SELECT id FROM trade_settings LIMIT 1)
+    )
+    SELECT * FROM s
+"""
+
 @app.post("/api/strategies/{strategy_id}/toggle")
-def toggle_strategy(strategy_id: int, request: ToggleStrategyRequest):
+async def toggle_strategy(strategy_id: int, request: ToggleStrategyRequest):
     """Toggle a strategy's active status. Automatically enables auto-trading when any strategy is activated."""
-    from core.db_manager import get_db_connection
-    
     try:
-        conn = get_db_connection()
-        if not conn:
+        pg = getattr(app.state, "pg", None)
+        if pg is None:
             return {"status": "error", "msg": "Database connection failed"}
         
-        cur = conn.cursor()
-        
-        # Update strategy status
-        cur.execute("""
-            UPDATE strategies
-            SET is_active = %s, updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
-            RETURNING id, name, is_active
-        """, (request.is_active, strategy_id))
-        
-        result = cur.fetchone()
+        # One atomic statement: activating a strategy also enables auto-trading in settings
+        result = await pg.fetchrow(TOGGLE_STRATEGY_SQL, request.is_active, strategy_id)
         
         if not result:
-            cur.close()
-            conn.close()
             return {"status": "error", "msg": "Strategy not found"}
         
-        # If strategy is being activated, automatically enable auto-trading
         if request.is_active:
-            # Enable auto-trading in settings
-            cur.execute("""
-                UPDATE trade_settings 
-                SET auto_trading = TRUE, updated_at = CURRENT_TIMESTAMP
-                WHERE id = (SELECT id FROM trade_settings LIMIT 1)
-            """)
-            conn.commit()
-            
+            _invalidate_settings_cache()
             # Start sentinel if not already running
             start_sentinel()
             print(f"Auto-trading automatically enabled because strategy '{result['name']}' was activated")
@@ -2003,10 +2227,6 @@ def toggle_strategy(strategy_id: int, request: ToggleStrategyRequest):
         # Note: We don't disable auto-trading when strategies are deactivated
         # because the user might still want Gemini AI trading to work
         
-        conn.commit()
-        cur.close()
-        conn.close()
-        
         return {
             "status": "success",
             "msg": f"Strategy '{result['name']}' {'activated' if request.is_active else 'deactivated'}" + 
@@ -2019,34 +2239,84 @@ def toggle_strategy(strategy_id: int, request: ToggleStrategyRequest):
         }
     except Exception as e:
         print(f"Toggle Strategy Error: {e}")
-        import traceback
         traceback.print_exc()
         return {"status": "error", "msg": str(e)}
 
 class ToggleStrategyRequest(BaseModel):
     is_active: bool
 
+# Markdown code fences around Gemini's answer (with or without a language tag)
+_MD_FENCE_RE = re.compile(r'```(?:python|json)?\s*')
+# Substring matches, as before: "buying" counts as buy, "closed" as sell
+_BUY_WORDS_RE = re.compile(r'buy|long|purchase')
+_SELL_WORDS_RE = re.compile(r'sell|short|exit|close')
+
 class CreateStrategyRequest(BaseModel):
     name: str
     prompt: str
     description: Optional[str] = None
 
 @app.post("/api/create-strategy")
-def create_strategy(request: CreateStrategyRequest):
+async def create_strategy(request: CreateStrategyRequest, background_tasks: BackgroundTasks, background: bool = False):
     """
     Creates a new strategy by translating plain English to trading logic using Gemini.
+    With ?background=true it returns 202 and a job_id right away; poll
+    GET /api/create-strategy/{job_id} for the result.
     """
-    from core.db_manager import get_db_connection
-    import json
-    import re
+    if not background:
+        return await _create_strategy(request)
     
     try:
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
+        job = await _pg_fetchrow(
+            "INSERT INTO strategy_jobs (name, prompt) VALUES ($1, $2) RETURNING id",
+            request.name, request.prompt
+        )
+        if not job:
+            return {"status": "error", "msg": "Database connection failed"}
+        
+        background_tasks.add_task(_run_strategy_job, job["id"], request)
+        return ChartorJSONResponse({"status": "pending", "job_id": job["id"]}, status_code=202)
+    except Exception as e:
+        print(f"Create Strategy Job Error: {e}")
+        traceback.print_exc()
+        return {"status": "error", "msg": str(e)}
+
+@app.get("/api/create-strategy/{job_id}")
+async def get_strategy_job(job_id: int):
+    """Status of a background create-strategy job; "result" is the create-strategy response once it's done."""
+    try:
+        job = await _pg_fetchrow("SELECT id, status, result FROM strategy_jobs WHERE id = $1", job_id)
+        if not job:
+            return {"status": "error", "msg": "Job not found"}
+        
+        return ChartorJSONResponse({
+            "status": job["status"],
+            "job_id": job["id"],
+            "result": orjson.loads(job["result"]) if job["result"] else None
+        })
+    except Exception as e:
+        print(f"Get Strategy Job Error: {e}")
+        return {"status": "error", "msg": str(e)}
+
+async def _run_strategy_job(job_id, request):
+    """Background task: runs the translation and stores its response on the job row."""
+    result = await _create_strategy(request)
+    try:
+        await _pg_execute(
+            "UPDATE strategy_jobs SET status = $1, result = $2, updated_at = CURRENT_TIMESTAMP WHERE id = $3",
+            result.get("status", "error"), orjson.dumps(result).decode(), job_id
+        )
+    except Exception as e:
+        print(f"Strategy Job Update Error: {e}")
+
+async def _create_strategy(request):
+    """Translates the prompt with Gemini and saves the strategy; returns the endpoint's response dict."""
+    try:
+        client = llm_brain.client
+        if client is None:
             return {"status": "error", "msg": "GEMINI_API_KEY not found in .env"}
         
-        model_name = os.getenv("GEMINI_CHAT_MODEL", "gemini-flash-latest")
-        client = genai.Client(api_key=api_key)
+        model_name = GEMINI_CHAT_MODEL
         
         # System instruction for Gemini
         system_instruction = """You are a trading logic converter. Convert the user's plain English trading strategy into a Python-like boolean expression that can be evaluated against market data.
@@ -2075,19 +2345,23 @@ Return ONLY the Python expression, nothing else. No explanations, no markdown, j
         full_prompt = system_instruction + "\n\nUser Strategy: " + request.prompt + "\n\nConvert to Python expression:"
         
         try:
-            response = client.models.generate_content(model=model_name, contents=full_prompt)
-            logic_text = response.text.strip()
+            # Prompts that match after trimming/lowercasing reuse the earlier translation
+            prompt_hash = hashlib.sha256(request.prompt.strip().lower().encode()).hexdigest()
+            cached = await _pg_fetchrow("SELECT logic FROM strategy_prompt_cache WHERE prompt_hash = $1", prompt_hash)
+            if cached:
+                logic_text = cached["logic"]
+            else:
+                response = await client.aio.models.generate_content(model=model_name, contents=full_prompt)
+                logic_text = response.text.strip()
             
             # Clean markdown backticks if present
-            logic_text = re.sub(r'```(?:python|json)?\s*', '', logic_text)
-            logic_text = re.sub(r'```\s*', '', logic_text)
-            logic_text = logic_text.strip()
+            logic_text = _MD_FENCE_RE.sub('', logic_text).strip()
             
             # Determine action from the prompt (simple heuristic)
             prompt_lower = request.prompt.lower()
-            if any(word in prompt_lower for word in ['buy', 'long', 'enter long', 'purchase']):
+            if _BUY_WORDS_RE.search(prompt_lower):
                 action = "BUY"
-            elif any(word in prompt_lower for word in ['sell', 'short', 'exit', 'close']):
+            elif _SELL_WORDS_RE.search(prompt_lower):
                 action = "SELL"
             else:
                 # Try to infer from logic
@@ -2102,18 +2376,30 @@ Return ONLY the Python expression, nothing else. No explanations, no markdown, j
             # We'll do a simple syntax check
             if not logic_text or len(logic_text) < 3:
                 return {"status": "error", "msg": "Invalid logic generated. Please try rephrasing your strategy."}
+            try:
+                compile_logic(logic_text)  # Also warms the evaluator's compiled-logic cache
+            except SyntaxError:
+                return {"status": "error", "msg": "Invalid logic generated. Please try rephrasing your strategy."}
             
             # Save to database
-            conn = get_db_connection()
-            if not conn:
+            pg = getattr(app.state, "pg", None)
+            if pg is None:
                 return {"status": "error", "msg": "Database connection failed"}
             
-            cur = conn.cursor()
-            cur.execute("""
+            if not cached:
+                try:
+                    await pg.execute("""
+                        INSERT INTO strategy_prompt_cache (prompt_hash, logic) VALUES ($1, $2)
+                        ON CONFLICT (prompt_hash) DO NOTHING
+                    """, prompt_hash, logic_text)
+                except Exception as cache_error:
+                    print(f"Strategy Prompt Cache Error: {cache_error}")
+            
+            result = await pg.fetchrow("""
                 INSERT INTO strategies (name, description, logic, action, raw_prompt, logic_json, is_active)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                VALUES ($1, $2, $3, $4, $5, $6, $7)
                 RETURNING id, name, logic, action
-            """, (
+            """,
                 request.name,
                 request.description or "",
                 logic_text,
@@ -2121,12 +2407,7 @@ Return ONLY the Python expression, nothing else. No explanations, no markdown, j
                 request.prompt,
                 json.dumps({"prompt": request.prompt, "logic": logic_text}),  # Store JSON for reference
                 True  # Auto-activate new strategies
-            ))
-            
-            result = cur.fetchone()
-            conn.commit()
-            cur.close()
-            conn.close()
+            )
             
             return {
                 "status": "success",
@@ -2142,7 +2423,6 @@ Return ONLY the Python expression, nothing else. No explanations, no markdown, j
             
         except Exception as gemini_error:
             print(f"Gemini Translation Error: {gemini_error}")
-            import traceback
             traceback.print_exc()
             error_msg = str(gemini_error)
             # Provide more helpful error messages
@@ -2158,7 +2438,6 @@ Return ONLY the Python expression, nothing else. No explanations, no markdown, j
             
     except Exception as e:
         print(f"Create Strategy Error: {e}")
-        import traceback
         traceback.print_exc()
         return {"status": "error", "msg": str(e)}
 
@@ -2176,6 +2455,11 @@ orchestrator_thread_inst = None
 
 # Removed duplicate endpoint definitions - see bottom of file for active endpoints
 
+INSTITUTIONAL_TRADE_FIELDS = (
+    "symbol", "direction", "entry_price", "exit_price", "size", "realized_pnl",
+    "realized_pnl_pct", "entry_time", "exit_time", "hold_time_hours", "exit_reason"
+)
+
 @app.get("/api/institutional/trades")
 async def get_institutional_trades():
     """Get trade history from institutional system"""
@@ -2185,27 +2469,16 @@ async def get_institutional_trades():
         if orchestrator_instance is None:
             return {"status": "error", "msg": "Institutional trading not running", "trades": []}
         
-        trades = []
-        for trade in orchestrator_instance.risk_manager.position_history:
-            trades.append({
-                "symbol": trade["symbol"],
-                "direction": trade["direction"],
-                "entry_price": trade["entry_price"],
-                "exit_price": trade["exit_price"],
-                "size": trade["size"],
-                "realized_pnl": trade["realized_pnl"],
-                "realized_pnl_pct": trade["realized_pnl_pct"],
-                "entry_time": trade["entry_time"].isoformat(),
-                "exit_time": trade["exit_time"].isoformat(),
-                "hold_time_hours": trade["hold_time_hours"],
-                "exit_reason": trade["exit_reason"]
-            })
+        # entry_time/exit_time stay datetimes; orjson writes them as the same ISO 8601 strings
+        project = operator.itemgetter(*INSTITUTIONAL_TRADE_FIELDS)
+        trades = [dict(zip(INSTITUTIONAL_TRADE_FIELDS, project(trade)))
+                  for trade in orchestrator_instance.risk_manager.position_history]
         
-        return {
+        return ChartorJSONResponse({
             "status": "success",
             "trades": trades,
             "total_trades": len(trades)
-        }
+        })
         
     except Exception as e:
         return {"status": "error", "msg": str(e), "trades": []}
@@ -2236,50 +2509,58 @@ def start_institutional():
     """Start institutional quant trading system - No body required"""
     global institutional_thread, institutional_running, active_trading_mode, sentinel_running
     
-    with trading_mode_lock:
-        # Auto-stop Sentinel if running
-        if active_trading_mode == "SENTINEL":
-            logger.info("🔄 Auto-stopping Sentinel AI to start Institutional mode")
-            sentinel_running = False
-            active_trading_mode = None
-            # Also update trade settings to disable auto_trading
-            try:
-                import sqlite3
-                db_path = "trading_bot.db"
-                conn = sqlite3.connect(db_path)
-                c = conn.cursor()
-                c.execute("UPDATE trade_settings SET auto_trading = 0")
-                conn.commit()
-                conn.close()
-            except Exception as db_err:
-                logger.warning(f"Could not update trade_settings DB: {db_err}")
-        
-        if institutional_running:
-            return {"status": "info", "msg": "Institutional trading already running"}
-        
-        try:
-            from run_institutional_trading import main as institutional_main
-            
-            def run_institutional():
-                global institutional_running
-                institutional_running = True
-                try:
-                    institutional_main(skip_confirmation=True)  # Skip interactive prompt for API mode
-                except Exception as e:
-                    logger.error(f"Institutional trading error: {e}", exc_info=True)
-                finally:
-                    institutional_running = False
-            
-            institutional_thread = threading.Thread(target=run_institutional, daemon=True)
-            institutional_thread.start()
-            active_trading_mode = "INSTITUTIONAL"
+    stopped_sentinel = False
+    try:
+        with trading_mode_lock:
+            # Auto-stop Sentinel if running
+            if active_trading_mode == "SENTINEL":
+                logger.info("🔄 Auto-stopping Sentinel AI to start Institutional mode")
+                sentinel_running = False
+                active_trading_mode = None
+                stopped_sentinel = True
             
-            logger.info("✅ Institutional trading system started")
-            return {"status": "success", "msg": "Institutional trading started"}
+            if institutional_running:
+                return {"status": "info", "msg": "Institutional trading already running"}
             
-        except Exception as e:
-            logger.error(f"Failed to start institutional trading: {e}", exc_info=True)
-            return {"status": "error", "msg": str(e)}
+            try:
+                from run_institutional_trading import main as institutional_main
+                
+                def run_institutional():
+                    global institutional_running
+                    institutional_running = True
+                    try:
+                        institutional_main(skip_confirmation=True)  # Skip interactive prompt for API mode
+                    except Exception as e:
+                        logger.error(f"Institutional trading error: {e}", exc_info=True)
+                    finally:
+                        institutional_running = False
+                
+                institutional_thread = threading.Thread(target=run_institutional, daemon=True)
+                institutional_thread.start()
+                active_trading_mode = "INSTITUTIONAL"
+                
+                logger.info("✅ Institutional trading system started")
+                return {"status": "success", "msg": "Institutional trading started"}
+                
+            except Exception as e:
+                logger.error(f"Failed to start institutional trading: {e}", exc_info=True)
+                return {"status": "error", "msg": str(e)}
+    finally:
+        # Settings write happens after the lock is released
+        if stopped_sentinel:
+            _disable_auto_trading()
+
+def _disable_auto_trading():
+    """Turns auto_trading off in trade_settings so the sentinel doesn't restart (runs in FastAPI's threadpool)."""
+    try:
+        with pooled_connection() as conn:
+            if conn:
+                with conn.cursor() as cur:
+                    cur.execute("UPDATE trade_settings SET auto_trading = FALSE, updated_at = CURRENT_TIMESTAMP")
+                conn.commit()
+        _invalidate_settings_cache()
+    except Exception as db_err:
+        logger.warning(f"Could not update trade_settings DB: {db_err}")
 
 @app.post("/api/institutional/stop", status_code=200)
 def stop_institutional():
@@ -2305,6 +2586,15 @@ def get_institutional_status():
     }
 
 if __name__ == "__main__":
+    import importlib.util
     import uvicorn
-    # Runs on localhost:8000
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Runs on localhost:8000; uvloop/httptools come with uvicorn[standard] (uvloop has no Windows build)
+    has_uvloop = importlib.util.find_spec("uvloop") is not None
+    has_httptools = importlib.util.find_spec("httptools") is not None
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop" if has_uvloop else "asyncio",
+        http="httptools" if has_httptools else "h11"
+    )
\ No newline at end of file
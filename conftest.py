@@ -0,0 +1,31 @@
+"""
+Shared fixtures for the Postgres-backed tests
+Set TEST_DATABASE_URL to a database the tests may create and drop schemas in.
+"""
+import os
+import uuid
+import pytest
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from core import db_manager
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+@pytest.fixture
+def scratch_schema():
+    """Creates the app schema in a throwaway Postgres schema and drops it afterwards."""
+    schema = f"chartor_test_{uuid.uuid4().hex[:8]}"
+    admin = psycopg2.connect(TEST_DATABASE_URL)
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f"CREATE SCHEMA {schema}")
+    conn = psycopg2.connect(TEST_DATABASE_URL, options=f"-csearch_path={schema}", cursor_factory=RealDictCursor)
+    try:
+        db_manager._create_schema(conn)
+        yield schema, conn
+    finally:
+        conn.close()
+        with admin.cursor() as cur:
+            cur.execute(f"DROP SCHEMA {schema} CASCADE")
+        admin.close()
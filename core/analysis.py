@@ -1,43 +1,113 @@
-import pandas as pd
-import pandas_ta as ta
+import threading
+from collections import OrderedDict, namedtuple
+import numpy as np
+from core.candles import CandleSet
+from core.features import FeatureFrame, build_feature_frame
+from core.indicators_numba import latest_indicators
+
+# Cached form of the latest indicator values (unrounded); analyze_market_structure() builds the dict callers use
+MarketState = namedtuple('MarketState', 'price rsi trend ema_20 volatility volume_spike')
 
 def analyze_market_structure(candles):
     """
-    Takes raw candles (list) and returns a DataFrame with Technical Indicators.
+    Takes raw candles (list), a CandleSet or a prebuilt FeatureFrame and returns the latest Technical Indicators.
+    """
+    state = analyze_market_structure_raw(candles)
+    if state is None:
+        return None
+    return {
+        "price": state.price,
+        "rsi": round(state.rsi, 2),
+        "trend": state.trend,
+        "ema_20": round(state.ema_20, 2),
+        "volatility": round(state.volatility, 2),
+        "volume_spike": state.volume_spike
+    }
+
+# Recent results keyed by candle window (see _window_key), so repeated calls on the same window reuse them
+ANALYSIS_CACHE_SIZE = 32
+_analysis_cache = OrderedDict()
+_analysis_cache_lock = threading.Lock()
+
+def analyze_market_structure_raw(candles):
+    """Same analysis as analyze_market_structure, as the cached MarketState tuple (None on failure)."""
+    key = _window_key(candles)
+    if key is not None:
+        with _analysis_cache_lock:
+            state = _analysis_cache.get(key)
+            if state is not None:
+                _analysis_cache.move_to_end(key)
+                return state
+
+    state = _analyze(candles)
+    if key is not None and state is not None:
+        with _analysis_cache_lock:
+            _analysis_cache[key] = state
+            if len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+                _analysis_cache.popitem(last=False)
+    return state
+
+def _window_key(candles):
+    """
+    Identifies a candle window by its length, first bar and the full last bar. The last
+    bar's values are included because the still-forming bar changes under the same
+    timestamp. Returns None for inputs that aren't cached (FeatureFrames, dict candles).
     """
     try:
-        df = pd.DataFrame(candles, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume', 
-                                           'close_time', 'quote_volume', 'trades', 'taker_buy_base', 'taker_buy_quote', 'ignore'])
-        
-        df = df[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
-        
-        cols = ['open', 'high', 'low', 'close', 'volume']
-        df[cols] = df[cols].astype(float)
-        
-        df['ema_20'] = ta.ema(df['close'], length=20)
-        df['ema_50'] = ta.ema(df['close'], length=50)
-        
-        df['rsi'] = ta.rsi(df['close'], length=14)
-        
-        df['atr'] = ta.atr(df['high'], df['low'], df['close'], length=14)
-        
-        last_row = df.iloc[-1]
-        trend = "NEUTRAL"
-        
-        if last_row['close'] > last_row['ema_20'] > last_row['ema_50']:
-            trend = "BULLISH"
-        elif last_row['close'] < last_row['ema_20'] < last_row['ema_50']:
-            trend = "BEARISH"
-            
-        return {
-            "price": last_row['close'],
-            "rsi": round(last_row['rsi'], 2),
-            "trend": trend,
-            "ema_20": round(last_row['ema_20'], 2),
-            "volatility": round(last_row['atr'], 2),
-            "volume_spike": last_row['volume'] > (df['volume'].mean() * 1.5) 
-        }
-        
+        if isinstance(candles, CandleSet):
+            if len(candles) == 0:
+                return None
+            return (len(candles), float(candles.timestamp[0]), float(candles.close[0]), float(candles.timestamp[-1]),
+                    float(candles.high[-1]), float(candles.low[-1]), float(candles.close[-1]), float(candles.volume[-1]))
+        if candles and isinstance(candles[0], (list, tuple)):
+            return (len(candles), tuple(candles[0][:6]), tuple(candles[-1][:6]))
+    except TypeError:
+        pass
+    return None
+
+def _analyze(candles):
+    try:
+        if isinstance(candles, FeatureFrame):
+            frame = candles
+        else:
+            # Only the last values are needed here, so skip building the full indicator series
+            candle_set = candles if isinstance(candles, CandleSet) else _candle_rows(candles)
+            if candle_set is not None:
+                if len(candle_set) == 0:
+                    return None
+                rsi, atr, ema_20, ema_50, volume_mean = latest_indicators(
+                    candle_set.high, candle_set.low, candle_set.close, candle_set.volume
+                )
+                return _snapshot(candle_set.close[-1], rsi, atr, ema_20, ema_50, candle_set.volume[-1], volume_mean)
+            frame = build_feature_frame(candles)
+
+        if frame is None or len(frame) == 0:
+            return None
+
+        return _snapshot(frame.close[-1], frame.rsi[-1], frame.atr[-1], frame.ema20[-1], frame.ema50[-1],
+                         frame.volume[-1], frame.volume_mean)
+
     except Exception as e:
         print(f"Analysis Error: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def _candle_rows(candles):
+    """CandleSet for complete [t, o, h, l, c, v] rows (no DataFrame involved), or None when the feature-frame parser is needed."""
+    if not candles or not isinstance(candles[0], (list, tuple)):
+        return None
+    candle_set = CandleSet.from_raw(candles)
+    if candle_set is None:
+        return None
+    ohlc = np.stack((candle_set.open, candle_set.high, candle_set.low, candle_set.close))
+    return None if np.isnan(ohlc).any() else candle_set
+
+def _snapshot(close, rsi, atr, ema_20, ema_50, last_volume, volume_mean):
+    trend = "NEUTRAL"
+
+    if close > ema_20 > ema_50:
+        trend = "BULLISH"
+    elif close < ema_20 < ema_50:
+        trend = "BEARISH"
+
+    return MarketState(float(close), float(rsi), trend, float(ema_20), float(atr),
+                       bool(last_volume > (volume_mean * 1.5)))
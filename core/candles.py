@@ -0,0 +1,59 @@
+"""
+Columnar candle storage.
+
+Exchange klines arrive as lists of string/number rows; CandleSet casts them to
+float64 column arrays once so every consumer (chart endpoint, indicators, ML)
+works on typed arrays instead of re-parsing rows.
+"""
+
+from dataclasses import dataclass
+import numpy as np
+
+
+@dataclass
+class CandleSet:
+    """One float64 array per candle field, sorted oldest -> newest."""
+    timestamp: np.ndarray  # open time in milliseconds
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self):
+        return len(self.close)
+
+    @classmethod
+    def from_raw(cls, candles):
+        """
+        Builds a CandleSet from [timestamp, open, high, low, close, volume, ...] rows
+        (Binance/WEEX kline format). Returns None if the rows can't be parsed.
+        """
+        if not candles:
+            return None
+        try:
+            arr = np.asarray([c[:6] for c in candles], dtype=np.float64)
+        except (TypeError, ValueError, KeyError):
+            return None
+        if arr.ndim != 2 or arr.shape[1] < 5:
+            return None
+
+        arr = arr[np.argsort(arr[:, 0], kind="stable")]
+        volume = arr[:, 5] if arr.shape[1] > 5 else np.full(len(arr), np.nan)
+        return cls(
+            timestamp=np.ascontiguousarray(arr[:, 0]),
+            open=np.ascontiguousarray(arr[:, 1]),
+            high=np.ascontiguousarray(arr[:, 2]),
+            low=np.ascontiguousarray(arr[:, 3]),
+            close=np.ascontiguousarray(arr[:, 4]),
+            volume=np.ascontiguousarray(volume),
+        )
+
+    def to_tradingview(self):
+        """Chart rows as [{"time": <unix seconds>, "open", "high", "low", "close"}, ...]."""
+        times = (self.timestamp // 1000).astype(np.int64).tolist()
+        return [
+            {"time": t, "open": o, "high": h, "low": l, "close": c}
+            for t, o, h, l, c in zip(times, self.open.tolist(), self.high.tolist(),
+                                     self.low.tolist(), self.close.tolist())
+        ]
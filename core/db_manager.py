@@ -1,10 +1,88 @@
 import os
+import threading
+import time
+import urllib.parse
+from collections import deque
+from contextlib import contextmanager
+import asyncpg
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import pool as pg_pool
+from psycopg2.extras import RealDictCursor, execute_values
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# NUMERIC columns are read as float by psycopg2's typecaster instead of Decimal, so callers don't re-cast per row
+DEC2FLOAT = psycopg2.extensions.new_type(
+    psycopg2.extensions.DECIMAL.values, "DEC2FLOAT",
+    lambda value, cur: float(value) if value is not None else None
+)
+psycopg2.extensions.register_type(DEC2FLOAT)
+
+DB_POOL_MIN = 2
+DB_POOL_MAX = 25
+DB_POOL_TIMEOUT = 30  # seconds pooled_connection() waits for a free connection before raising PoolError
+DB_PING_AFTER = 30  # seconds a pooled connection may sit idle before it is pinged on checkout
+DB_POOL_RECYCLE = 1800  # seconds before a pooled connection is replaced outright
+# asyncpg pool used by the async API endpoints (see create_async_pool)
+ASYNC_POOL_MIN = 5
+ASYNC_POOL_MAX = 20
+# Disable when DATABASE_URL points at a transaction-mode pgbouncer, which can't hold PREPAREd statements
+USE_PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "1") == "1"
+
+MARKET_LOG_INSERT_SQL = """
+    INSERT INTO market_log (trend, structure, price, rsi, decision, confidence, reason)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+MARKET_LOG_PREPARE_SQL = """
+    PREPARE market_log_ins (text, text, float8, float8, text, int, text) AS
+    INSERT INTO market_log (trend, structure, price, rsi, decision, confidence, reason)
+    VALUES ($1, $2, $3, $4, $5, $6, $7)
+"""
+MARKET_LOG_BATCH_SQL = "INSERT INTO market_log (trend, structure, price, rsi, decision, confidence, reason) VALUES %s"
+# Trade dicts bind by name; psycopg2 adapts the values and Postgres casts them to the column types
+TRADE_VALUES_TEMPLATE = """
+    (%(symbol)s, %(side)s, %(size)s, %(price)s, %(order_id)s, %(order_type)s, %(status)s, %(pnl)s, %(fees)s, %(notes)s)
+"""
+TRADE_DEFAULTS = {
+    'symbol': '', 'side': '', 'size': 0, 'price': None, 'order_id': None,
+    'order_type': 'market', 'status': 'filled', 'pnl': None, 'fees': None, 'notes': None
+}
+
+# Buffered market_log writes (see queue_market_log)
+LOG_FLUSH_INTERVAL = 5  # seconds between background flushes
+LOG_FLUSH_BATCH = 500  # flush early once this many rows are waiting
+LOG_BUFFER_MAX = 10000  # oldest rows are dropped beyond this while the database is down
+
+# get_trade_history pages above this many rows use a server-side cursor
+HISTORY_CURSOR_THRESHOLD = 1000
+HISTORY_FETCH_SIZE = 500
+
+PROFITABLE_COUNT_TTL = 60  # seconds before count_profitable_trades() re-queries
+
+_db_pool = None
+_db_pool_lock = threading.Lock()
+# One permit per pool connection: getconn() raises instead of waiting once the pool is exhausted
+_db_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+
+_log_buffer = deque(maxlen=LOG_BUFFER_MAX)
+_log_lock = threading.Lock()
+_log_flush_wakeup = threading.Event()
+_log_flusher = None
+_log_flusher_running = False
+
+_profitable_count = None
+_profitable_count_at = 0.0
+_profitable_count_lock = threading.Lock()
+
+class _PooledConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers which statements it has PREPAREd this session."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+        self.opened_at = time.monotonic()
+        self.last_used = self.opened_at
+
 def get_db_connection():
     """Establishes a connection to Neon PostgreSQL."""
     try:
@@ -22,12 +100,183 @@ def get_db_connection():
         print(f"Database Connection Failed: {e}")
         return None
 
+def get_db_pool():
+    """Returns the shared connection pool, creating it on first use (None if the database is unavailable)."""
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                url = os.getenv("DATABASE_URL")
+                if not url:
+                    print("Error: DATABASE_URL not found in .env")
+                    return None
+                try:
+                    _db_pool = pg_pool.ThreadedConnectionPool(
+                        DB_POOL_MIN,
+                        DB_POOL_MAX,
+                        url,
+                        cursor_factory=RealDictCursor,
+                        connection_factory=_PooledConnection
+                    )
+                except Exception as e:
+                    print(f"Database Pool Init Failed: {e}")
+                    return None
+    return _db_pool
+
+def _asyncpg_dsn(url):
+    """Drops libpq-only URL options (e.g. Neon's channel_binding) that asyncpg would pass on as server settings."""
+    parts = urllib.parse.urlsplit(url)
+    query = [(k, v) for k, v in urllib.parse.parse_qsl(parts.query) if k != "channel_binding"]
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query)))
+
+async def create_async_pool():
+    """Creates the asyncpg pool for the async API endpoints (None if the database is unavailable)."""
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        print("Error: DATABASE_URL not found in .env")
+        return None
+    try:
+        return await asyncpg.create_pool(
+            _asyncpg_dsn(url),
+            min_size=ASYNC_POOL_MIN,
+            max_size=ASYNC_POOL_MAX,
+            # asyncpg caches prepared statements per connection, which pgbouncer can't hold either
+            statement_cache_size=100 if USE_PREPARED_STATEMENTS else 0
+        )
+    except Exception as e:
+        print(f"Async Database Pool Init Failed: {e}")
+        return None
+
+@contextmanager
+def pooled_connection():
+    """
+    Borrows a pooled connection for the duration of a with-block (yields None if unavailable).
+    Waits up to DB_POOL_TIMEOUT seconds when all DB_POOL_MAX connections are in use, then raises PoolError.
+    """
+    db_pool = get_db_pool()
+    if db_pool is None:
+        yield None
+        return
+    
+    if not _db_pool_slots.acquire(timeout=DB_POOL_TIMEOUT):
+        raise pg_pool.PoolError(f"connection pool exhausted: no connection free after {DB_POOL_TIMEOUT}s")
+    try:
+        conn = _checkout(db_pool)
+        try:
+            yield conn
+        finally:
+            conn.last_used = time.monotonic()
+            # The pool rolls back unfinished transactions and drops broken connections
+            db_pool.putconn(conn, close=bool(conn.closed))
+    finally:
+        _db_pool_slots.release()
+
+def _checkout(db_pool):
+    """
+    Takes a connection from the pool, replacing it if it is past DB_POOL_RECYCLE or
+    fails a SELECT 1 after sitting idle (Neon drops idle sessions server-side).
+    """
+    for _ in range(DB_POOL_MAX):
+        conn = db_pool.getconn()
+        now = time.monotonic()
+        if conn.closed or now - conn.opened_at > DB_POOL_RECYCLE:
+            db_pool.putconn(conn, close=True)
+            continue
+        if now - conn.last_used < DB_PING_AFTER:
+            return conn
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            db_pool.putconn(conn, close=True)
+    return db_pool.getconn()
+
+def insert_market_log(conn, row):
+    """
+    Inserts one market_log row on a pooled connection (caller commits).
+    row: (trend, structure, price, rsi, decision, confidence, reason)
+    """
+    with conn.cursor() as cur:
+        prepared = getattr(conn, "prepared_statements", None)
+        if not USE_PREPARED_STATEMENTS or prepared is None:
+            cur.execute(MARKET_LOG_INSERT_SQL, row)
+            return
+        
+        if "market_log_ins" not in prepared:
+            cur.execute(MARKET_LOG_PREPARE_SQL)
+            prepared.add("market_log_ins")
+        cur.execute("EXECUTE market_log_ins (%s, %s, %s, %s, %s, %s, %s)", row)
+
+def queue_market_log(row):
+    """
+    Buffers one market_log row; the background flusher writes it within LOG_FLUSH_INTERVAL seconds.
+    row: (trend, structure, price, rsi, decision, confidence, reason)
+    """
+    if _log_flusher is None:
+        start_market_log_flusher()
+    _log_buffer.append(row)
+    if len(_log_buffer) >= LOG_FLUSH_BATCH:
+        _log_flush_wakeup.set()
+
+def flush_market_logs():
+    """Writes every buffered market_log row in one batch. Returns the number of rows written."""
+    with _log_lock:
+        rows = []
+        while _log_buffer:
+            rows.append(_log_buffer.popleft())
+        if not rows:
+            return 0
+        
+        try:
+            with pooled_connection() as conn:
+                if not conn:
+                    raise RuntimeError("database unavailable")
+                with conn.cursor() as cur:
+                    execute_values(cur, MARKET_LOG_BATCH_SQL, rows, page_size=LOG_FLUSH_BATCH)
+                conn.commit()
+            return len(rows)
+        except Exception as e:
+            print(f"Market Log Flush Error: {e}")
+            # Keep the rows (in order, ahead of anything queued meanwhile) for the next flush
+            _log_buffer.extendleft(reversed(rows))
+            return 0
+
+def _market_log_flush_loop():
+    while _log_flusher_running:
+        _log_flush_wakeup.wait(LOG_FLUSH_INTERVAL)
+        _log_flush_wakeup.clear()
+        flush_market_logs()
+
+def start_market_log_flusher():
+    """Starts the background thread that drains queued market_log rows (idempotent)."""
+    global _log_flusher, _log_flusher_running
+    with _db_pool_lock:
+        if _log_flusher is not None:
+            return
+        _log_flusher_running = True
+        _log_flusher = threading.Thread(target=_market_log_flush_loop, name="market-log-flusher", daemon=True)
+        _log_flusher.start()
+
+def stop_market_log_flusher():
+    """Stops the flusher and writes whatever is still buffered."""
+    global _log_flusher, _log_flusher_running
+    _log_flusher_running = False
+    _log_flush_wakeup.set()
+    if _log_flusher is not None:
+        _log_flusher.join(timeout=LOG_FLUSH_INTERVAL)
+        _log_flusher = None
+    flush_market_logs()
+
 def init_db():
     """Creates the necessary tables in PostgreSQL if they don't exist."""
-    conn = get_db_connection()
-    if not conn:
-        return
+    with pooled_connection() as conn:
+        if not conn:
+            return
+        _create_schema(conn)
 
+def _create_schema(conn):
     try:
         cur = conn.cursor()
         
@@ -134,10 +383,35 @@ def init_db():
             );
         """)
         
+        # Background /api/create-strategy?background=true requests
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS strategy_jobs (
+                id SERIAL PRIMARY KEY,
+                name TEXT,
+                prompt TEXT,
+                status TEXT DEFAULT 'pending',
+                result TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        
+        # Gemini translations of strategy prompts, keyed by sha256 of the normalized prompt
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS strategy_prompt_cache (
+                prompt_hash TEXT PRIMARY KEY,
+                logic TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        
         try:
-            cur.execute("ALTER TABLE strategies ADD COLUMN IF NOT EXISTS raw_prompt TEXT;")
-            cur.execute("ALTER TABLE strategies ADD COLUMN IF NOT EXISTS logic_json TEXT;")
-            cur.execute("ALTER TABLE strategies ADD COLUMN IF NOT EXISTS risk_level TEXT DEFAULT 'SAFE';")
+            cur.execute("""
+                ALTER TABLE strategies
+                    ADD COLUMN IF NOT EXISTS raw_prompt TEXT,
+                    ADD COLUMN IF NOT EXISTS logic_json TEXT,
+                    ADD COLUMN IF NOT EXISTS risk_level TEXT DEFAULT 'SAFE';
+            """)
         except:
             pass  
         
@@ -161,180 +435,336 @@ def init_db():
             ("Gap Fill Sniper", "Buy when 15m price change < -3%, sell when 15m price change > 1%", "rsi < 30", "BUY", "AGGRESSIVE"),
         ]
         
-        for name, desc, logic, action, risk_level in safe_strategies + aggressive_strategies:
-            cur.execute("""
-                INSERT INTO strategies (name, description, logic, action, risk_level, is_active)
-                VALUES (%s, %s, %s, %s, %s, FALSE)
-            """, (name, desc, logic, action, risk_level))
+        execute_values(
+            cur,
+            "INSERT INTO strategies (name, description, logic, action, risk_level, is_active) VALUES %s",
+            [(name, desc, logic, action, risk_level, False)
+             for name, desc, logic, action, risk_level in safe_strategies + aggressive_strategies]
+        )
         
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_trade_history_symbol ON trade_history(symbol);")
+        # Symbol filter + newest-first order in one index; it also covers every symbol-only lookup
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_trade_history_symbol_time
+            ON trade_history(symbol, execution_time DESC) INCLUDE (side, size, price, pnl);
+        """)
+        cur.execute("DROP INDEX IF EXISTS idx_trade_history_symbol;")
         cur.execute("CREATE INDEX IF NOT EXISTS idx_trade_history_time ON trade_history(execution_time);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_trade_history_pnl_positive ON trade_history(pnl) WHERE pnl > 0;")
         cur.execute("CREATE INDEX IF NOT EXISTS idx_open_positions_symbol ON open_positions(symbol);")
         cur.execute("CREATE INDEX IF NOT EXISTS idx_strategies_active ON strategies(is_active);")
+        # Match the ORDER BY ... DESC LIMIT n reads so they become index scans instead of sorts
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_market_log_ts ON market_log(timestamp DESC);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_strategies_created ON strategies(created_at DESC);")
+        # ai_analysis holds one row per symbol, so the unique index below serves its lookups
+        cur.execute("DROP INDEX IF EXISTS idx_ai_analysis_symbol_ts;")
+        cur.execute(
+            "SELECT 1 FROM pg_indexes WHERE schemaname = current_schema() AND indexname = 'ai_analysis_symbol_uniq';"
+        )
+        if cur.fetchone() is None:
+            # save_ai_analysis upserts on symbol; keep only the newest row per symbol before enforcing it (first run only)
+            cur.execute("DELETE FROM ai_analysis a USING ai_analysis b WHERE a.symbol = b.symbol AND a.id < b.id;")
+            cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS ai_analysis_symbol_uniq ON ai_analysis(symbol);")
+            cur.execute("ANALYZE ai_analysis, market_log, strategies;")
         
         conn.commit()
         cur.close()
-        conn.close()
         print("Neon PostgreSQL Initialized Successfully.")
         
     except Exception as e:
         print(f"Init DB Error: {e}")
 
+def _market_state_row(decision, confidence, reason, market_data):
+    return (
+        str(market_data.get('trend', 'Neutral')),
+        str(market_data.get('structure', 'Scanning')),
+        float(market_data.get('price', 0)),
+        float(market_data.get('rsi', 50)),
+        str(decision),
+        int(confidence),
+        str(reason)
+    )
+
 def log_market_state(decision, confidence, reason, market_data):
     """Saves a Sentinel Decision to the database."""
-    conn = get_db_connection()
-    if not conn:
-        return
+    try:
+        with pooled_connection() as conn:
+            if not conn:
+                return
+            
+            insert_market_log(conn, _market_state_row(decision, confidence, reason, market_data))
+            conn.commit()
+    except Exception as e:
+        print(f"Log Error: {e}")
 
+def queue_market_state(decision, confidence, reason, market_data):
+    """Same row as log_market_state, buffered for the background flusher instead of written inline."""
     try:
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO market_log (trend, structure, price, rsi, decision, confidence, reason)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (
-            str(market_data.get('trend', 'Neutral')),
-            str(market_data.get('structure', 'Scanning')),
-            float(market_data.get('price', 0)),
-            float(market_data.get('rsi', 50)),
-            str(decision),
-            int(confidence),
-            str(reason)
-        ))
-        conn.commit()
-        cur.close()
-        conn.close()
+        queue_market_log(_market_state_row(decision, confidence, reason, market_data))
     except Exception as e:
         print(f"Log Error: {e}")
 
+def _upsert_ai_analysis(cur, symbol, decision, confidence, reasoning, market_data):
+    # One row per symbol (unique index from init_db), replaced in place
+    cur.execute("""
+        INSERT INTO ai_analysis (symbol, decision, confidence, reasoning, price, rsi, trend)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (symbol) DO UPDATE SET
+            decision = EXCLUDED.decision, confidence = EXCLUDED.confidence,
+            reasoning = EXCLUDED.reasoning, price = EXCLUDED.price,
+            rsi = EXCLUDED.rsi, trend = EXCLUDED.trend, timestamp = CURRENT_TIMESTAMP
+    """, (
+        str(symbol),
+        str(decision),
+        int(confidence),
+        str(reasoning),
+        float(market_data.get('price', 0)),
+        float(market_data.get('rsi', 50)),
+        str(market_data.get('trend', 'Neutral'))
+    ))
+
 def save_ai_analysis(symbol, decision, confidence, reasoning, market_data):
     """Saves the latest AI analysis result for display in frontend."""
-    conn = get_db_connection()
-    if not conn:
-        return
-
     try:
-        cur = conn.cursor()
-        cur.execute("DELETE FROM ai_analysis WHERE symbol = %s", (str(symbol),))
-        
-        cur.execute("""
-            INSERT INTO ai_analysis (symbol, decision, confidence, reasoning, price, rsi, trend)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (
-            str(symbol),
-            str(decision),
-            int(confidence),
-            str(reasoning),
-            float(market_data.get('price', 0)),
-            float(market_data.get('rsi', 50)),
-            str(market_data.get('trend', 'Neutral'))
-        ))
-        conn.commit()
-        cur.close()
-        conn.close()
+        with pooled_connection() as conn:
+            if not conn:
+                return
+            
+            with conn.cursor() as cur:
+                _upsert_ai_analysis(cur, symbol, decision, confidence, reasoning, market_data)
+            conn.commit()
     except Exception as e:
         print(f"Save AI Analysis Error: {e}")
 
-def save_trade(trade_data):
-    """Saves a trade to the trade history table."""
-    conn = get_db_connection()
-    if not conn:
-        return None
+def save_analysis_and_log(symbol, decision, confidence, reasoning, market_data):
+    """
+    Saves the latest AI analysis and logs the Sentinel decision in a single transaction.
+    Equivalent to save_ai_analysis() followed by log_market_state(), with one commit.
+    """
+    try:
+        with pooled_connection() as conn:
+            if not conn:
+                return
+            
+            try:
+                with conn.cursor() as cur:
+                    _upsert_ai_analysis(cur, symbol, decision, confidence, reasoning, market_data)
+                insert_market_log(conn, _market_state_row(decision, confidence, reasoning, market_data))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    except Exception as e:
+        print(f"Save Analysis/Log Error: {e}")
+
+def _trade_params(trade_data):
+    params = {**TRADE_DEFAULTS, **trade_data}
+    # Empty/zero price, order id and notes are stored as NULL
+    params['price'] = params['price'] or None
+    params['order_id'] = params['order_id'] or None
+    params['notes'] = params['notes'] or None
+    return params
+
+def _insert_trade(cur, trade_data):
+    cur.execute(
+        "INSERT INTO trade_history (symbol, side, size, price, order_id, order_type, status, pnl, fees, notes) VALUES"
+        + TRADE_VALUES_TEMPLATE + "RETURNING id",
+        _trade_params(trade_data)
+    )
+    return cur.fetchone()['id']
+
+def save_trade(trade_data, conn=None):
+    """
+    Saves a trade to the trade history table.
+    With conn, the insert joins the caller's transaction: the caller commits, errors are raised,
+    and the caller calls _count_if_profitable(trade_data) once the commit succeeds.
+    """
+    if conn is not None:
+        with conn.cursor() as cur:
+            return _insert_trade(cur, trade_data)
     
     try:
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO trade_history (symbol, side, size, price, order_id, order_type, status, pnl, fees, notes)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING id
-        """, (
-            str(trade_data.get('symbol', '')),
-            str(trade_data.get('side', '')),
-            float(trade_data.get('size', 0)),
-            float(trade_data.get('price', 0)) if trade_data.get('price') else None,
-            str(trade_data.get('order_id', '')) if trade_data.get('order_id') else None,
-            str(trade_data.get('order_type', 'market')),
-            str(trade_data.get('status', 'filled')),
-            float(trade_data.get('pnl', 0)) if trade_data.get('pnl') is not None else None,
-            float(trade_data.get('fees', 0)) if trade_data.get('fees') is not None else None,
-            str(trade_data.get('notes', '')) if trade_data.get('notes') else None
-        ))
-        trade_id = cur.fetchone()['id']
-        conn.commit()
-        cur.close()
-        conn.close()
+        with pooled_connection() as conn:
+            if not conn:
+                return None
+            
+            with conn.cursor() as cur:
+                trade_id = _insert_trade(cur, trade_data)
+            conn.commit()
+        
+        _count_if_profitable(trade_data)
         return trade_id
     except Exception as e:
         print(f"Save Trade Error: {e}")
         return None
 
-def update_or_create_position(position_data):
-    """Updates existing position or creates new one."""
-    conn = get_db_connection()
-    if not conn:
-        return None
+def _count_if_profitable(trade_data):
+    """Keeps the cached profitable-trade count current after a committed insert."""
+    if trade_data.get('pnl') is not None and float(trade_data['pnl']) > 0:
+        _increment_profitable_count()
+
+def _increment_profitable_count():
+    global _profitable_count
+    with _profitable_count_lock:
+        if _profitable_count is not None:
+            _profitable_count += 1
+
+def count_profitable_trades():
+    """
+    Number of trades in trade_history with pnl > 0.
+    Cached for PROFITABLE_COUNT_TTL seconds; save_trade keeps the cached value current.
+    """
+    global _profitable_count, _profitable_count_at
+    with _profitable_count_lock:
+        if _profitable_count is not None and time.monotonic() - _profitable_count_at < PROFITABLE_COUNT_TTL:
+            return _profitable_count
     
     try:
-        cur = conn.cursor()
-        # Check if position exists
+        with pooled_connection() as conn:
+            if not conn:
+                return _profitable_count or 0
+            with conn.cursor() as cur:
+                cur.execute("SELECT COUNT(*) AS profitable FROM trade_history WHERE pnl > 0")
+                count = cur.fetchone()['profitable']
+    except Exception as e:
+        print(f"Count Profitable Trades Error: {e}")
+        return _profitable_count or 0
+    
+    with _profitable_count_lock:
+        _profitable_count = count
+        _profitable_count_at = time.monotonic()
+    return count
+
+POSITION_DEFAULTS = {
+    'symbol': '', 'side': '', 'size': 0, 'entry_price': 0, 'current_price': None,
+    'unrealized_pnl': None, 'leverage': 1, 'order_id': None
+}
+
+def _upsert_position(cur, position_data):
+    # Check if position exists
+    params = {**POSITION_DEFAULTS, **position_data}
+    params['current_price'] = params['current_price'] or None
+    params['order_id'] = params['order_id'] or None
+    params['leverage'] = int(params['leverage'])  # numpy ints have no psycopg2 adapter
+    
+    cur.execute("""
+        SELECT id FROM open_positions 
+        WHERE symbol = %(symbol)s AND side = %(side)s
+    """, params)
+    
+    existing = cur.fetchone()
+    
+    if existing:
+        # Update existing position
         cur.execute("""
-            SELECT id FROM open_positions 
-            WHERE symbol = %s AND side = %s
-        """, (str(position_data.get('symbol', '')), str(position_data.get('side', ''))))
-        
-        existing = cur.fetchone()
-        
-        if existing:
-            # Update existing position
-            cur.execute("""
-                UPDATE open_positions 
-                SET size = %s, current_price = %s, unrealized_pnl = %s, updated_at = CURRENT_TIMESTAMP
-                WHERE symbol = %s AND side = %s
-            """, (
-                float(position_data.get('size', 0)),
-                float(position_data.get('current_price', 0)) if position_data.get('current_price') else None,
-                float(position_data.get('unrealized_pnl', 0)) if position_data.get('unrealized_pnl') is not None else None,
-                str(position_data.get('symbol', '')),
-                str(position_data.get('side', ''))
-            ))
-        else:
-            # Create new position
-            cur.execute("""
-                INSERT INTO open_positions (symbol, side, size, entry_price, current_price, unrealized_pnl, leverage, order_id)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                str(position_data.get('symbol', '')),
-                str(position_data.get('side', '')),
-                float(position_data.get('size', 0)),
-                float(position_data.get('entry_price', 0)),
-                float(position_data.get('current_price', 0)) if position_data.get('current_price') else None,
-                float(position_data.get('unrealized_pnl', 0)) if position_data.get('unrealized_pnl') is not None else None,
-                int(position_data.get('leverage', 1)),
-                str(position_data.get('order_id', '')) if position_data.get('order_id') else None
-            ))
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+            UPDATE open_positions 
+            SET size = %(size)s, current_price = %(current_price)s, unrealized_pnl = %(unrealized_pnl)s,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE symbol = %(symbol)s AND side = %(side)s
+        """, params)
+    else:
+        # Create new position
+        cur.execute("""
+            INSERT INTO open_positions (symbol, side, size, entry_price, current_price, unrealized_pnl, leverage, order_id)
+            VALUES (%(symbol)s, %(side)s, %(size)s, %(entry_price)s, %(current_price)s, %(unrealized_pnl)s,
+                    %(leverage)s, %(order_id)s)
+        """, params)
+
+def update_or_create_position(position_data, conn=None):
+    """
+    Updates existing position or creates new one.
+    With conn, the write joins the caller's transaction: the caller commits and errors are raised.
+    """
+    if conn is not None:
+        with conn.cursor() as cur:
+            _upsert_position(cur, position_data)
+        return True
+    
+    try:
+        with pooled_connection() as conn:
+            if not conn:
+                return None
+            
+            with conn.cursor() as cur:
+                _upsert_position(cur, position_data)
+            conn.commit()
         return True
     except Exception as e:
         print(f"Update Position Error: {e}")
         return None
 
+def record_filled_trade(trade_data, position_data, register=None):
+    """
+    Writes a filled order's trade_history and open_positions rows in one transaction.
+    
+    register(conn), if given, runs inside the same transaction (the Position Manager
+    passes conn on to its own position sync) behind a savepoint, so a failed
+    registration write doesn't roll back the trade rows. Its return value is returned.
+    
+    If the shared transaction fails before register runs, the rows are written on their
+    own connections and register gets conn=None. If only the commit fails, the rows are
+    written on their own connections; RuntimeError is raised if those writes fail too.
+    """
+    register_pending = True
+    registered = None
+    register_error = None
+    try:
+        with pooled_connection() as conn:
+            if conn is not None:
+                try:
+                    save_trade(trade_data, conn=conn)
+                    update_or_create_position(position_data, conn=conn)
+                    if register:
+                        with conn.cursor() as cur:
+                            cur.execute("SAVEPOINT register_fill")
+                except Exception as e:
+                    print(f"Record Fill Error: {e}")
+                    conn.rollback()
+                else:
+                    register_pending = False
+                    if register:
+                        try:
+                            registered = register(conn)
+                        except Exception as e:
+                            register_error = e
+                        if register_error or conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_INERROR:
+                            with conn.cursor() as cur:
+                                cur.execute("ROLLBACK TO SAVEPOINT register_fill")
+                    
+                    conn.commit()
+                    _count_if_profitable(trade_data)
+                    if register_error:
+                        raise register_error
+                    return registered
+    except Exception as e:
+        if e is register_error:
+            raise
+        print(f"Record Fill Transaction Error: {e}")
+    
+    # Shared transaction unavailable or not committed: write the rows independently.
+    # save_trade counts a profitable trade itself once its own insert commits.
+    saved = save_trade(trade_data) is not None
+    saved = update_or_create_position(position_data) is not None and saved
+    if register_pending:
+        return register(None) if register else None
+    if not saved:
+        raise RuntimeError("Filled trade could not be recorded: shared commit and standalone writes failed")
+    if register_error:
+        raise register_error
+    return registered
+
 def close_position(symbol, side):
     """Closes a position by removing it from open_positions."""
-    conn = get_db_connection()
-    if not conn:
-        return False
-    
     try:
-        cur = conn.cursor()
-        cur.execute("""
-            DELETE FROM open_positions 
-            WHERE symbol = %s AND side = %s
-        """, (str(symbol), str(side)))
-        conn.commit()
-        cur.close()
-        conn.close()
+        with pooled_connection() as conn:
+            if not conn:
+                return False
+            
+            with conn.cursor() as cur:
+                cur.execute("""
+                    DELETE FROM open_positions 
+                    WHERE symbol = %s AND side = %s
+                """, (str(symbol), str(side)))
+            conn.commit()
         return True
     except Exception as e:
         print(f"Close Position Error: {e}")
@@ -342,47 +772,61 @@ def close_position(symbol, side):
 
 def get_open_positions():
     """Returns all open positions."""
-    conn = get_db_connection()
-    if not conn:
-        return []
-    
     try:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM open_positions ORDER BY opened_at DESC")
-        positions = cur.fetchall()
-        cur.close()
-        conn.close()
-        return [dict(pos) for pos in positions]
+        with pooled_connection() as conn:
+            if not conn:
+                return []
+            
+            with conn.cursor() as cur:
+                cur.execute("SELECT * FROM open_positions ORDER BY opened_at DESC")
+                # RealDictRows are already dicts
+                return cur.fetchall()
     except Exception as e:
         print(f"Get Positions Error: {e}")
         return []
 
+def get_open_position(symbol, side):
+    """Returns the open position for one symbol and side, or None."""
+    try:
+        with pooled_connection() as conn:
+            if not conn:
+                return None
+            
+            with conn.cursor() as cur:
+                # Served by the UNIQUE(symbol, side) index
+                cur.execute("SELECT * FROM open_positions WHERE symbol = %s AND side = %s LIMIT 1", (symbol, side))
+                position = cur.fetchone()
+        return dict(position) if position else None
+    except Exception as e:
+        print(f"Get Position Error: {e}")
+        return None
+
 def get_trade_history(limit=100, symbol=None):
     """Returns trade history, optionally filtered by symbol."""
-    conn = get_db_connection()
-    if not conn:
-        return []
-    
     try:
-        cur = conn.cursor()
-        if symbol:
-            cur.execute("""
-                SELECT * FROM trade_history 
-                WHERE symbol = %s 
-                ORDER BY execution_time DESC 
-                LIMIT %s
-            """, (str(symbol), limit))
-        else:
-            cur.execute("""
-                SELECT * FROM trade_history 
-                ORDER BY execution_time DESC 
-                LIMIT %s
-            """, (limit,))
-        
-        trades = cur.fetchall()
-        cur.close()
-        conn.close()
-        return [dict(trade) for trade in trades]
+        with pooled_connection() as conn:
+            if not conn:
+                return []
+            
+            # Large pages come through a server-side cursor in HISTORY_FETCH_SIZE chunks
+            cursor_name = "trade_history_cursor" if limit > HISTORY_CURSOR_THRESHOLD else None
+            with conn.cursor(name=cursor_name) as cur:
+                if cursor_name:
+                    cur.itersize = HISTORY_FETCH_SIZE
+                if symbol:
+                    cur.execute("""
+                        SELECT * FROM trade_history 
+                        WHERE symbol = %s 
+                        ORDER BY execution_time DESC 
+                        LIMIT %s
+                    """, (str(symbol), limit))
+                else:
+                    cur.execute("""
+                        SELECT * FROM trade_history 
+                        ORDER BY execution_time DESC 
+                        LIMIT %s
+                    """, (limit,))
+                return list(cur)
     except Exception as e:
         print(f"Get Trade History Error: {e}")
         return []
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+Shared candle features.
+
+Parses a candle list once and computes the indicators needed by both the
+technical analysis and the local ML model, so a sentinel cycle makes a single
+pass over the candles instead of one per consumer.
+"""
+
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from core.candles import CandleSet
+from core.indicators_numba import atr, ema, rsi
+
+CANDLE_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+@dataclass
+class FeatureFrame:
+    """Column arrays for one candle series plus its precomputed indicators."""
+    timestamp: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    rsi: np.ndarray
+    atr: np.ndarray
+    ema20: np.ndarray
+    ema50: np.ndarray
+    volume_mean: float  # NaN-skipping mean over the whole window (volume-spike baseline)
+
+    def __len__(self):
+        return len(self.close)
+
+
+def build_feature_frame(candles):
+    """
+    Builds a FeatureFrame from raw candles.
+
+    Args:
+        candles: CandleSet, or a list of candles as [timestamp, open, high, low, close, volume, ...]
+                 lists (Binance/WEEX format) or as dicts with those keys
+
+    Returns:
+        FeatureFrame, or None if the candles can't be parsed
+    """
+    try:
+        if not candles:
+            return None
+
+        if isinstance(candles, CandleSet):
+            return _frame_from_candle_set(candles)
+
+        if isinstance(candles[0], (list, tuple)):
+            # Numeric rows parse straight into column arrays; pandas only handles rows np can't cast
+            candle_set = CandleSet.from_raw(candles)
+            if candle_set is not None:
+                return _frame_from_candle_set(candle_set)
+            df = pd.DataFrame([c[:6] for c in candles], columns=CANDLE_COLUMNS[:len(candles[0][:6])])
+        else:
+            df = pd.DataFrame(candles)
+
+        if not all(col in df.columns for col in ['open', 'high', 'low', 'close']):
+            return None
+        if 'volume' not in df.columns:
+            df['volume'] = np.nan
+        if 'timestamp' not in df.columns:
+            df['timestamp'] = np.arange(len(df))
+
+        for col in CANDLE_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        df = df.dropna(subset=['open', 'high', 'low', 'close']).reset_index(drop=True)
+
+        return _frame_from_candle_set(CandleSet(
+            timestamp=df['timestamp'].to_numpy(dtype=np.float64),
+            open=df['open'].to_numpy(dtype=np.float64),
+            high=np.ascontiguousarray(df['high'].to_numpy(dtype=np.float64)),
+            low=np.ascontiguousarray(df['low'].to_numpy(dtype=np.float64)),
+            close=np.ascontiguousarray(df['close'].to_numpy(dtype=np.float64)),
+            volume=np.ascontiguousarray(df['volume'].to_numpy(dtype=np.float64)),
+        ))
+    except Exception as e:
+        print(f"Feature Frame Error: {e}")
+        return None
+
+
+def _frame_from_candle_set(candles):
+    """Computes the indicators for a CandleSet, skipping rows with a missing OHLC value."""
+    valid = ~(np.isnan(candles.open) | np.isnan(candles.high) | np.isnan(candles.low) | np.isnan(candles.close))
+    if not valid.all():
+        candles = CandleSet(*(np.ascontiguousarray(column[valid]) for column in (
+            candles.timestamp, candles.open, candles.high, candles.low, candles.close, candles.volume
+        )))
+
+    high, low, close, volume = candles.high, candles.low, candles.close, candles.volume
+    volume_seen = ~np.isnan(volume)
+    return FeatureFrame(
+        timestamp=candles.timestamp,
+        open=candles.open,
+        high=high,
+        low=low,
+        close=close,
+        volume=volume,
+        rsi=rsi(close, 14),
+        atr=atr(high, low, close, 14),
+        ema20=ema(close, 20),
+        ema50=ema(close, 50),
+        volume_mean=float(volume[volume_seen].mean()) if volume_seen.any() else np.nan,
+    )
@@ -1,8 +1,11 @@
+import asyncio
 import os
-import json
-import re
+import random
+import tempfile
+import orjson
+import threading
 import time
-from datetime import datetime, timedelta
+from collections import OrderedDict
 from google import genai
 from google.genai import types
 from dotenv import load_dotenv
@@ -20,11 +23,22 @@ client = genai.Client(
 
 last_api_call = None
 api_call_count = 0
-quota_exceeded_until = None
-cache = {} 
+quota_exceeded_until = None  # time.monotonic() deadline for the quota cooldown
+backoff_attempt = 0  # 429s in a row since the last successful call
+cache = OrderedDict()  # symbol -> {'result', 'ts'}, least recently used first
+cache_lock = threading.Lock()
 CACHE_DURATION = 60  
+CACHE_MAX = 256  # Symbols kept before the least recently used one is evicted
 MAX_DAILY_CALLS = 15  
-COOLDOWN_AFTER_QUOTA = 3600  
+COOLDOWN_AFTER_QUOTA = 3600  # Longest cooldown after repeated 429s
+BACKOFF_BASE = 5  # First cooldown without a server-provided delay, doubled per consecutive 429
+BATCH_POLL_SECONDS = 30  # Batch-mode job status checks
+BATCH_TIMEOUT = 24 * 3600  # Gemini completes batch jobs within 24h
+MAX_CONCURRENT_DECISIONS = 4  # Gemini requests in flight at once from the async path
+
+# Created on first use so they bind to the running event loop
+_decision_semaphore = None
+_throttle_lock = None
 
 def get_fallback_decision(market_data):
     """
@@ -94,17 +108,96 @@ def get_fallback_decision(market_data):
         "source": "FALLBACK_ENGINE"
     }
 
-def get_trading_decision(market_data, symbol="cmt_btcusdt", use_cache=True, ml_prediction=None, sentiment=None):
-    global last_api_call, api_call_count, quota_exceeded_until, cache
+# Constant parts of the single-market decision prompt; only the market context between them changes per call
+PROMPT_HEADER = "\n".join([
+    "You are CHARTOR, an institutional AI Trading Agent specializing in Al Brooks Price Action.",
+    "",
+    "MARKET CONTEXT:",
+]) + "\n"
+PROMPT_FOOTER = "\n" + "\n".join([
+    "",
+    "YOUR TASK:",
+    "Synthesize all inputs (Technical Analysis + ML Prediction + Sentiment) to make the final decision.",
+    "If ML and Technicals align, increase confidence. If they conflict, be more conservative.",
+    "If sentiment is strongly negative/positive, factor it into risk assessment.",
+    "",
+    "OUTPUT FORMAT (JSON ONLY):",
+    "{",
+    '    "decision": "BUY", "SELL" or "WAIT",',
+    '    "confidence": <integer between 0-100>,',
+    '    "reasoning": "<short, concise explanation incorporating all signals>"',
+    "}"
+])
+
+def _market_context_lines(market_data, symbol, ml_prediction=None, sentiment=None):
+    """Formats one market's inputs as the bullet lines used in the prompt."""
+    lines = [
+        f"- Asset: {symbol}",
+        f"- Price: {market_data.get('price', 0)}",
+        f"- Trend: {market_data.get('trend', 'Neutral')}",
+        f"- RSI (14): {market_data.get('rsi', 50)}",
+        f"- EMA 20: {market_data.get('ema_20', market_data.get('price', 0))}",
+        f"- Volatility (ATR): {market_data.get('volatility', 0)}",
+        f"- Volume Spike: {market_data.get('volume_spike', False)}"
+    ]
+    
+    if ml_prediction:
+        ml_dir = ml_prediction.get('direction', 'UNKNOWN')
+        ml_conf = ml_prediction.get('confidence', 0)
+        lines.append(f"- Local ML Prediction: {ml_dir} ({ml_conf}% confidence)")
+    
+    if sentiment:
+        sent_label = sentiment.get('label', 'NEUTRAL')
+        sent_score = sentiment.get('score', 0)
+        lines.append(f"- Market Sentiment: {sent_label} (score: {sent_score})")
+    
+    return lines
+
+def _strip_code_fence(response_text):
+    """Removes a markdown code fence Gemini sometimes wraps around JSON."""
+    response_text = response_text.strip()
+    if response_text.startswith("```"):
+        response_text = response_text[3:].removeprefix("json").lstrip()
+        if response_text.endswith("```"):
+            response_text = response_text[:-3].rstrip()
+    return response_text
+
+def _validate_decision(result):
+    """Clamps confidence and coerces the decision into BUY/SELL/WAIT in place."""
+    if 'confidence' not in result or not isinstance(result['confidence'], (int, float)):
+        print(f"Warning: Invalid confidence in Gemini response. Defaulting to 50%")
+        result['confidence'] = 50
+    
+    result['confidence'] = max(0, min(100, int(result['confidence'])))
+    
+    if 'decision' not in result or result['decision'] not in ['BUY', 'SELL', 'WAIT']:
+        print(f"Warning: Invalid decision in Gemini response. Defaulting to WAIT")
+        result['decision'] = 'WAIT'
     
-    if quota_exceeded_until and datetime.now() < quota_exceeded_until:
-        time_remaining = (quota_exceeded_until - datetime.now()).total_seconds()
+    return result
+
+def gemini_quota_exhausted():
+    """True while Gemini is in its quota cooldown or today's call budget is spent."""
+    if quota_exceeded_until and time.monotonic() < quota_exceeded_until:
+        return True
+    return api_call_count >= MAX_DAILY_CALLS
+
+def _decision_precheck(market_data, symbol, use_cache):
+    """Returns a cached or fallback decision when Gemini shouldn't be called, else None."""
+    now = time.monotonic()
+    if quota_exceeded_until and now < quota_exceeded_until:
+        time_remaining = quota_exceeded_until - now
         print(f"Gemini quota exceeded. Cooldown: {int(time_remaining/60)} minutes remaining")
         return get_fallback_decision(market_data)
     
-    if use_cache and symbol in cache:
-        cached = cache[symbol]
-        if datetime.now() - cached['timestamp'] < timedelta(seconds=CACHE_DURATION):
+    if use_cache:
+        with cache_lock:
+            cached = cache.get(symbol)
+            if cached is not None and now - cached['ts'] < CACHE_DURATION:
+                cache.move_to_end(symbol)
+            else:
+                cached = None
+        if cached is not None:
             print("Using cached analysis result")
             return cached['result']
     
@@ -112,119 +205,388 @@ def get_trading_decision(market_data, symbol="cmt_btcusdt", use_cache=True, ml_p
         print(f"Daily API limit reached ({MAX_DAILY_CALLS} calls). Using fallback engine.")
         return get_fallback_decision(market_data)
     
-    if last_api_call:
-        time_since_last = time.time() - last_api_call
-        if time_since_last < 2:
-            time.sleep(2 - time_since_last)
-    
     if not client or not api_key:
         print("Gemini client not available. Using fallback engine.")
         return get_fallback_decision(market_data)
     
+    return None
+
+def _throttle_seconds():
+    """Seconds left before the next Gemini call is allowed (min 2s spacing)."""
+    if last_api_call:
+        time_since_last = time.monotonic() - last_api_call
+        if time_since_last < 2:
+            return 2 - time_since_last
+    return 0
+
+def _build_decision_prompt(market_data, symbol, ml_prediction=None, sentiment=None):
+    context = "\n".join(_market_context_lines(market_data, symbol, ml_prediction, sentiment))
+    return PROMPT_HEADER + context + PROMPT_FOOTER
+
+# Older google-genai releases reject unknown config fields, so the tier is only sent when supported
+SERVICE_TIER_SUPPORTED = 'service_tier' in getattr(types.GenerateContentConfig, 'model_fields', {})
+
+def _decision_config(service_tier="standard"):
+    """
+    Generation config for decision calls. service_tier picks the inference tier:
+    "priority" for live trading (lower latency, not shed under load; Gemini quietly
+    serves it as standard once the priority limit is used up), "flex" for work that
+    can wait (half price, best effort) and "standard" for everything else.
+    """
+    config = {"temperature": 0.7, "response_mime_type": "application/json"}
+    if service_tier != "standard":
+        if SERVICE_TIER_SUPPORTED:
+            config["service_tier"] = service_tier
+        else:
+            print(f"Warning: installed google-genai has no service_tier; sending {service_tier} request as standard")
+    return types.GenerateContentConfig(**config)
+
+def _record_api_call():
+    global last_api_call, api_call_count
+    last_api_call = time.monotonic()
+    api_call_count += 1
+
+def _cache_decision(symbol, result):
+    with cache_lock:
+        cache[symbol] = {
+            'result': result,
+            'ts': time.monotonic()
+        }
+        cache.move_to_end(symbol)
+        if len(cache) > CACHE_MAX:
+            cache.popitem(last=False)
+
+def _is_quota_error(error_str):
+    return "429" in error_str or "RESOURCE_EXHAUSTED" in error_str or "quota" in error_str.lower()
+
+def _retry_after_seconds(error):
+    """Server-requested delay on a 429: the Retry-After header, else Gemini's RetryInfo retryDelay ("30s")."""
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if headers:
+        try:
+            return float(headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            pass
+    details = getattr(error, 'details', None)
+    if isinstance(details, dict):
+        for detail in details.get('error', {}).get('details', []):
+            delay = detail.get('retryDelay') if isinstance(detail, dict) else None
+            if delay:
+                try:
+                    return float(str(delay).rstrip('s'))
+                except ValueError:
+                    pass
+    return None
+
+def _start_quota_cooldown(error):
+    """Pauses Gemini after a 429 for the server's Retry-After, or an exponential backoff with jitter."""
+    global quota_exceeded_until, backoff_attempt
+    cooldown = _retry_after_seconds(error)
+    if cooldown is None:
+        cooldown = min(COOLDOWN_AFTER_QUOTA, BACKOFF_BASE * 2 ** backoff_attempt) + random.uniform(0, 2)
+    backoff_attempt += 1
+    quota_exceeded_until = time.monotonic() + cooldown
+    return cooldown
+
+def _clear_quota_cooldown():
+    global quota_exceeded_until, backoff_attempt
+    quota_exceeded_until = None
+    backoff_attempt = 0
+
+def _parse_decision_response(response_text, symbol, use_cache):
+    """Parses a Gemini reply, caches it and clears any quota cooldown."""
+    result = _validate_decision(orjson.loads(_strip_code_fence(response_text)))
+    
+    if use_cache:
+        _cache_decision(symbol, result)
+    
+    _clear_quota_cooldown()
+    return result
+
+def _decision_error_result(error, market_data, symbol, use_cache):
+    """Fallback decision for a failed Gemini call; starts the quota cooldown on 429s."""
+    error_str = str(error)
+    print(f"Gemini Error: {error_str[:200]}")
+    
+    if _is_quota_error(error_str):
+        cooldown = _start_quota_cooldown(error)
+        print(f"Gemini quota exceeded. Using fallback engine for next {cooldown:.0f} seconds.")
+    
+    result = get_fallback_decision(market_data)
+    result['status'] = 'ERROR'  # Override fallback status to indicate error occurred
+    result['error_message'] = error_str[:200]
+    result['source'] = 'FALLBACK'  # Ensure source is set
+    
+    if use_cache:
+        _cache_decision(symbol, result)
+    
+    return result
+
+def get_trading_decision(market_data, symbol="cmt_btcusdt", use_cache=True, ml_prediction=None, sentiment=None,
+                         service_tier="standard"):
+    early_result = _decision_precheck(market_data, symbol, use_cache)
+    if early_result is not None:
+        return early_result
+    
+    wait = _throttle_seconds()
+    if wait:
+        time.sleep(wait)
+    
+    prompt = _build_decision_prompt(market_data, symbol, ml_prediction, sentiment)
+    
+    try:
+        _record_api_call()
+        
+        response = client.models.generate_content(
+            model=model_name,
+            contents=prompt,
+            config=_decision_config(service_tier)
+        )
+        
+        result = _parse_decision_response(response.text, symbol, use_cache)
+        
+        # ============================================================
+        # CRITICAL: Add status to distinguish successful Gemini calls
+        # ============================================================
+        result['status'] = 'SUCCESS'
+        result['source'] = 'GEMINI'
+        
+        return result
+        
+    except Exception as e:
+        return _decision_error_result(e, market_data, symbol, use_cache)
+
+async def get_trading_decision_async(market_data, symbol="cmt_btcusdt", use_cache=True, ml_prediction=None, sentiment=None,
+                                     service_tier="standard"):
+    """
+    Same as get_trading_decision, but awaits Gemini through the SDK's async client
+    (client.aio) so the caller's event loop isn't blocked and no worker thread is tied up.
+    """
+    global _decision_semaphore, _throttle_lock
+    early_result = _decision_precheck(market_data, symbol, use_cache)
+    if early_result is not None:
+        return early_result
+    
+    if _decision_semaphore is None:
+        _decision_semaphore = asyncio.Semaphore(MAX_CONCURRENT_DECISIONS)
+        _throttle_lock = asyncio.Lock()
+    
+    prompt = _build_decision_prompt(market_data, symbol, ml_prediction, sentiment)
+    
+    try:
+        async with _decision_semaphore:
+            # Call starts stay 2s apart; the requests themselves overlap
+            async with _throttle_lock:
+                # Checked again here: concurrent callers all passed the precheck before any of
+                # them was counted, and one of them may have hit a 429 since
+                if gemini_quota_exhausted():
+                    print("Gemini budget used up by concurrent decisions. Using fallback engine.")
+                    return get_fallback_decision(market_data)
+                wait = _throttle_seconds()
+                if wait:
+                    await asyncio.sleep(wait)
+                _record_api_call()
+            
+            response = await client.aio.models.generate_content(
+                model=model_name,
+                contents=prompt,
+                config=_decision_config(service_tier)
+            )
+        
+        result = _parse_decision_response(response.text, symbol, use_cache)
+        result['status'] = 'SUCCESS'
+        result['source'] = 'GEMINI'
+        
+        return result
+        
+    except Exception as e:
+        return _decision_error_result(e, market_data, symbol, use_cache)
+
+async def get_trading_decisions_async(states, service_tier="standard"):
+    """
+    Decides several markets concurrently with get_trading_decision_async.
+    Each state is a dict with "market_data", "symbol" and optional "ml_prediction"/"sentiment";
+    returns one decision dict per state, in order.
+    """
+    return await asyncio.gather(*(
+        get_trading_decision_async(
+            state["market_data"],
+            symbol=state.get("symbol", "cmt_btcusdt"),
+            ml_prediction=state.get("ml_prediction"),
+            sentiment=state.get("sentiment"),
+            service_tier=service_tier
+        )
+        for state in states
+    ))
+
+def get_trading_decisions_batch(states, service_tier="standard"):
+    """
+    Decides several markets with a single Gemini call.
+    Each state is a dict with "market_data", "symbol" and optional "ml_prediction"/"sentiment".
+    Returns one decision dict per state, in order; markets Gemini skips get the fallback engine.
+    """
+    if not states:
+        return []
+    
+    def fallback_all():
+        return [get_fallback_decision(state.get('market_data', {})) for state in states]
+    
+    if quota_exceeded_until and time.monotonic() < quota_exceeded_until:
+        return fallback_all()
+    
+    if api_call_count >= MAX_DAILY_CALLS or not client or not api_key:
+        return fallback_all()
+    
+    wait = _throttle_seconds()
+    if wait:
+        time.sleep(wait)
+    
     prompt_parts = [
         "You are CHARTOR, an institutional AI Trading Agent specializing in Al Brooks Price Action.",
         "",
-        "MARKET CONTEXT:",
-        f"- Asset: {symbol}",
-        f"- Price: {market_data.get('price', 0)}",
-        f"- Trend: {market_data.get('trend', 'Neutral')}",
-        f"- RSI (14): {market_data.get('rsi', 50)}",
-        f"- EMA 20: {market_data.get('ema_20', market_data.get('price', 0))}",
-        f"- Volatility (ATR): {market_data.get('volatility', 0)}",
-        f"- Volume Spike: {market_data.get('volume_spike', False)}"
+        f"Analyze the following {len(states)} markets independently:",
     ]
-    
-    if ml_prediction:
-        ml_dir = ml_prediction.get('direction', 'UNKNOWN')
-        ml_conf = ml_prediction.get('confidence', 0)
-        prompt_parts.append(f"- Local ML Prediction: {ml_dir} ({ml_conf}% confidence)")
-    
-    if sentiment:
-        sent_label = sentiment.get('label', 'NEUTRAL')
-        sent_score = sentiment.get('score', 0)
-        prompt_parts.append(f"- Market Sentiment: {sent_label} (score: {sent_score})")
+    for index, state in enumerate(states, start=1):
+        prompt_parts.append("")
+        prompt_parts.append(f"{index}. MARKET CONTEXT:")
+        prompt_parts.extend(_market_context_lines(
+            state.get('market_data', {}),
+            state.get('symbol', 'cmt_btcusdt'),
+            state.get('ml_prediction'),
+            state.get('sentiment')
+        ))
     
     prompt_parts.extend([
         "",
         "YOUR TASK:",
-        "Synthesize all inputs (Technical Analysis + ML Prediction + Sentiment) to make the final decision.",
+        "For each market, synthesize all inputs (Technical Analysis + ML Prediction + Sentiment) to make the final decision.",
         "If ML and Technicals align, increase confidence. If they conflict, be more conservative.",
-        "If sentiment is strongly negative/positive, factor it into risk assessment.",
         "",
-        "OUTPUT FORMAT (JSON ONLY):",
-        "{",
-        '    "decision": "BUY", "SELL" or "WAIT",',
-        '    "confidence": <integer between 0-100>,',
-        '    "reasoning": "<short, concise explanation incorporating all signals>"',
-        "}"
+        f"OUTPUT FORMAT (JSON ARRAY ONLY, exactly {len(states)} items in the numbered order above):",
+        "[",
+        '    {"decision": "BUY", "SELL" or "WAIT", "confidence": <integer between 0-100>, "reasoning": "<short explanation>"}',
+        "]"
     ])
     
-    prompt = "\n".join(prompt_parts)
-    
     try:
-        last_api_call = time.time()
-        api_call_count += 1
+        _record_api_call()
         
         response = client.models.generate_content(
             model=model_name,
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                temperature=0.7,
-                response_mime_type="application/json"
-            )
+            contents="\n".join(prompt_parts),
+            config=_decision_config(service_tier)
         )
         
-        response_text = response.text.strip()
-        
-        if response_text.startswith("```"):
-            response_text = re.sub(r'^```(?:json)?\s*', '', response_text)
-            response_text = re.sub(r'\s*```$', '', response_text)
+        parsed = orjson.loads(_strip_code_fence(response.text))
+        if not isinstance(parsed, list):
+            raise ValueError("Gemini batch response is not a JSON array")
         
-        result = json.loads(response_text)
+        _clear_quota_cooldown()
         
-        if 'confidence' not in result or not isinstance(result['confidence'], (int, float)):
-            print(f"Warning: Invalid confidence in Gemini response. Defaulting to 50%")
-            result['confidence'] = 50
+        results = []
+        for index, state in enumerate(states):
+            if index < len(parsed) and isinstance(parsed[index], dict):
+                result = _validate_decision(parsed[index])
+                result['status'] = 'SUCCESS'
+                result['source'] = 'GEMINI'
+            else:
+                result = get_fallback_decision(state.get('market_data', {}))
+            results.append(result)
+        return results
         
-        result['confidence'] = max(0, min(100, int(result['confidence'])))
-        
-        if 'decision' not in result or result['decision'] not in ['BUY', 'SELL', 'WAIT']:
-            print(f"Warning: Invalid decision in Gemini response. Defaulting to WAIT")
-            result['decision'] = 'WAIT'
+    except Exception as e:
+        error_str = str(e)
+        print(f"Gemini Batch Error: {error_str[:200]}")
         
-        if use_cache:
-            cache[symbol] = {
-                'result': result,
-                'timestamp': datetime.now()
-            }
+        if _is_quota_error(error_str):
+            _start_quota_cooldown(e)
         
-        quota_exceeded_until = None
+        results = fallback_all()
+        for result in results:
+            result['status'] = 'ERROR'
+            result['error_message'] = error_str[:200]
+            result['source'] = 'FALLBACK'
+        return results
+
+def get_trading_decisions_batch_job(states, poll_interval=BATCH_POLL_SECONDS, timeout=BATCH_TIMEOUT):
+    """
+    Decides many markets through the Gemini Batch API, for offline work (backtests,
+    overnight scans) that can wait minutes to hours for an answer. Batch requests are
+    billed at half price and don't count against MAX_DAILY_CALLS.
+    Takes the same states as get_trading_decisions_batch and blocks until the job finishes;
+    returns one decision dict per state, in order, with the fallback engine for any gaps.
+    """
+    if not states:
+        return []
+    
+    def fallback(state, error_message=None):
+        result = get_fallback_decision(state.get('market_data', {}))
+        if error_message:
+            result['status'] = 'ERROR'
+            result['error_message'] = error_message[:200]
+            result['source'] = 'FALLBACK'
+        return result
+    
+    if not client or not api_key:
+        return [fallback(state) for state in states]
+    
+    try:
+        # One request per market, keyed by position so repeated symbols stay distinct
+        with tempfile.NamedTemporaryFile('wb', suffix='.jsonl', delete=False) as handle:
+            for index, state in enumerate(states):
+                prompt = _build_decision_prompt(
+                    state.get('market_data', {}),
+                    state.get('symbol', 'cmt_btcusdt'),
+                    state.get('ml_prediction'),
+                    state.get('sentiment')
+                )
+                handle.write(orjson.dumps({
+                    "key": str(index),
+                    "request": {
+                        "contents": [{"parts": [{"text": prompt}]}],
+                        "generationConfig": {"temperature": 0.7, "responseMimeType": "application/json"}
+                    }
+                }) + b"\n")
+            requests_path = handle.name
         
-        # ============================================================
-        # CRITICAL: Add status to distinguish successful Gemini calls
-        # ============================================================
-        result['status'] = 'SUCCESS'
-        result['source'] = 'GEMINI'
+        try:
+            uploaded = client.files.upload(
+                file=requests_path,
+                config=types.UploadFileConfig(display_name='chartor-decisions', mime_type='jsonl')
+            )
+        finally:
+            os.remove(requests_path)
         
-        return result
+        job = client.batches.create(model=model_name, src=uploaded.name, config={'display_name': 'chartor-decisions'})
+        print(f"Gemini batch job {job.name} submitted for {len(states)} markets")
         
-    except Exception as e:
-        error_str = str(e)
-        print(f"Gemini Error: {error_str[:200]}")
+        deadline = time.monotonic() + timeout
+        while job.state.name not in ('JOB_STATE_SUCCEEDED', 'JOB_STATE_FAILED', 'JOB_STATE_CANCELLED', 'JOB_STATE_EXPIRED'):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Gemini batch job {job.name} still {job.state.name} after {timeout}s")
+            time.sleep(poll_interval)
+            job = client.batches.get(name=job.name)
         
-        if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str or "quota" in error_str.lower():
-            quota_exceeded_until = datetime.now() + timedelta(seconds=COOLDOWN_AFTER_QUOTA)
-            print(f"Gemini quota exceeded. Using fallback engine for next {COOLDOWN_AFTER_QUOTA/60:.0f} minutes.")
+        if job.state.name != 'JOB_STATE_SUCCEEDED':
+            raise RuntimeError(f"Gemini batch job {job.name} ended as {job.state.name}")
         
-        result = get_fallback_decision(market_data)
-        result['status'] = 'ERROR'  # Override fallback status to indicate error occurred
-        result['error_message'] = error_str[:200]
-        result['source'] = 'FALLBACK'  # Ensure source is set
+        decisions = {}
+        for line in client.files.download(file=job.dest.file_name).splitlines():
+            if not line.strip():
+                continue
+            item = orjson.loads(line)
+            try:
+                text = item['response']['candidates'][0]['content']['parts'][0]['text']
+                result = _validate_decision(orjson.loads(_strip_code_fence(text)))
+            except (KeyError, IndexError, TypeError, orjson.JSONDecodeError):
+                continue  # Errored or malformed entry; that market falls back below
+            result['status'] = 'SUCCESS'
+            result['source'] = 'GEMINI'
+            decisions[item.get('key')] = result
         
-        if use_cache:
-            cache[symbol] = {
-                'result': result,
-                'timestamp': datetime.now()
-            }
+        return [decisions.get(str(index)) or fallback(state) for index, state in enumerate(states)]
         
-        return result
\ No newline at end of file
+    except Exception as e:
+        error_str = str(e)
+        print(f"Gemini Batch Job Error: {error_str[:200]}")
+        return [fallback(state, error_str) for state in states]
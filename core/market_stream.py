@@ -0,0 +1,190 @@
+"""
+Live kline cache fed by Binance's websocket stream.
+
+The sentinel used to pull 500 candles over REST on every scan. KlineStream
+seeds each watched symbol once over REST, then keeps it current from the
+<symbol>@kline_<interval> push stream, so a scan reads candles from memory and
+can wake as soon as a bar closes. While the socket is down, or a symbol
+couldn't be seeded, candle_set() returns None and callers fall back to REST.
+"""
+
+import asyncio
+from collections import deque
+
+import orjson
+import websockets
+
+from core.candles import CandleSet
+
+# Spot stream, matching the api.binance.com klines fetch_candles seeds from
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443/stream"
+RECONNECT_DELAY = 5  # seconds between reconnect attempts
+
+
+def binance_symbol(symbol):
+    """Maps a WEEX symbol ('cmt_btcusdt') to its Binance stream name ('btcusdt')."""
+    return symbol.lower().replace("cmt_", "").replace("_spbl", "")
+
+
+class KlineStream:
+    """In-memory candle buffers for the watched symbols, kept current by the kline websocket."""
+
+    def __init__(self, fetch_candles, interval="15m", maxlen=500):
+        """
+        Args:
+            fetch_candles: REST fetch used to seed a symbol, called as
+                           fetch_candles(symbol=..., limit=..., interval=...);
+                           must return None (or raise) on failure rather than
+                           simulated candles (WeexClient.fetch_binance_candles)
+            interval: Kline interval to subscribe to
+            maxlen: Closed candles kept per symbol
+        """
+        self.fetch_candles = fetch_candles
+        self.interval = interval
+        self.maxlen = maxlen
+        self.connected = False
+        self.bar_closed = asyncio.Event()  # Set whenever a watched symbol closes a bar
+
+        self._symbols = set()
+        self._closed = {}  # stream name -> deque of closed [t, o, h, l, c, v] rows
+        self._forming = {}  # stream name -> the still-open bar
+        self._pending = {}  # stream name -> (row, closed) frames received while watch() seeds it
+        self._ws = None
+        self._next_id = 1
+
+    def _stream_name(self, symbol):
+        return f"{binance_symbol(symbol)}@kline_{self.interval}"
+
+    async def watch(self, symbol):
+        """
+        Adds a symbol to the subscription. For an already watched symbol whose seed
+        failed, retries the seed, so calling this every scan heals a failed seed.
+        """
+        name = binance_symbol(symbol)
+        if name in self._symbols:
+            if self._ws is not None and self.connected and name not in self._closed:
+                await self._seed_live(name)
+            return
+        self._symbols.add(name)
+        # Also while run() is still seeding a fresh connection (connected not yet set):
+        # its subscription list was taken before this symbol was added
+        if self._ws is not None:
+            self._pending[name] = []
+            try:
+                await self._subscribe([name])
+            except Exception as e:
+                self._pending.pop(name, None)
+                print(f"Market Stream Subscribe Error: {e}")
+                return
+            await self._seed_live(name)
+
+    def candle_set(self, symbol):
+        """
+        Buffered candles for a symbol (closed bars plus the forming one), or None
+        while the stream is disconnected or the symbol hasn't been seeded yet.
+        """
+        name = binance_symbol(symbol)
+        if not self.connected or name not in self._closed:
+            return None
+        rows = list(self._closed[name])
+        forming = self._forming.get(name)
+        if forming is not None:
+            rows.append(forming)
+        return CandleSet.from_raw(rows)
+
+    async def run(self):
+        """Keeps the websocket connected until cancelled, re-seeding from REST after each reconnect."""
+        while True:
+            try:
+                async with websockets.connect(BINANCE_STREAM_URL, ping_interval=20) as ws:
+                    self._ws = ws
+                    if self._symbols:
+                        await self._subscribe(list(self._symbols))
+                    # Seed after subscribing but before reading: frames that arrive meanwhile
+                    # wait in the socket and are applied on top of the seed
+                    for name in list(self._symbols):
+                        await self._seed(name)
+                    self.connected = True
+                    async for message in ws:
+                        self._on_message(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Market Stream Error: {e}")
+            finally:
+                self.connected = False
+                self._ws = None
+                # Bars missed while disconnected would leave a gap; re-seed on the next connection
+                self._closed.clear()
+                self._forming.clear()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def _subscribe(self, names):
+        request = {
+            "method": "SUBSCRIBE",
+            "params": [f"{name}@kline_{self.interval}" for name in names],
+            "id": self._next_id
+        }
+        self._next_id += 1
+        await self._ws.send(orjson.dumps(request).decode())  # Text frame, as Binance expects
+
+    async def _seed(self, name):
+        """Loads a symbol's history over REST; on failure the symbol stays unseeded (candle_set() -> None)."""
+        try:
+            rows = await asyncio.to_thread(self.fetch_candles, symbol=name, limit=self.maxlen + 1, interval=self.interval)
+        except Exception as e:
+            print(f"Market Stream Seed Error ({name}): {e}")
+            rows = None
+        if not rows:
+            self._closed.pop(name, None)
+            self._forming.pop(name, None)
+            return
+        buffer = deque(maxlen=self.maxlen)
+        # The last REST row is the bar that is still open
+        buffer.extend([float(v) for v in row[:6]] for row in rows[:-1])
+        self._closed[name] = buffer
+        self._forming[name] = [float(v) for v in rows[-1][:6]]
+
+    async def _seed_live(self, name):
+        """
+        Seeds a symbol while run() is reading the socket. Frames for it that arrive
+        during the REST fetch are queued by _on_message and replayed on the seed.
+        """
+        self._pending.setdefault(name, [])
+        try:
+            await self._seed(name)
+        finally:
+            pending = self._pending.pop(name, [])
+        if name in self._closed:
+            for row, closed in pending:
+                self._apply(name, row, closed)
+
+    def _on_message(self, message):
+        payload = orjson.loads(message)
+        data = payload.get("data")
+        if not data or data.get("e") != "kline":
+            return  # Subscription acks and other control frames
+        name = data.get("s", "").lower()
+        k = data["k"]
+        row = [float(k["t"]), float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]), float(k["v"])]
+        if name not in self._closed:
+            pending = self._pending.get(name)
+            if pending is not None:
+                pending.append((row, k["x"]))  # Seed in flight; replayed once it lands
+            return
+        self._apply(name, row, k["x"])
+
+    def _apply(self, name, row, closed):
+        buffer = self._closed[name]
+        forming = self._forming.get(name)
+        if forming is not None and row[0] < forming[0]:
+            return  # Older than the bar the seed already has open
+        if closed:
+            if buffer and buffer[-1][0] == row[0]:
+                buffer[-1] = row
+            else:
+                buffer.append(row)
+            self._forming[name] = None
+            self.bar_closed.set()
+        else:
+            self._forming[name] = row
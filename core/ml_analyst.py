@@ -1,16 +1,33 @@
 import pandas as pd
-import pandas_ta as ta
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.ensemble import HistGradientBoostingClassifier
 import warnings
+from core.features import FeatureFrame, build_feature_frame
+from core.indicators_numba import ema, rolling_mean, rsi
 
 warnings.filterwarnings("ignore")
 
+# Tree ensembles work in float32 internally; handing them float32 avoids a copy per fit/predict
+FEATURE_DTYPE = np.float32
+
+def _pct_change(values):
+    """Bar-over-bar return as a NumPy array (first bar NaN), same values as Series.pct_change()."""
+    out = np.empty_like(values)
+    out[0] = np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(values[1:], values[:-1], out=out[1:])
+    out[1:] -= 1.0
+    return out
+
 class MLAnalyst:
     def __init__(self):
-        # Initialize a Random Forest Classifier
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42, max_depth=10)
+        # Gradient-boosted trees on binned features: a few shallow trees are plenty for
+        # 4 features and a few hundred bars, and single-row predictions stay cheap.
+        # min_samples_leaf is lowered from 20 so short windows can still split.
+        self.model = HistGradientBoostingClassifier(max_iter=50, max_depth=6, learning_rate=0.1,
+                                                    min_samples_leaf=5, random_state=42)
         self.is_trained = False
+        self._last_train_key = None  # (last candle timestamp, candle count) of the current fit
         self.feature_names = ['RSI', 'EMA_20', 'Return', 'Volume_Normalized']
 
     def prepare_features(self, df):
@@ -23,14 +40,16 @@ class MLAnalyst:
                     df[col] = pd.to_numeric(df[col], errors='coerce')
             
             # Add Technical Indicators
-            df['RSI'] = ta.rsi(df['close'], length=14)
-            df['EMA_20'] = ta.ema(df['close'], length=20)
-            df['Return'] = df['close'].pct_change()
+            close = np.ascontiguousarray(df['close'].to_numpy(dtype=np.float64))
+            df['RSI'] = rsi(close, 14)
+            df['EMA_20'] = ema(close, 20)
+            df['Return'] = _pct_change(close)
             
             # Normalize volume (use rolling mean for normalization)
             if 'volume' in df.columns:
-                volume_mean = df['volume'].rolling(window=20).mean()
-                df['Volume_Normalized'] = df['volume'] / (volume_mean + 1)  # Avoid division by zero
+                volume = np.ascontiguousarray(df['volume'].to_numpy(dtype=np.float64))
+                volume_mean = rolling_mean(volume, 20)
+                df['Volume_Normalized'] = volume / (volume_mean + 1)  # Avoid division by zero
             else:
                 df['Volume_Normalized'] = 1.0
             
@@ -45,55 +64,53 @@ class MLAnalyst:
         
         Args:
             candles: List of candles in format [timestamp, open, high, low, close, volume, ...]
+                     or a FeatureFrame already built for this cycle
         """
         try:
-            if not candles or len(candles) < 50:
-                return False
-            
-            # 1. Prepare Data
-            # Handle both list of lists and list of dicts
-            if isinstance(candles[0], (list, tuple)):
-                df = pd.DataFrame(candles, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'] + 
-                                 ['close_time', 'quote_volume', 'trades', 'taker_buy_base', 'taker_buy_quote', 'ignore'][:len(candles[0])-6])
+            if isinstance(candles, FeatureFrame):
+                frame = candles
             else:
-                df = pd.DataFrame(candles)
-            
-            # Keep only needed columns
-            required_cols = ['open', 'high', 'low', 'close', 'volume']
-            available_cols = [col for col in required_cols if col in df.columns]
-            if len(available_cols) < 4:  # Need at least open, high, low, close
-                return False
+                if not candles or len(candles) < 50:
+                    return False
+                frame = build_feature_frame(candles)
             
-            # Convert to numeric
-            for col in available_cols:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-            
-            # Drop rows with NaN in essential columns
-            df = df.dropna(subset=available_cols)
-            
-            if len(df) < 30:
+            if frame is None or len(frame) < 30:
                 return False
             
-            # 2. Prepare Features
-            df = self.prepare_features(df)
-            
-            # 3. Create Target (Did price go UP or DOWN in the next candle?)
-            # 1 = Up, 0 = Down
-            df['Target'] = (df['close'].shift(-1) > df['close']).astype(int)
+            # Skip the refit when no new candle has arrived since the last one
+            train_key = (float(frame.timestamp[-1]), len(frame))
+            if self.is_trained and train_key == self._last_train_key:
+                return True
             
-            # Drop NaN values created by indicators and target
-            df = df.dropna(subset=self.feature_names + ['Target'])
-            
-            if len(df) < 20:
+            # 1. Features shared with the technical analysis, in feature_names order
+            close, volume = frame.close, frame.volume
+            if np.isnan(volume).all():
+                volume_normalized = np.ones_like(close)
+            else:
+                # Normalize volume (use rolling mean for normalization)
+                volume_normalized = volume / (rolling_mean(volume, 20) + 1)  # Avoid division by zero
+            features = np.column_stack((frame.rsi, frame.ema20, _pct_change(close), volume_normalized))
+            
+            # 2. Create Target (Did price go UP or DOWN in the next candle?)
+            # 1 = Up, 0 = Down; the last bar has no next candle and is left out
+            features = features[:-1]
+            target = (close[1:] > close[:-1]).astype(np.int8)
+            
+            # Drop rows with NaN values created by the indicators
+            valid = ~np.isnan(features).any(axis=1)
+            if valid.sum() < 20:
                 return False
+            if target[valid].min() == target[valid].max():
+                return False  # Only one outcome in the window; nothing to classify
             
-            # 4. Features to train on
-            X = df[self.feature_names].values
-            y = df['Target'].values
+            # 3. Features to train on
+            X = features[valid].astype(FEATURE_DTYPE)
+            y = target[valid]
             
             # Train the model
             self.model.fit(X, y)
             self.is_trained = True
+            self._last_train_key = train_key
             return True
             
         except Exception as e:
@@ -102,12 +119,14 @@ class MLAnalyst:
             traceback.print_exc()
             return False
 
-    def predict_next_move(self, market_state):
+    def predict_next_move(self, market_state, frame=None):
         """
         Predicts next price move based on current market state.
         
         Args:
             market_state: Dict with keys like 'rsi', 'ema_20', 'price', 'volume'
+            frame: Optional FeatureFrame for this cycle; when given, the last bar's
+                   real return and normalized volume are used instead of proxies
             
         Returns:
             tuple: (direction, confidence) where direction is 'UP' or 'DOWN'
@@ -122,30 +141,37 @@ class MLAnalyst:
             ema_20 = float(market_state.get('ema_20', market_state.get('price', 0)))
             price = float(market_state.get('price', 0))
             
-            # Calculate return (simplified - use recent price change if available)
-            # For now, use a small default return
-            price_return = 0.01  # Default 1% return assumption
-            if 'price_change' in market_state:
-                price_return = float(market_state.get('price_change', 0.01))
-            elif 'volatility' in market_state and price > 0:
-                # Use volatility as proxy for return expectation
-                price_return = float(market_state.get('volatility', 0)) / price if price > 0 else 0.01
-            
-            # Normalize volume
-            volume = float(market_state.get('volume', 1000))
-            volume_normalized = 1.0  # Default
-            if 'volume_spike' in market_state:
-                volume_normalized = 1.5 if market_state.get('volume_spike') else 1.0
+            if frame is not None and len(frame) >= 21:
+                # Same definitions as training: last-bar pct change and volume / (20-bar mean + 1)
+                price_return = float(frame.close[-1] / frame.close[-2] - 1) if frame.close[-2] else 0.0
+                volume_normalized = float(frame.volume[-1] / (np.mean(frame.volume[-20:]) + 1))
+                if np.isnan(volume_normalized):
+                    volume_normalized = 1.0
+            else:
+                # Calculate return (simplified - use recent price change if available)
+                # For now, use a small default return
+                price_return = 0.01  # Default 1% return assumption
+                if 'price_change' in market_state:
+                    price_return = float(market_state.get('price_change', 0.01))
+                elif 'volatility' in market_state and price > 0:
+                    # Use volatility as proxy for return expectation
+                    price_return = float(market_state.get('volatility', 0)) / price if price > 0 else 0.01
+                
+                # Normalize volume
+                volume_normalized = 1.0  # Default
+                if 'volume_spike' in market_state:
+                    volume_normalized = 1.5 if market_state.get('volume_spike') else 1.0
             
             # Create feature vector matching training: [RSI, EMA_20, Return, Volume_Normalized]
-            current_features = np.array([[rsi, ema_20, price_return, volume_normalized]])
+            current_features = np.array([[rsi, ema_20, price_return, volume_normalized]], dtype=FEATURE_DTYPE)
             
             # Predict
-            prediction = self.model.predict(current_features)[0]
             probabilities = self.model.predict_proba(current_features)[0]
+            best = int(np.argmax(probabilities))
+            prediction = self.model.classes_[best]
             
             # Get confidence (probability of predicted class)
-            confidence = probabilities[prediction] * 100
+            confidence = probabilities[best] * 100
             
             direction = "UP" if prediction == 1 else "DOWN"
             return direction, round(confidence, 1)
@@ -159,7 +185,7 @@ class MLAnalyst:
         """Returns model training status."""
         return {
             "is_trained": self.is_trained,
-            "model_type": "RandomForestClassifier",
+            "model_type": "HistGradientBoostingClassifier",
             "features": self.feature_names
         }
 
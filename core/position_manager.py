@@ -12,7 +12,7 @@ from enum import Enum
 import logging
 
 from core.weex_api import WeexClient
-from core.db_manager import update_or_create_position, close_position as db_close_position, save_trade, get_db_connection
+from core.db_manager import update_or_create_position, close_position as db_close_position, save_trade
 
 
 class PositionStatus(Enum):
@@ -102,7 +102,8 @@ class UnifiedPositionManager:
                      atr: float,
                      order_id: Optional[str] = None,
                      source: str = "SENTINEL",
-                     metadata: Optional[Dict] = None) -> bool:
+                     metadata: Optional[Dict] = None,
+                     conn=None) -> bool:
         """
         Open a new position with full lifecycle management
         
@@ -120,6 +121,8 @@ class UnifiedPositionManager:
             order_id: WEEX order ID
             source: "SENTINEL" or "INSTITUTIONAL"
             metadata: Additional data
+            conn: Open DB connection whose transaction the position sync joins
+                  (see db_manager.record_filled_trade); the caller commits
         
         Returns:
             bool: Success status
@@ -158,29 +161,29 @@ class UnifiedPositionManager:
             self.positions[symbol] = position
             self.total_positions_opened += 1
             
-            # Sync to database
-            try:
-                update_or_create_position({
-                    "symbol": symbol,
-                    "side": direction,
-                    "size": size,
-                    "entry_price": entry_price,
-                    "current_price": entry_price,
-                    "unrealized_pnl": 0.0,
-                    "leverage": leverage,
-                    "order_id": order_id
-                })
-            except Exception as e:
-                self.logger.error(f"Failed to sync position to database: {e}")
-            
-            self.logger.info(f"✅ Position opened: {symbol} {direction} {size} @ ${entry_price:.2f}")
-            self.logger.info(f"   SL: ${stop_loss:.2f} | TP: ${take_profit:.2f} | Source: {source}")
-            
             # Start monitoring if not already running
             if not self.monitor_running:
                 self.start_monitoring()
-            
-            return True
+        
+        # Sync to database outside the lock so the monitor loop isn't held up by the round trip
+        try:
+            update_or_create_position({
+                "symbol": symbol,
+                "side": direction,
+                "size": size,
+                "entry_price": entry_price,
+                "current_price": entry_price,
+                "unrealized_pnl": 0.0,
+                "leverage": leverage,
+                "order_id": order_id
+            }, conn=conn)
+        except Exception as e:
+            self.logger.error(f"Failed to sync position to database: {e}")
+        
+        self.logger.info(f"✅ Position opened: {symbol} {direction} {size} @ ${entry_price:.2f}")
+        self.logger.info(f"   SL: ${stop_loss:.2f} | TP: ${take_profit:.2f} | Source: {source}")
+        
+        return True
     
     def update_position_price(self, symbol: str, current_price: float):
         """Update position with current market price"""
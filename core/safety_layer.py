@@ -4,12 +4,12 @@ Pre-execution validation to prevent dangerous trades
 All checks MUST pass before order submission
 """
 import logging
+import numpy as np
 from typing import Tuple, List, Dict, Optional
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 
 from core.weex_api import WeexClient
-from core.db_manager import get_db_connection
 
 
 @dataclass
@@ -66,6 +66,21 @@ class ExecutionSafetyLayer:
         "D": ["cmt_xrpusdt", "cmt_adausdt"]
     }
     
+    # Rule table for validate_trade: one row per comparison, evaluated in a single pass.
+    # A failing row is re-run through its check_* method for the detailed message.
+    OP_GE, OP_GT, OP_LE = 0, 1, 2
+    RULE_CHECKS = (
+        ("SYMBOL_VALIDITY", "check_symbol_validity"),
+        ("MINIMUM_ORDER_SIZE", "check_minimum_order_size"),
+        ("PRICE_REASONABLENESS", "check_price_reasonableness"),
+        ("MARGIN_AVAILABILITY", "check_margin_availability"),
+        ("LIQUIDATION_DISTANCE", "check_liquidation_distance"),
+        ("DAILY_LOSS_LIMIT", "check_daily_loss_limit"),
+        ("MAX_DRAWDOWN", "check_max_drawdown"),
+        ("EXPOSURE_LIMIT", "check_exposure_limit"),
+        ("CORRELATION_CONFLICT", "check_correlation_conflict"),
+    )
+    
     def __init__(self,
                  weex_client: WeexClient,
                  initial_equity: float = 10000.0,
@@ -91,6 +106,19 @@ class ExecutionSafetyLayer:
         self.total_rejections = 0
         self.rejection_reasons: Dict[str, int] = {}
         
+        # Rows: symbol, min size, positive prices, R:R, margin, liquidation,
+        # daily loss, drawdown, exposure, correlation
+        self._ops = np.array([
+            self.OP_GE, self.OP_GE, self.OP_GT, self.OP_GE, self.OP_GE,
+            self.OP_GE, self.OP_GE, self.OP_LE, self.OP_LE, self.OP_GE
+        ], dtype=np.int8)
+        self._thresholds = np.array([
+            1.0, 0.0, 0.0, 1.0, 0.0,
+            self.MIN_LIQUIDATION_DISTANCE_PCT * 100, -self.MAX_DAILY_LOSS_PCT,
+            self.MAX_DRAWDOWN_PCT, self.MAX_EXPOSURE_PCT, 1.0
+        ])
+        self._rule_check = np.array([0, 1, 2, 2, 3, 4, 5, 6, 7, 8], dtype=np.intp)
+        
         self.logger.info("🛡️ Execution Safety Layer initialized")
     
     def reset_daily_tracking(self):
@@ -369,6 +397,49 @@ class ExecutionSafetyLayer:
             severity="INFO"
         )
     
+    def _rule_actuals(self,
+                      symbol: str,
+                      direction: str,
+                      size: float,
+                      entry_price: float,
+                      stop_loss: float,
+                      take_profit: float,
+                      leverage: int,
+                      margin_required: float,
+                      current_positions: List[Dict]) -> np.ndarray:
+        """Measured value for every row of the rule table (NaN where undefined)"""
+        used_margin = sum(p.get("margin_used", 0) for p in current_positions)
+        equity = np.float64(self.current_equity)
+        entry = np.float64(entry_price)
+        
+        stop_distance = abs(entry_price - stop_loss)
+        risk_reward = abs(take_profit - entry_price) / stop_distance if stop_distance > 0 else 0.0
+        
+        liq_offset = (1 / np.float64(leverage)) * 0.9
+        if not leverage:
+            distance_from_liq = np.nan
+        elif direction == "LONG":
+            distance_from_liq = (stop_loss - entry * (1 - liq_offset)) / entry
+        else:
+            distance_from_liq = (entry * (1 + liq_offset) - stop_loss) / entry
+        
+        symbol_group = next((g for g, symbols in self.CORRELATION_GROUPS.items() if symbol in symbols), None)
+        group_symbols = self.CORRELATION_GROUPS.get(symbol_group, ())
+        conflict = any(p.get("symbol") in group_symbols and p.get("symbol") != symbol for p in current_positions)
+        
+        return np.array([
+            1.0 if symbol in self.MIN_ORDER_SIZES else 0.0,
+            size - self.MIN_ORDER_SIZES.get(symbol, 0.001),
+            min(entry_price, stop_loss, take_profit),
+            risk_reward,
+            (equity - used_margin) - margin_required,
+            distance_from_liq * 100,
+            (equity - self.daily_starting_equity) / np.float64(self.daily_starting_equity),
+            (self.peak_equity - equity) / np.float64(self.peak_equity),
+            (used_margin + margin_required) / equity,
+            0.0 if conflict else 1.0
+        ], dtype=np.float64)
+    
     def validate_trade(self,
                       symbol: str,
                       direction: str,
@@ -386,18 +457,46 @@ class ExecutionSafetyLayer:
             (can_execute, check_results)
         """
         self.total_checks += 1
-        results = []
+        self.reset_daily_tracking()
         
-        # Run all checks
-        results.append(self.check_symbol_validity(symbol))
-        results.append(self.check_minimum_order_size(symbol, size))
-        results.append(self.check_price_reasonableness(symbol, entry_price, stop_loss, take_profit))
-        results.append(self.check_margin_availability(margin_required, current_positions))
-        results.append(self.check_liquidation_distance(entry_price, direction, leverage, stop_loss))
-        results.append(self.check_daily_loss_limit())
-        results.append(self.check_max_drawdown())
-        results.append(self.check_exposure_limit(margin_required, current_positions))
-        results.append(self.check_correlation_conflict(symbol, current_positions))
+        check_args = {
+            "check_symbol_validity": (symbol,),
+            "check_minimum_order_size": (symbol, size),
+            "check_price_reasonableness": (symbol, entry_price, stop_loss, take_profit),
+            "check_margin_availability": (margin_required, current_positions),
+            "check_liquidation_distance": (entry_price, direction, leverage, stop_loss),
+            "check_daily_loss_limit": (),
+            "check_max_drawdown": (),
+            "check_exposure_limit": (margin_required, current_positions),
+            "check_correlation_conflict": (symbol, current_positions),
+        }
+        
+        # Evaluate every rule at once; a row that can't be measured (NaN/inf or a
+        # bad input) fails and gets re-checked by its scalar method below
+        try:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                actuals = self._rule_actuals(symbol, direction, size, entry_price, stop_loss,
+                                             take_profit, leverage, margin_required, current_positions)
+                compared = np.choose(self._ops, (
+                    actuals >= self._thresholds,
+                    actuals > self._thresholds,
+                    actuals <= self._thresholds,
+                ))
+            failed_checks = set(self._rule_check[np.flatnonzero(~compared)].tolist())
+        except Exception:
+            failed_checks = set(range(len(self.RULE_CHECKS)))
+        
+        results = []
+        for index, (check_name, method_name) in enumerate(self.RULE_CHECKS):
+            if index in failed_checks:
+                results.append(getattr(self, method_name)(*check_args[method_name]))
+            else:
+                results.append(SafetyCheckResult(
+                    passed=True,
+                    check_name=check_name,
+                    message="OK",
+                    severity="INFO"
+                ))
         
         # Determine if trade can execute
         critical_failures = [r for r in results if not r.passed and r.severity == "CRITICAL"]
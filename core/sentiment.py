@@ -1,4 +1,3 @@
-from transformers import pipeline
 import warnings
 
 # Suppress warnings to keep terminal clean
@@ -12,6 +11,8 @@ def get_sentiment_pipeline():
     global _sentiment_pipeline
     if _sentiment_pipeline is None:
         try:
+            # Imported here so importing this module doesn't pull in transformers/torch
+            from transformers import pipeline
             print("Loading Local FinBERT Model... (This runs offline)")
             # FinBERT is specialized for Financial Sentiment
             # The pipeline handles tokenization and model inference automatically
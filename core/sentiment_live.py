@@ -89,6 +89,7 @@ class RealTimeSentimentFeed:
         """
         self.api_key = api_key or os.getenv("CRYPTOPANIC_API_KEY")
         self.cache: Dict[str, Dict] = {}
+        self.session = requests.Session()  # Reuses the CryptoPanic connection between polls
         self.use_api = self.api_key is not None
         
         if not self.use_api:
@@ -149,7 +150,7 @@ class RealTimeSentimentFeed:
                 "public": "true"
             }
             
-            response = requests.get(
+            response = self.session.get(
                 f"{self.CRYPTOPANIC_BASE_URL}/posts/",
                 params=params,
                 timeout=5
@@ -0,0 +1,52 @@
+"""
+Sentinel CPU pipeline.
+
+Feature building, ML training/prediction and technical analysis for one
+sentinel cycle, packaged as a top-level function so it can run in a separate
+process and keep the API server's GIL free for request handlers.
+"""
+
+from core.analysis import analyze_market_structure
+from core.features import build_feature_frame
+from core.ml_analyst import MLAnalyst
+
+# One analyst per worker process, kept across cycles so unchanged bars skip the refit
+_ml_analyst = None
+
+
+def run_cpu_pipeline(candles):
+    """
+    Runs the CPU-bound part of a sentinel cycle.
+
+    Args:
+        candles: CandleSet from WeexClient.fetch_candle_set (raw candle rows also work)
+
+    Returns:
+        Plain dict with "market_state" (None if analysis failed), "ml_trained",
+        "ml_direction" and "ml_confidence"
+    """
+    global _ml_analyst
+    if _ml_analyst is None:
+        _ml_analyst = MLAnalyst()
+
+    result = {
+        "market_state": None,
+        "ml_trained": False,
+        "ml_direction": "UNKNOWN",
+        "ml_confidence": 0.0
+    }
+
+    frame = build_feature_frame(candles)
+    if frame is None:
+        return result
+
+    result["ml_trained"] = _ml_analyst.train_model(frame)
+    market_state = analyze_market_structure(frame)
+    if not market_state:
+        return result
+
+    result["market_state"] = market_state
+    ml_direction, ml_confidence = _ml_analyst.predict_next_move(market_state, frame)
+    result["ml_direction"] = ml_direction
+    result["ml_confidence"] = float(ml_confidence)
+    return result
@@ -3,8 +3,12 @@ Strategy Evaluator Module
 Evaluates active strategies against real-time market data.
 """
 import re
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
-from core.db_manager import get_db_connection
+from core.db_manager import pooled_connection
+
+LOGIC_CACHE_SIZE = 256  # distinct logic strings kept compiled
+LOGIC_CONSTANTS = {'True': True, 'False': False, 'true': True, 'false': False}
 
 
 def evaluate_strategies(market_data: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -27,19 +31,17 @@ def evaluate_strategies(market_data: Dict[str, Any]) -> List[Dict[str, Any]]:
     triggered_strategies = []
     
     try:
-        conn = get_db_connection()
-        if not conn:
-            return triggered_strategies
-        
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT id, name, logic, action, description
-            FROM strategies
-            WHERE is_active = TRUE
-        """)
-        strategies = cur.fetchall()
-        cur.close()
-        conn.close()
+        with pooled_connection() as conn:
+            if not conn:
+                return triggered_strategies
+            
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT id, name, logic, action, description
+                    FROM strategies
+                    WHERE is_active = TRUE
+                """)
+                strategies = cur.fetchall()
         
         for strat in strategies:
             logic = strat.get('logic', '')
@@ -63,6 +65,15 @@ def evaluate_strategies(market_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         return []
 
 
+@lru_cache(maxsize=LOGIC_CACHE_SIZE)
+def compile_logic(logic: str):
+    """
+    Compiles a logic string to a code object once; later ticks reuse it instead of re-parsing.
+    Raises SyntaxError for logic that isn't a valid expression.
+    """
+    return compile(logic.strip(), '<strategy>', 'eval')
+
+
 def evaluate_logic(logic: str, market_data: Dict[str, Any]) -> bool:
     """
     Safely evaluates a logic string against market data.
@@ -95,13 +106,10 @@ def evaluate_logic(logic: str, market_data: Dict[str, Any]) -> bool:
             'volatility': volatility,
             'trend': trend,
             'volume_spike': volume_spike,
-            'True': True,
-            'False': False,
-            'true': True,
-            'false': False,
+            **LOGIC_CONSTANTS
         }
         
-        result = eval(logic, {"__builtins__": {}}, safe_dict)
+        result = eval(compile_logic(logic), {"__builtins__": {}}, safe_dict)
         
         return bool(result)
     
@@ -113,19 +121,17 @@ def evaluate_logic(logic: str, market_data: Dict[str, Any]) -> bool:
 def get_active_strategies() -> List[Dict[str, Any]]:
     """Helper function to get all active strategies."""
     try:
-        conn = get_db_connection()
-        if not conn:
-            return []
-        
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT id, name, logic, action, description, is_active
-            FROM strategies
-            WHERE is_active = TRUE
-        """)
-        strategies = cur.fetchall()
-        cur.close()
-        conn.close()
+        with pooled_connection() as conn:
+            if not conn:
+                return []
+            
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT id, name, logic, action, description, is_active
+                    FROM strategies
+                    WHERE is_active = TRUE
+                """)
+                strategies = cur.fetchall()
         
         return [dict(s) for s in strategies]
     except Exception as e:
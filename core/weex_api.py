@@ -1,23 +1,47 @@
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import hmac
 import hashlib
 import base64
 import json
+import orjson
 import os
 import random
+import threading
 import urllib.parse
 from dotenv import load_dotenv
+from core.candles import CandleSet
 
 load_dotenv()
 
 class WeexClient:
-    def __init__(self, api_key=None, secret_key=None, passphrase=None):
+    BALANCE_REFRESH_SECONDS = 30
+    POOL_MAXSIZE = 32  # keep-alive connections per host; above requests' default of 10 so concurrent calls reuse them
+    
+    def __init__(self, api_key=None, secret_key=None, passphrase=None, session=None):
         self.api_key = api_key or os.getenv("WEEX_API_KEY")
         self.secret_key = secret_key or os.getenv("WEEX_SECRET")
         self.passphrase = passphrase or os.getenv("WEEX_PASSPHRASE")
         
         self.base_url = "https://api-contract.weex.com"
+        # Keep-alive connections shared by every request this client makes (and by any client given this session).
+        # No retries at this layer: order POSTs must not be replayed.
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=self.POOL_MAXSIZE))
+        self.session = session
+        
+        # Balance cache kept current by start_balance_stream()
+        self._balances = {}
+        self._balances_updated_at = None
+        self._balances_lock = threading.Lock()
+        self._balance_stream_running = False
+        self._balance_thread = None
+
+    def close(self):
+        """Closes the pooled keep-alive connections."""
+        self.session.close()
 
     def _generate_signature(self, method, path, query_string="", body=""):
         """
@@ -59,7 +83,8 @@ class WeexClient:
         if method == "GET" and params:
             query_string = "?" + "&".join([f"{k}={v}" for k, v in sorted(params.items())])
         elif method == "POST" and params:
-            body_str = json.dumps(params)
+            # orjson handles the numpy scalars that end up in AI log payloads
+            body_str = orjson.dumps(params, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
         else:
             body_str = "" 
 
@@ -92,9 +117,9 @@ class WeexClient:
         try:
             if method == "GET":
                 full_url = url + query_string if query_string else url
-                res = requests.get(full_url, headers=headers, timeout=5)
+                res = self.session.get(full_url, headers=headers, timeout=5)
             else:
-                res = requests.post(url, headers=headers, data=body_str, timeout=5)
+                res = self.session.post(url, headers=headers, data=body_str.encode('utf-8'), timeout=5)
             
             if res.status_code != 200:
                 print(f"WEEX API Error {res.status_code}: {res.text[:200] if res.text else 'No response body'}")
@@ -126,6 +151,18 @@ class WeexClient:
         Fetches Chart Data from BINANCE (Reliable/Public)
         Maps WEEX symbol 'cmt_btcusdt' -> Binance 'BTCUSDT'
         """
+        data = self.fetch_binance_candles(symbol=symbol, limit=limit, interval=interval)
+        if data:
+            return data
+
+        print("Network Blocked. Using Simulation Data.")
+        return self._generate_mock_candles(limit)
+
+    def fetch_binance_candles(self, symbol="cmt_btcusdt", limit=100, interval="15m"):
+        """
+        Binance klines only: returns None when Binance fails or returns no rows,
+        instead of falling back to simulated candles like fetch_candles does.
+        """
         binance_symbol = symbol.upper().replace("CMT_", "").replace("USDT", "USDT")
         if binance_symbol.endswith("_SPBL"): binance_symbol = binance_symbol.replace("_SPBL", "")
         
@@ -137,7 +174,7 @@ class WeexClient:
         }
         
         try:
-            response = requests.get(url, params=params, timeout=5)
+            response = self.session.get(url, params=params, timeout=5)
             data = response.json()
             
             if isinstance(data, list) and len(data) > 0:
@@ -146,8 +183,14 @@ class WeexClient:
         except Exception as e:
             print(f"Binance Fetch Error: {e}")
 
-        print("Network Blocked. Using Simulation Data.")
-        return self._generate_mock_candles(limit)
+        return None
+
+    def fetch_candle_set(self, symbol="cmt_btcusdt", limit=100, interval="15m"):
+        """
+        Same data as fetch_candles, as a columnar CandleSet (float64 arrays, oldest first).
+        Returns None if the candles can't be parsed.
+        """
+        return CandleSet.from_raw(self.fetch_candles(symbol=symbol, limit=limit, interval=interval))
 
     def place_order(self, side="buy", size="10", symbol="cmt_ethusdt", order_type="market", price=None, 
                     client_oid=None, preset_take_profit=None, preset_stop_loss=None):
@@ -297,6 +340,74 @@ class WeexClient:
         endpoint = "/capi/v2/account/assets"
         return self._send_weex_request("GET", endpoint)
     
+    def get_balance_map(self):
+        """
+        Fetches account assets keyed by coin name, e.g. {'USDT': {...}}
+        Returns an empty dict if the request fails
+        """
+        data = self.get_balance()
+        if not data:
+            return {}
+        
+        assets = data if isinstance(data, list) else [data]
+        return {asset['coinName']: asset for asset in assets if isinstance(asset, dict) and asset.get('coinName')}
+    
+    def _refresh_balances(self):
+        """Pulls account assets once and replaces the cached available balances."""
+        assets = self.get_balance_map()
+        if not assets:
+            return False
+        
+        balances = {}
+        for coin, asset in assets.items():
+            try:
+                balances[coin] = float(asset.get('available', 0))
+            except (TypeError, ValueError):
+                continue
+        
+        with self._balances_lock:
+            self._balances = balances
+            self._balances_updated_at = time.monotonic()
+        return True
+    
+    def _balance_stream_loop(self, interval):
+        while self._balance_stream_running:
+            try:
+                self._refresh_balances()
+            except Exception as e:
+                print(f"Balance Stream Error: {e}")
+            time.sleep(interval)
+    
+    def start_balance_stream(self, interval=None):
+        """
+        Keeps available balances cached from a background thread so hot paths
+        read them from memory instead of making a REST call per decision.
+        """
+        if self._balance_stream_running:
+            return
+        self._balance_stream_running = True
+        self._balance_thread = threading.Thread(
+            target=self._balance_stream_loop,
+            args=(interval or self.BALANCE_REFRESH_SECONDS,),
+            daemon=True
+        )
+        self._balance_thread.start()
+    
+    def stop_balance_stream(self):
+        """Stops the background balance refresher."""
+        self._balance_stream_running = False
+    
+    def get_cached_balance(self, coin="USDT", max_age=None):
+        """
+        Returns the cached available balance for a coin, or None when the cache
+        is empty or older than max_age seconds (default: two refresh intervals).
+        """
+        max_age = max_age or self.BALANCE_REFRESH_SECONDS * 2
+        with self._balances_lock:
+            if self._balances_updated_at is None or time.monotonic() - self._balances_updated_at > max_age:
+                return None
+            return self._balances.get(coin, 0.0)
+    
     def set_leverage(self, symbol="cmt_btcusdt", leverage=20, margin_mode=1):
         """
         Sets leverage for trading (both long and short positions)
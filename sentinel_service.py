@@ -2,7 +2,7 @@ import time
 from core.weex_api import WeexClient
 from core.analysis import analyze_market_structure
 from core.llm_brain import get_trading_decision
-from core.db_manager import init_db, log_market_state, save_ai_analysis, get_db_connection
+from core.db_manager import init_db, log_market_state, save_ai_analysis, pooled_connection
 
 # 1. Setup
 init_db()
@@ -14,13 +14,12 @@ print("⚠️ MODE: Controlled Trading (User Authorization Required)")
 def get_trade_settings():
     """Fetch current trade settings from database."""
     try:
-        conn = get_db_connection()
-        if conn:
-            cur = conn.cursor()
-            cur.execute("SELECT auto_trading, risk_tolerance, current_symbol FROM trade_settings LIMIT 1")
-            result = cur.fetchone()
-            cur.close()
-            conn.close()
+        with pooled_connection() as conn:
+            result = None
+            if conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT auto_trading, risk_tolerance, current_symbol FROM trade_settings LIMIT 1")
+                    result = cur.fetchone()
             
             if result:
                 return {
@@ -57,7 +56,7 @@ while True:
             
             # STEP 3: The AI Brain (Gemini)
             print("2️⃣ Asking Gemini AI...")
-            ai_result = get_trading_decision(market_state)
+            ai_result = get_trading_decision(market_state, service_tier="priority")
             decision = ai_result.get("decision", "WAIT")
             confidence = ai_result.get("confidence", 0)
             reason = ai_result.get("reasoning", "No reason provided")
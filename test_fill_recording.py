@@ -0,0 +1,110 @@
+"""
+Fill transaction tests against a scratch schema
+record_filled_trade must commit the trade, position and registration writes together
+and fall back to standalone writes when the shared transaction fails.
+Set TEST_DATABASE_URL to run them; they are skipped without it.
+"""
+import pytest
+import psycopg2
+from psycopg2 import pool as pg_pool
+from psycopg2.extras import RealDictCursor
+from core import db_manager
+from conftest import TEST_DATABASE_URL
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+
+@pytest.fixture
+def scratch_pool(scratch_schema, monkeypatch):
+    """Points db_manager's shared pool at the scratch schema."""
+    schema, conn = scratch_schema
+    test_pool = pg_pool.ThreadedConnectionPool(
+        1, 4, TEST_DATABASE_URL,
+        options=f"-csearch_path={schema}",
+        cursor_factory=RealDictCursor,
+        connection_factory=db_manager._PooledConnection
+    )
+    monkeypatch.setattr(db_manager, "_db_pool", test_pool)
+    monkeypatch.setattr(db_manager, "_profitable_count", 0)
+    try:
+        yield conn
+    finally:
+        test_pool.closeall()
+
+
+TRADE = {"symbol": "cmt_btcusdt", "side": "buy", "size": 1, "price": 100, "order_id": "42", "pnl": 5}
+POSITION = {"symbol": "cmt_btcusdt", "side": "LONG", "size": 1, "entry_price": 100, "leverage": 5, "order_id": "42"}
+
+
+def _row_counts(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT (SELECT COUNT(*) FROM trade_history) AS trades,
+                   (SELECT COUNT(*) FROM open_positions) AS positions,
+                   (SELECT COUNT(*) FROM market_log) AS logs
+        """)
+        counts = cur.fetchone()
+    conn.commit()
+    return counts["trades"], counts["positions"], counts["logs"]
+
+
+def _log_write(conn):
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO market_log (decision) VALUES ('REGISTERED')")
+
+
+def test_record_filled_trade_commits_everything(scratch_pool):
+    """Trade, position and the register callback's writes commit together"""
+    def register(conn):
+        assert conn is not None
+        _log_write(conn)
+        return True
+
+    assert db_manager.record_filled_trade(TRADE, POSITION, register) is True
+    assert _row_counts(scratch_pool) == (1, 1, 1)
+    assert db_manager._profitable_count == 1
+
+
+def test_record_filled_trade_keeps_rows_when_register_raises(scratch_pool):
+    """A failing registration is rolled back to the savepoint; the fill rows still commit"""
+    def register(conn):
+        _log_write(conn)
+        raise ValueError("registration failed")
+
+    with pytest.raises(ValueError):
+        db_manager.record_filled_trade(TRADE, POSITION, register)
+    assert _row_counts(scratch_pool) == (1, 1, 0)
+
+
+def test_record_filled_trade_recovers_from_failed_register_sql(scratch_pool):
+    """SQL errors swallowed inside register leave the transaction usable"""
+    def register(conn):
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT * FROM missing_table")
+        except psycopg2.Error:
+            return False
+        return True
+
+    assert db_manager.record_filled_trade(TRADE, POSITION, register) is False
+    assert _row_counts(scratch_pool) == (1, 1, 0)
+
+
+def test_record_filled_trade_falls_back_to_standalone_writes(scratch_pool, monkeypatch):
+    """A failure inside the shared transaction still writes the rows, once, on their own connections"""
+    real_upsert = db_manager._upsert_position
+    calls = []
+
+    def flaky_upsert(cur, position_data):
+        calls.append(position_data)
+        if len(calls) == 1:
+            raise psycopg2.OperationalError("connection reset")
+        return real_upsert(cur, position_data)
+    monkeypatch.setattr(db_manager, "_upsert_position", flaky_upsert)
+
+    registered_with = []
+    db_manager.record_filled_trade(TRADE, POSITION, lambda conn: registered_with.append(conn) or True)
+
+    assert registered_with == [None]
+    assert _row_counts(scratch_pool) == (1, 1, 0)
+    assert db_manager._profitable_count == 1
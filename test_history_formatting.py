@@ -0,0 +1,87 @@
+"""
+Trade-history formatting tests
+_format_history_orders turns raw WEEX history orders into trade-history rows
+"""
+import time
+import zlib
+import pytest
+from api_server import _format_history_orders
+
+ORDERS = [
+    {
+        "orderId": "123", "symbol": "cmt_btcusdt", "type": "1", "size": "0.01",
+        "priceAvg": "50000", "price": "49990", "fee": "0.5", "totalProfits": "0",
+        "cTime": "1700000000000", "status": "filled_partially"
+    },
+    {
+        "order_id": "abc", "symbol": "cmt_ethusdt", "type": "open_short", "size": "1",
+        "priceAvg": "0", "price": "3000", "fee": "0", "pnl": "-2.5",
+        "createTime": "not-a-time"
+    },
+    "junk",  # Non-dict entries are skipped
+]
+
+
+@pytest.fixture(autouse=True)
+def berlin_time(monkeypatch):
+    """Pins the local zone to one with DST so conversions don't depend on the host."""
+    monkeypatch.setenv("TZ", "Europe/Berlin")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_numeric_order_fields():
+    """Numeric WEEX types map to sides; priceAvg wins over price; ms timestamps become local ISO strings"""
+    row = _format_history_orders(ORDERS)[0]
+
+    assert row["id"] == 123
+    assert row["order_id"] == "123"
+    assert row["symbol"] == "cmt_btcusdt"
+    assert row["side"] == "buy"
+    assert row["size"] == 0.01
+    assert row["price"] == 50000.0
+    assert row["fees"] == 0.5
+    assert row["pnl"] == 0.0
+    assert row["status"] == "filled_partially"
+    assert row["execution_time"] == "2023-11-14T23:13:20"
+    assert row["notes"] == "Order type: 1"
+
+
+def test_text_order_fields_and_fallbacks():
+    """Text types use the substring check; zero priceAvg/fee fall back; bad timestamps pass through"""
+    formatted = _format_history_orders(ORDERS)
+    assert len(formatted) == 2
+    row = formatted[1]
+
+    assert row["id"] == zlib.crc32(b"abc") & 0x3FFFFFFF
+    assert row["side"] == "sell"
+    assert row["price"] == 3000.0
+    assert row["fees"] is None
+    assert row["pnl"] == -2.5
+    assert row["status"] == "filled"
+    assert row["execution_time"] == "not-a-time"
+
+
+def test_local_offset_follows_dst():
+    """Each order gets the offset in effect at its own time, not today's"""
+    rows = _format_history_orders([
+        {"orderId": "1", "type": "1", "size": "1", "price": "10", "cTime": "1690000000000"},  # CEST, UTC+2
+        {"orderId": "2", "type": "1", "size": "1", "price": "10", "cTime": "1700000000000"},  # CET, UTC+1
+    ])
+    assert [row["execution_time"] for row in rows] == ["2023-07-22T06:26:40", "2023-11-14T23:13:20"]
+
+
+def test_close_types_map_to_exit_side():
+    """type 3 (close long) sells and type 4 (close short) buys"""
+    rows = _format_history_orders([
+        {"orderId": "1", "type": "3", "size": "1", "price": "10"},
+        {"orderId": "2", "type": "4", "size": "1", "price": "10"},
+    ])
+    assert [row["side"] for row in rows] == ["sell", "buy"]
+
+
+def test_empty_history():
+    assert _format_history_orders([]) == []
+    assert _format_history_orders(["junk", None]) == []
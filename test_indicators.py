@@ -0,0 +1,59 @@
+"""
+Indicator kernel tests
+latest_indicators must match the last element of the array kernels it replaces
+"""
+import numpy as np
+from core.indicators_numba import atr, ema, latest_indicators, rsi
+
+
+def _random_candles(n, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 100.0 + np.cumsum(rng.normal(0, 1, n))
+    high = close + rng.uniform(0.1, 1.5, n)
+    low = close - rng.uniform(0.1, 1.5, n)
+    volume = rng.uniform(10, 1000, n)
+    return high, low, close, volume
+
+
+def _reference(high, low, close, volume):
+    volume_seen = ~np.isnan(volume)
+    return (
+        rsi(close, 14)[-1],
+        atr(high, low, close, 14)[-1],
+        ema(close, 20)[-1],
+        ema(close, 50)[-1],
+        volume[volume_seen].mean() if volume_seen.any() else np.nan,
+    )
+
+
+def test_latest_indicators_match_array_kernels():
+    """Single-pass values equal the last element of rsi/atr/ema and the volume mean"""
+    high, low, close, volume = _random_candles(300)
+    np.testing.assert_allclose(latest_indicators(high, low, close, volume),
+                               _reference(high, low, close, volume), rtol=1e-9)
+
+
+def test_latest_indicators_short_window():
+    """With fewer bars than the slow EMA span, that value is NaN just like the array kernel"""
+    high, low, close, volume = _random_candles(30)
+    result = latest_indicators(high, low, close, volume)
+
+    assert np.isnan(result[3])
+    np.testing.assert_allclose(result, _reference(high, low, close, volume), rtol=1e-9, equal_nan=True)
+
+
+def test_latest_indicators_skip_missing_volume():
+    """Missing volume values are left out of the volume mean"""
+    high, low, close, volume = _random_candles(120)
+    volume[::7] = np.nan
+    np.testing.assert_allclose(latest_indicators(high, low, close, volume),
+                               _reference(high, low, close, volume), rtol=1e-9)
+
+
+def test_latest_indicators_flat_series():
+    """A flat series has no gains or losses, so RSI is undefined (NaN) in both paths"""
+    close = np.full(60, 50.0)
+    result = latest_indicators(close.copy(), close.copy(), close, np.ones(60))
+
+    assert np.isnan(result[0]) and np.isnan(rsi(close, 14)[-1])
+    assert result[2] == 50.0 and result[3] == 50.0
@@ -0,0 +1,166 @@
+"""
+KlineStream buffering tests
+Seeds from a fake REST fetch and feeds Binance-style kline frames to _on_message
+"""
+import asyncio
+import threading
+import orjson
+from core.market_stream import KlineStream
+
+SEED_ROWS = [
+    [1000.0, 10.0, 11.0, 9.0, 10.5, 100.0],
+    [2000.0, 10.5, 12.0, 10.0, 11.0, 120.0],
+    [3000.0, 11.0, 12.5, 10.5, 12.0, 90.0],
+    [4000.0, 12.0, 13.0, 11.5, 12.5, 80.0],  # Still forming
+]
+
+
+def _kline(t, close, closed, symbol="BTCUSDT"):
+    """Binance combined-stream kline frame (prices arrive as strings)."""
+    return orjson.dumps({
+        "stream": f"{symbol.lower()}@kline_15m",
+        "data": {
+            "e": "kline",
+            "s": symbol,
+            "k": {"t": t, "o": "12.0", "h": "14.0", "l": "11.0", "c": str(close), "v": "50.0", "x": closed}
+        }
+    })
+
+
+def _seeded_stream(rows=SEED_ROWS, maxlen=3):
+    stream = KlineStream(lambda symbol, limit, interval: rows, maxlen=maxlen)
+    asyncio.run(stream._seed("btcusdt"))
+    stream.connected = True
+    return stream
+
+
+def test_seed_splits_closed_and_forming_bars():
+    """The last REST row is kept as the forming bar, the rest as closed history"""
+    stream = _seeded_stream()
+    assert [row[0] for row in stream._closed["btcusdt"]] == [1000.0, 2000.0, 3000.0]
+    assert stream._forming["btcusdt"][0] == 4000.0
+
+    candles = stream.candle_set("cmt_btcusdt")
+    assert len(candles) == 4
+    assert candles.close[-1] == 12.5
+
+
+def test_forming_update_replaces_forming_bar():
+    """An open-bar update only touches the forming bar"""
+    stream = _seeded_stream()
+    stream._on_message(_kline(4000, 12.8, closed=False))
+
+    assert len(stream._closed["btcusdt"]) == 3
+    assert stream._forming["btcusdt"][4] == 12.8
+    assert not stream.bar_closed.is_set()
+
+
+def test_closed_bar_is_appended_and_oldest_dropped():
+    """A closed bar joins the history, evicts the oldest beyond maxlen and signals bar_closed"""
+    stream = _seeded_stream()
+    stream._on_message(_kline(4000, 12.9, closed=True))
+
+    closed = stream._closed["btcusdt"]
+    assert [row[0] for row in closed] == [2000.0, 3000.0, 4000.0]
+    assert closed[-1][4] == 12.9
+    assert stream._forming["btcusdt"] is None
+    assert stream.bar_closed.is_set()
+
+
+def test_repeated_close_replaces_last_bar():
+    """A second close message for the same bar overwrites it instead of duplicating it"""
+    stream = _seeded_stream()
+    stream._on_message(_kline(4000, 12.9, closed=True))
+    stream._on_message(_kline(4000, 13.1, closed=True))
+
+    closed = stream._closed["btcusdt"]
+    assert [row[0] for row in closed] == [2000.0, 3000.0, 4000.0]
+    assert closed[-1][4] == 13.1
+
+
+def test_control_frames_and_unseeded_symbols_are_ignored():
+    """Subscription acks and klines for symbols that were never seeded don't change any buffer"""
+    stream = _seeded_stream()
+    stream._on_message(orjson.dumps({"result": None, "id": 1}))
+    stream._on_message(_kline(4000, 99.0, closed=True, symbol="ETHUSDT"))
+
+    assert "ethusdt" not in stream._closed
+    assert stream._forming["btcusdt"][0] == 4000.0
+
+
+def test_failed_seed_leaves_symbol_unseeded():
+    """No rows (or an exception) from the REST fetch must not store an empty or stale buffer"""
+    stream = _seeded_stream()
+
+    stream.fetch_candles = lambda symbol, limit, interval: None
+    asyncio.run(stream._seed("btcusdt"))
+    assert "btcusdt" not in stream._closed
+    assert stream.candle_set("cmt_btcusdt") is None
+
+    def failing_fetch(symbol, limit, interval):
+        raise ConnectionError("binance unreachable")
+    stream.fetch_candles = failing_fetch
+    asyncio.run(stream._seed("btcusdt"))
+    assert "btcusdt" not in stream._closed
+
+
+def test_disconnected_stream_returns_none():
+    """Callers fall back to REST while the socket is down"""
+    stream = _seeded_stream()
+    stream.connected = False
+    assert stream.candle_set("cmt_btcusdt") is None
+
+
+class _FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append(orjson.loads(message))
+
+
+def _watch_with_slow_seed(rows, frames):
+    """Runs watch() for a new symbol and delivers frames while its REST seed is still in flight."""
+    gate = threading.Event()
+
+    def slow_fetch(symbol, limit, interval):
+        gate.wait(5)
+        return rows
+
+    stream = KlineStream(slow_fetch, maxlen=3)
+    stream._ws = _FakeSocket()
+    stream.connected = True
+
+    async def scenario():
+        task = asyncio.create_task(stream.watch("cmt_btcusdt"))
+        await asyncio.sleep(0.05)  # Subscribed, seed blocked in its thread
+        for frame in frames:
+            stream._on_message(frame)
+        gate.set()
+        await task
+
+    asyncio.run(scenario())
+    return stream
+
+
+def test_close_during_seed_is_replayed():
+    """A bar that closes while watch() is seeding a new symbol is applied once the seed lands"""
+    stream = _watch_with_slow_seed(SEED_ROWS, [_kline(4000, 12.9, closed=True)])
+
+    assert stream._ws.sent[0]["params"] == ["btcusdt@kline_15m"]
+    closed = stream._closed["btcusdt"]
+    assert [row[0] for row in closed] == [2000.0, 3000.0, 4000.0]
+    assert closed[-1][4] == 12.9
+    assert stream._forming["btcusdt"] is None
+    assert stream.bar_closed.is_set()
+    assert stream._pending == {}
+
+
+def test_frames_older_than_seed_are_dropped_on_replay():
+    """If the REST fetch already saw the close, the queued frame must not clear the newer forming bar"""
+    rows = SEED_ROWS + [[5000.0, 12.5, 13.5, 12.0, 13.0, 40.0]]
+    stream = _watch_with_slow_seed(rows, [_kline(4000, 12.9, closed=True)])
+
+    assert [row[0] for row in stream._closed["btcusdt"]] == [2000.0, 3000.0, 4000.0]
+    assert stream._forming["btcusdt"][0] == 5000.0
+    assert not stream.bar_closed.is_set()
@@ -0,0 +1,100 @@
+"""
+Safety layer rule-table tests
+validate_trade's vectorised rule table must pass and fail exactly where the scalar check_* methods do
+"""
+import pytest
+from core.safety_layer import ExecutionSafetyLayer
+
+TRADE = {
+    "symbol": "cmt_btcusdt",
+    "direction": "LONG",
+    "size": 0.01,
+    "entry_price": 50000.0,
+    "stop_loss": 49000.0,
+    "take_profit": 52000.0,
+    "leverage": 5,
+    "margin_required": 100.0,
+    "current_positions": [],
+}
+
+
+@pytest.fixture
+def layer():
+    return ExecutionSafetyLayer(weex_client=None, initial_equity=10000.0)
+
+
+def _scalar_results(layer, trade):
+    check_args = {
+        "check_symbol_validity": (trade["symbol"],),
+        "check_minimum_order_size": (trade["symbol"], trade["size"]),
+        "check_price_reasonableness": (trade["symbol"], trade["entry_price"], trade["stop_loss"], trade["take_profit"]),
+        "check_margin_availability": (trade["margin_required"], trade["current_positions"]),
+        "check_liquidation_distance": (trade["entry_price"], trade["direction"], trade["leverage"], trade["stop_loss"]),
+        "check_daily_loss_limit": (),
+        "check_max_drawdown": (),
+        "check_exposure_limit": (trade["margin_required"], trade["current_positions"]),
+        "check_correlation_conflict": (trade["symbol"], trade["current_positions"]),
+    }
+    return {name: getattr(layer, method)(*check_args[method]) for name, method in layer.RULE_CHECKS}
+
+
+def _validate(layer, **overrides):
+    """Runs validate_trade and asserts every rule agrees with its scalar check."""
+    trade = {**TRADE, **overrides}
+    can_execute, results = layer.validate_trade(**trade)
+    expected = _scalar_results(layer, trade)
+
+    assert [result.check_name for result in results] == list(expected)
+    for result in results:
+        assert result.passed == expected[result.check_name].passed, result.check_name
+    return can_execute, {result.check_name: result for result in results}
+
+
+def test_clean_trade_passes_every_rule(layer):
+    can_execute, results = _validate(layer)
+    assert can_execute
+    assert all(result.passed for result in results.values())
+
+
+def test_daily_loss_exactly_at_limit_passes(layer):
+    """The limit itself is allowed; only a loss beyond it rejects"""
+    layer.update_equity(9700.0)  # -3.00% on the day
+    can_execute, results = _validate(layer)
+    assert results["DAILY_LOSS_LIMIT"].passed
+    assert can_execute
+
+    layer.update_equity(9699.0)
+    can_execute, results = _validate(layer)
+    assert not results["DAILY_LOSS_LIMIT"].passed
+    assert not can_execute
+
+
+def test_zero_leverage_fails_liquidation_check(layer):
+    """Leverage 0 has no liquidation price; both paths reject it instead of raising"""
+    can_execute, results = _validate(layer, leverage=0)
+    assert not results["LIQUIDATION_DISTANCE"].passed
+    assert results["LIQUIDATION_DISTANCE"].severity == "CRITICAL"
+    assert not can_execute
+
+
+def test_margin_equal_to_available_passes(layer):
+    """Using exactly the free margin is allowed; one dollar more is not"""
+    positions = [{"symbol": "cmt_solusdt", "margin_used": 3000.0}]
+    _, results = _validate(layer, margin_required=7000.0, current_positions=positions)
+    assert results["MARGIN_AVAILABILITY"].passed
+
+    _, results = _validate(layer, margin_required=7001.0, current_positions=positions)
+    assert not results["MARGIN_AVAILABILITY"].passed
+
+
+def test_correlated_open_position_warns(layer):
+    """An open position in the same correlation group is a warning, not a rejection"""
+    positions = [{"symbol": "cmt_ethusdt", "margin_used": 100.0}]
+    can_execute, results = _validate(layer, current_positions=positions)
+    assert not results["CORRELATION_CONFLICT"].passed
+    assert results["CORRELATION_CONFLICT"].severity == "WARNING"
+    assert can_execute
+
+    # The same symbol is not a conflict with itself
+    _, results = _validate(layer, current_positions=[{"symbol": "cmt_btcusdt", "margin_used": 100.0}])
+    assert results["CORRELATION_CONFLICT"].passed
@@ -0,0 +1,127 @@
+"""
+SQL tests against a scratch schema
+Runs the hand-written API queries against a real Postgres.
+Set TEST_DATABASE_URL to a database the tests may create and drop schemas in;
+the tests are skipped without it.
+"""
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+import asyncpg
+from core import db_manager
+from conftest import TEST_DATABASE_URL
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+
+def _run_query(schema, sql, *args):
+    async def run():
+        conn = await asyncpg.connect(db_manager._asyncpg_dsn(TEST_DATABASE_URL),
+                                     server_settings={"search_path": schema})
+        try:
+            return await conn.fetch(sql, *args)
+        finally:
+            await conn.close()
+    return asyncio.run(run())
+
+
+def _insert_trades(conn, pnls):
+    """Inserts trades one minute apart, oldest first."""
+    start = datetime(2024, 1, 1)
+    with conn.cursor() as cur:
+        for index, pnl in enumerate(pnls):
+            cur.execute(
+                "INSERT INTO trade_history (symbol, side, size, price, pnl, execution_time) VALUES (%s, %s, %s, %s, %s, %s)",
+                ("cmt_btcusdt", "buy", 1, 100, pnl, start + timedelta(minutes=index))
+            )
+    conn.commit()
+
+
+def test_risk_metrics_sql(scratch_schema):
+    """Aggregates and newest-to-oldest drawdown over the latest trades"""
+    from api_server import RISK_METRICS_SQL
+    schema, conn = scratch_schema
+    _insert_trades(conn, [10, -5, None, 20, -30, 15])
+
+    stats = _run_query(schema, RISK_METRICS_SQL, 1000)[0]
+
+    assert stats["total_trades"] == 6
+    assert stats["pnl_trades"] == 5
+    assert stats["win_count"] == 3
+    assert float(stats["total_pnl"]) == 10
+    assert float(stats["total_wins"]) == 45
+    assert float(stats["total_losses"]) == 35
+    assert float(stats["avg_pnl"]) == pytest.approx(2.0)
+    assert float(stats["best_trade"]) == 20
+    assert float(stats["worst_trade"]) == -30
+    # Newest first: cum 15, -15, 5, 0, 10 against a peak of 15 -> worst is (-15 - 15) / 15
+    assert float(stats["max_drawdown"]) == pytest.approx(-200.0)
+
+
+def test_risk_metrics_sql_respects_limit(scratch_schema):
+    """Only the newest $1 trades are aggregated"""
+    from api_server import RISK_METRICS_SQL
+    schema, conn = scratch_schema
+    _insert_trades(conn, [-100, 5, 5])
+
+    stats = _run_query(schema, RISK_METRICS_SQL, 2)[0]
+
+    assert stats["total_trades"] == 2
+    assert float(stats["total_pnl"]) == 10
+    assert float(stats["max_drawdown"]) == 0
+
+
+def test_market_log_feed_sql(scratch_schema):
+    """Log type and fallback message are derived in SQL, newest first"""
+    from api_server import MARKET_LOG_FEED_SQL
+    schema, conn = scratch_schema
+    start = datetime(2024, 1, 1)
+    rows = [
+        ("BULLISH", 55.0, "AUTO-BUY", 80, "Opened long"),
+        ("BULLISH", 55.0, "BUY", 80, ""),
+        ("BEARISH", 40.0, "WAIT", 30, "RISK limit reached"),
+        ("NEUTRAL", 50.0, "WAIT", 10, "Holding"),
+    ]
+    with conn.cursor() as cur:
+        for index, (trend, rsi, decision, confidence, reason) in enumerate(rows):
+            cur.execute(
+                "INSERT INTO market_log (timestamp, trend, rsi, decision, confidence, reason) VALUES (%s, %s, %s, %s, %s, %s)",
+                (start + timedelta(minutes=index), trend, rsi, decision, confidence, reason)
+            )
+    conn.commit()
+
+    feed = _run_query(schema, MARKET_LOG_FEED_SQL, 10)
+
+    assert [row["log_type"] for row in feed] == ["system", "risk", "sentinel", "trade"]
+    assert feed[2]["message"] == "Trend: BULLISH | RSI: 55.0 | Decision: BUY | Confidence: 80%"
+    assert feed[3]["message"] == "Opened long"
+    assert len(_run_query(schema, MARKET_LOG_FEED_SQL, 2)) == 2
+
+
+def test_toggle_strategy_sql(scratch_schema):
+    """Activating a strategy enables auto-trading; deactivating or a missing id leaves it alone"""
+    from api_server import TOGGLE_STRATEGY_SQL
+    schema, conn = scratch_schema
+    with conn.cursor() as cur:
+        cur.execute("SELECT MIN(id) AS id FROM strategies")
+        strategy_id = cur.fetchone()["id"]
+    conn.commit()
+
+    def auto_trading():
+        with conn.cursor() as cur:
+            cur.execute("SELECT auto_trading FROM trade_settings")
+            value = cur.fetchone()["auto_trading"]
+        conn.commit()
+        return value
+
+    row = _run_query(schema, TOGGLE_STRATEGY_SQL, False, strategy_id)[0]
+    assert row["id"] == strategy_id and row["is_active"] is False
+    assert auto_trading() is False
+
+    assert _run_query(schema, TOGGLE_STRATEGY_SQL, True, 999999) == []
+    assert auto_trading() is False
+
+    row = _run_query(schema, TOGGLE_STRATEGY_SQL, True, strategy_id)[0]
+    assert row["is_active"] is True
+    assert auto_trading() is True
+